@@ -2,13 +2,44 @@ from django.contrib import admin
 
 # Register your models here.
 # recipes/admin.py
-from django.contrib import admin
-from .models import Taxonomy, Facet, Term, Recipe, RecipeTerm
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+from .models import Taxonomy, Facet, Term, Recipe, RecipeTerm, Ingredient, RecipeSearchPosting
+from .search import tokenize
+
+
+class LargeTablePaginator(Paginator):
+    """
+    Paginador sin COUNT(*) completo: cuenta como máximo COUNT_LIMIT filas.
+    Por encima del límite, en una tabla sin filtros se estima con MAX(pk)
+    (una lectura del índice de la clave primaria); con filtros se corta en
+    el límite y hay que afinar la búsqueda para llegar más lejos.
+    """
+    COUNT_LIMIT = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        bounded = queryset[:self.COUNT_LIMIT + 1].count()
+        if bounded <= self.COUNT_LIMIT:
+            return bounded
+        if not queryset.query.has_filters():
+            return queryset.aggregate(estimate=Max("pk"))["estimate"]
+        return self.COUNT_LIMIT
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base para changelists con un número fijo de consultas por página."""
+    paginator = LargeTablePaginator
+    show_full_result_count = False  # evita el segundo COUNT(*) al filtrar
 
 
 class TermInline(admin.TabularInline):
     model = Term
     extra = 1
+    autocomplete_fields = ("parent",)
 
 
 @admin.register(Taxonomy)
@@ -21,31 +52,74 @@ class TaxonomyAdmin(admin.ModelAdmin):
 class FacetAdmin(admin.ModelAdmin):
     list_display = ("name", "taxonomy", "order")
     list_filter = ("taxonomy",)
+    list_select_related = ("taxonomy",)
     search_fields = ("name", "description")
     inlines = [TermInline]
 
 
 @admin.register(Term)
-class TermAdmin(admin.ModelAdmin):
+class TermAdmin(LargeTableAdmin):
     list_display = ("name", "facet", "parent", "order")
     list_filter = ("facet",)
+    # __str__ de facet usa su taxonomía y el de parent su faceta y su padre
+    list_select_related = ("facet__taxonomy", "parent__facet", "parent__parent")
     search_fields = ("name", "description")
+    autocomplete_fields = ("facet", "parent")
+
+    def get_queryset(self, request):
+        # También lo usa el autocompletado (str(term) lee facet y parent).
+        # Si get_queryset ya trae select_related, el changelist ignora
+        # list_select_related: por eso se aplica aquí completo.
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
 
 class RecipeTermInline(admin.TabularInline):
     model = RecipeTerm
     extra = 1
+    autocomplete_fields = ("term",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("term__facet", "term__parent")
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ("title", "slug", "created_at", "updated_at")
-    search_fields = ("title", "description", "ingredients_text", "instructions")
+    search_fields = ("title", "slug")
+    search_help_text = "Busca por palabras (o su inicio) en título, ingredientes, descripción e instrucciones, o por slug exacto."
+    ordering = Recipe.ORDERINGS["newest"]  # recorre recipe_created_idx
     exclude = ("slug",)  # Oculta el campo slug en el formulario
     inlines = [RecipeTermInline]
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Usa el índice de búsqueda (RecipeSearchPosting) en lugar de cuatro
+        `icontains` sobre columnas de texto: cada palabra es un rango sobre
+        el índice de tokens ("pol" -> pollo, polvorón...), combinadas con AND.
+        """
+        tokens = tokenize(search_term)
+        if not tokens:
+            return queryset, False
+
+        matches = queryset
+        for token in tokens:
+            matches = matches.filter(
+                id__in=RecipeSearchPosting.objects.filter(
+                    token__gte=token, token__lt=token + "\uffff"
+                ).values("recipe_id")
+            )
+        return matches | queryset.filter(slug=search_term.strip()), False
+
 
 @admin.register(RecipeTerm)
-class RecipeTermAdmin(admin.ModelAdmin):
+class RecipeTermAdmin(LargeTableAdmin):
     list_display = ("recipe", "term")
-    list_filter = ("term__facet", "term__facet__taxonomy")
\ No newline at end of file
+    list_filter = ("term__facet", "term__facet__taxonomy")
+    list_select_related = ("recipe", "term__facet", "term__parent")
+    autocomplete_fields = ("recipe", "term")
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
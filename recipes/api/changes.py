@@ -0,0 +1,105 @@
+# recipes/api/changes.py
+"""
+Feed de cambios incremental: /api/v1/changes/?since=<token>&limit=500
+
+Un cliente que ya tiene una copia del catálogo pide solo lo que cambió
+desde su último token, en lugar de volver a descargar todos los endpoints:
+
+    {
+        "next": 1234,          # token para la siguiente llamada
+        "has_more": false,     # true: hay más cambios, volver a pedir con next
+        "changes": [
+            {"entity": "recipe", "id": 7, "op": "upsert", "data": {...}},
+            {"entity": "term", "id": 3, "op": "delete"},
+        ]
+    }
+
+Dentro de una página se conserva solo el último cambio de cada objeto y los
+datos se leen con una consulta por tipo de entidad (estado actual, no el de
+cada entrada). Los borrados llegan como lápidas ("op": "delete").
+"""
+from django.db.models import Exists, OuterRef
+
+from recipes.models import ChangeLogEntry, Facet, Recipe, RecipeTerm, Taxonomy, Term
+from recipes.api.serializer import (
+    FacetSerializer,
+    RecipeListSerializer,
+    RecipeTermSerializer,
+    TaxonomySerializer,
+    TermSerializer,
+)
+
+Entity = ChangeLogEntry.Entity
+
+# Entidad -> (modelo, serializer): mismos datos que el endpoint de lista
+SERIALIZERS = {
+    Entity.TAXONOMY: (Taxonomy, TaxonomySerializer),
+    Entity.FACET: (Facet, FacetSerializer),
+    Entity.TERM: (Term, TermSerializer),
+    Entity.RECIPE_TERM: (RecipeTerm, RecipeTermSerializer),
+}
+
+
+def _current_data(entity: str, object_ids: list[int], request) -> dict[int, dict]:
+    if entity == Entity.RECIPE:
+        rows = RecipeListSerializer.from_values(Recipe.objects.filter(id__in=object_ids), request)
+        return {row["id"]: row for row in rows}
+    model, serializer_class = SERIALIZERS[entity]
+    objects = model.objects.filter(id__in=object_ids)
+    data = serializer_class(objects, many=True, context={"request": request}).data
+    return {row["id"]: row for row in data}
+
+
+def build_change_feed(since: int, limit: int, request=None) -> dict:
+    entries = list(
+        ChangeLogEntry.objects.filter(id__gt=since)
+        .order_by("id")
+        .values_list("id", "entity", "object_id", "deleted")[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    # Último cambio de cada objeto, en el orden en que ocurrió
+    latest: dict[tuple[str, int], tuple[int, bool]] = {}
+    for entry_id, entity, object_id, deleted in entries:
+        latest.pop((entity, object_id), None)
+        latest[(entity, object_id)] = (entry_id, deleted)
+
+    upserts: dict[str, list[int]] = {}
+    for (entity, object_id), (_, deleted) in latest.items():
+        if not deleted:
+            upserts.setdefault(entity, []).append(object_id)
+    current = {
+        entity: _current_data(entity, object_ids, request)
+        for entity, object_ids in upserts.items()
+    }
+
+    changes = []
+    for (entity, object_id), (_, deleted) in latest.items():
+        if deleted:
+            changes.append({"entity": entity, "id": object_id, "op": "delete"})
+            continue
+        data = current[entity].get(object_id)
+        if data is None:
+            # Borrado después de esta página: la lápida llega más adelante
+            continue
+        changes.append({"entity": entity, "id": object_id, "op": "upsert", "data": data})
+
+    return {
+        "next": entries[-1][0] if entries else since,
+        "has_more": has_more,
+        "changes": changes,
+    }
+
+
+def compact_change_log() -> int:
+    """
+    Borra las entradas superadas por otra más reciente del mismo objeto.
+    Es seguro con clientes a mitad de sincronización: la entrada que queda
+    tiene un id mayor, así que cualquier token anterior la sigue viendo.
+    """
+    newest = ChangeLogEntry.objects.filter(
+        entity=OuterRef("entity"), object_id=OuterRef("object_id"), id__gt=OuterRef("id")
+    )
+    deleted, _ = ChangeLogEntry.objects.filter(Exists(newest)).delete()
+    return deleted
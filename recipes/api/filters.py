@@ -2,66 +2,16 @@
 import django_filters
 from django.db import models
 
+from recipes.faceting import filter_by_term_groups, group_term_ids_by_facet
 from recipes.models import Recipe, Term
 
 
-def get_descendant_term_ids(root_ids: list[int]) -> list[int]:
-    """
-    Dado un conjunto de IDs de términos raíz, devuelve esos IDs
-    + todos los descendientes (hijos, nietos, etc.).
-
-    Usa BFS (Breadth-First Search) para expandir el árbol de términos.
-    Optimizado para reducir queries a la base de datos (N+1 prevention).
-
-    Args:
-        root_ids: Lista de IDs de términos a expandir
-
-    Returns:
-        Lista de IDs incluyendo raíces y todos sus descendientes
-
-    Ejemplo:
-        >>> get_descendant_term_ids([3])  # Postre
-        [3, 4, 6]  # Postre, pastel, panque
-
-    Se mantiene independiente del FilterSet (SRP).
-    """
-    expanded_ids: set[int] = set(int(tid) for tid in root_ids)
-    queue: list[int] = list(expanded_ids)
-
-    # Para reducir queries, precalculamos todas las relaciones parent->children
-    # en memoria cuando hay varios términos.
-    children_map: dict[int, list[int]] = {}
-
-    # Solo si hay más de un id, tiene sentido precargar:
-    if expanded_ids:
-        for parent_id, child_id in Term.objects.filter(
-            parent_id__in=expanded_ids
-        ).values_list("parent_id", "id"):
-            children_map.setdefault(parent_id, []).append(child_id)
-
-    while queue:
-        current_id = queue.pop()
-
-        # Si no está en el mapa (aún), cargamos on-demand sus hijos
-        if current_id not in children_map:
-            children = list(
-                Term.objects.filter(parent_id=current_id).values_list("id", flat=True)
-            )
-            children_map[current_id] = children
-
-        for child_id in children_map[current_id]:
-            if child_id not in expanded_ids:
-                expanded_ids.add(child_id)
-                queue.append(child_id)
-
-    return list(expanded_ids)
-
-
 class RecipeFilter(django_filters.FilterSet):
     """
     Filtros para Recipe:
       - q: búsqueda de texto
-      - term: términos de taxonomía (con expansión a descendientes)
+      - term: términos de taxonomía (con expansión a descendientes);
+        OR dentro de una faceta, AND entre facetas
     """
 
     q = django_filters.CharFilter(method="filter_q")
@@ -81,9 +31,11 @@ class RecipeFilter(django_filters.FilterSet):
         /api/recipes/?q=pollo
 
         Busca el texto en título, descripción, ingredientes e instrucciones.
+        Con ?ordering=relevance no se filtra aquí: el ranking BM25 de la vista
+        decide qué recetas coinciden (por tokens, no por subcadena).
         """
         value = (value or "").strip()
-        if not value:
+        if not value or self.data.get("ordering") == "relevance":
             return queryset
 
         query = (
@@ -96,16 +48,15 @@ class RecipeFilter(django_filters.FilterSet):
 
     def filter_term(self, queryset, name, value):
         """
-        /api/recipes/?term=3&term=4
+        /api/recipes/?term=3&term=4&term=8
 
         value llega como una lista de objetos Term seleccionados.
         Expandimos a hijos para respetar la jerarquía
-        (Postre => Postre + pastel + panque ...).
+        (Postre => Postre + pastel + panque ...) y combinamos por faceta:
+        (Postre o Entrada) y Horneado. Ver recipes/faceting.py.
         """
         if not value:
             return queryset
 
-        root_ids = [term.id for term in value]
-        expanded_ids = get_descendant_term_ids(root_ids)
-
-        return queryset.filter(terms__id__in=expanded_ids).distinct()
\ No newline at end of file
+        groups = group_term_ids_by_facet(term.id for term in value)
+        return filter_by_term_groups(queryset, groups)
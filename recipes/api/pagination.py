@@ -0,0 +1,89 @@
+# recipes/api/pagination.py
+import base64
+import bisect
+import json
+
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RelevanceCursorPagination:
+    """
+    Paginación por cursor para resultados ordenados por relevancia.
+
+    El orden (score desc, id asc) se calcula en Python, así que no sirve
+    CursorPagination de DRF (requiere ordenar por una columna). El cursor es
+    opaco y contiene el (score, id) del último elemento de la página:
+    la siguiente página empieza justo después de esa posición.
+
+    Uso:
+        /api/v1/recipes/?q=pollo&ordering=relevance&page_size=20
+        /api/v1/recipes/?q=pollo&ordering=relevance&cursor=WzEuMiwgN10
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request) -> tuple[float, int] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            score, recipe_id = json.loads(base64.urlsafe_b64decode(padded))
+            return float(score), int(recipe_id)
+        except (TypeError, ValueError):
+            raise NotFound("Cursor inválido.")
+
+    def encode_cursor(self, score: float, recipe_id: int) -> str:
+        raw = json.dumps([score, recipe_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def paginate_ranked(self, ranked: list[tuple[int, float]], request) -> list:
+        """
+        Args:
+            ranked: [(recipe_id, score), ...] ordenado por (-score, id)
+
+        Returns:
+            Porción de `ranked` correspondiente a la página solicitada.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        start = 0
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            score, recipe_id = cursor
+            start = bisect.bisect_right(
+                ranked, (-score, recipe_id), key=lambda row: (-row[1], row[0])
+            )
+
+        page = ranked[start:start + page_size]
+        self.next_cursor = None
+        if start + page_size < len(ranked) and page:
+            last_id, last_score = page[-1]
+            self.next_cursor = self.encode_cursor(last_score, last_id)
+        self.count = len(ranked)
+        return page
+
+    def get_next_link(self) -> str | None:
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            "count": self.count,
+            "next": self.get_next_link(),
+            "results": data,
+        })
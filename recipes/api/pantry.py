@@ -0,0 +1,85 @@
+# recipes/api/pantry.py
+"""
+Búsqueda "¿qué puedo cocinar con esto?".
+
+Usa RecipeIngredient como índice invertido: solo se leen las listas de
+recetas de los ingredientes de la despensa, nunca el texto de todas las recetas.
+"""
+from recipes.ingredients import normalize_ingredient
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def normalize_pantry(raw_items: list[str]) -> list[str]:
+    """
+    Normaliza la lista de la despensa con las mismas reglas que
+    el índice (acentos, plurales, cantidades), sin duplicados.
+    """
+    names = []
+    for item in raw_items:
+        name = normalize_ingredient(item)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def rank_recipes_for_pantry(pantry: list[str], limit: int = 20) -> list[dict]:
+    """
+    Ordena recetas por cobertura de la despensa.
+
+    Para cada receta candidata R y la despensa P:
+        coverage = |R ∩ P| / |R|
+
+    Args:
+        pantry: Nombres de ingredientes ya normalizados
+        limit: Máximo de recetas a devolver
+
+    Returns:
+        Lista de dicts {recipe, coverage, matched, missing} ordenada por
+        cobertura, luego por número de coincidencias.
+    """
+    pantry_ids = set(
+        Ingredient.objects.filter(name__in=pantry).values_list("id", flat=True)
+    )
+    if not pantry_ids:
+        return []
+
+    # 1) Listas de postings: recetas que contienen al menos un ingrediente
+    candidate_ids = set(
+        RecipeIngredient.objects.filter(ingredient_id__in=pantry_ids).values_list(
+            "recipe_id", flat=True
+        )
+    )
+
+    # 2) Conjunto completo de ingredientes solo de las candidatas
+    ingredient_sets: dict[int, dict[int, str]] = {}
+    for recipe_id, ingredient_id, name in RecipeIngredient.objects.filter(
+        recipe_id__in=candidate_ids
+    ).values_list("recipe_id", "ingredient_id", "ingredient__name"):
+        ingredient_sets.setdefault(recipe_id, {})[ingredient_id] = name
+
+    scored = []
+    for recipe_id, ingredients in ingredient_sets.items():
+        matched = ingredients.keys() & pantry_ids
+        scored.append(
+            (
+                len(matched) / len(ingredients),
+                len(matched),
+                recipe_id,
+                sorted(ingredients[i] for i in matched),
+                sorted(name for i, name in ingredients.items() if i not in matched),
+            )
+        )
+    scored.sort(key=lambda row: (-row[0], -row[1], row[2]))
+    scored = scored[:limit]
+
+    recipes = Recipe.objects.in_bulk([row[2] for row in scored])
+    return [
+        {
+            "recipe": recipes[recipe_id],
+            "coverage": round(coverage, 4),
+            "matched": matched,
+            "missing": missing,
+        }
+        for coverage, _, recipe_id, matched, missing in scored
+        if recipe_id in recipes
+    ]
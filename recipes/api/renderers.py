@@ -0,0 +1,79 @@
+# recipes/api/renderers.py
+"""
+Renderers y parsers rápidos para la API.
+
+- ORJSONRenderer / ORJSONParser: JSON con orjson (mucho más rápido que el
+  módulo json de la biblioteca estándar que usa DRF por defecto).
+- MessagePackRenderer / MessagePackParser: formato binario compacto,
+  negociado con `Accept: application/msgpack` o `?format=msgpack`.
+
+orjson y msgpack se importan en el primer uso y no al cargar los settings
+de DRF: el arranque (ver startup_report) no paga por un formato que la
+petición no pide.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """
+    Tipos que orjson/msgpack no conocen (Decimal, lazy strings, UUID en
+    msgpack, etc.) se convierten igual que en el JSONEncoder de DRF.
+    """
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None  # orjson siempre produce UTF-8
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import orjson
+
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONParser(BaseParser):
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import orjson
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import msgpack
+
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError,
+                ValueError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
@@ -1,6 +1,10 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
-from recipes.models import Taxonomy, Facet, Term, Recipe, RecipeTerm
+from recipes.models import (
+    Taxonomy, Facet, Term, Recipe, RecipeTerm, RecipeSimilarity, SavedSearch, SavedSearchMatch,
+)
+from recipes.percolator import set_search_terms
 
 
 class TaxonomySerializer(serializers.ModelSerializer):
@@ -67,15 +71,61 @@ class FacetTermsTreeSerializer(serializers.ModelSerializer):
         root_terms = obj.terms.filter(parent__isnull=True).order_by("order", "name")
         return TermTreeSerializer(root_terms, many=True).data
 
+# Contadores internos de recipes/popularity.py: no forman parte de la API
+RECIPE_COUNTER_FIELDS = ("view_count", "impression_count", "popularity")
+
+
 class RecipeListSerializer(serializers.ModelSerializer):
     """
     Serializer para la lista de recetas (sin facet_terms).
+    Para listas de solo lectura usar `from_values`, que produce la misma
+    salida sin instanciar modelos ni campos por fila.
     """
     image = serializers.SerializerMethodField()
 
+    # Mismo orden de campos que produce el ModelSerializer (Meta.exclude)
+    VALUES_FIELDS = (
+        "id", "image", "title", "slug", "description", "instructions",
+        "ingredients_text", "created_at", "updated_at",
+    )
+
     class Meta:
         model = Recipe
-        fields = "__all__"
+        exclude = RECIPE_COUNTER_FIELDS
+
+    @classmethod
+    def from_values(cls, queryset, request=None) -> list[dict]:
+        """
+        Camino rápido de solo lectura: construye dicts planos a partir de
+        `queryset.values()` con 2 consultas en total (recetas + términos),
+        en lugar de un SerializerMethodField y una consulta M2M por fila.
+        """
+        rows = list(queryset.values(*cls.VALUES_FIELDS))
+        if not rows:
+            return []
+
+        terms_by_recipe: dict[int, list[int]] = {}
+        for recipe_id, term_id in RecipeTerm.objects.filter(
+            recipe_id__in=[row["id"] for row in rows]
+        ).order_by(
+            "term__facet", "term__parent__id", "term__order", "term__name"
+        ).values_list("recipe_id", "term_id"):
+            terms_by_recipe.setdefault(recipe_id, []).append(term_id)
+
+        storage = Recipe._meta.get_field("image").storage
+        base_uri = request.build_absolute_uri("/")[:-1] if request else ""
+        to_datetime = serializers.DateTimeField().to_representation
+
+        for row in rows:
+            if row["image"]:
+                url = storage.url(row["image"])
+                row["image"] = base_uri + url if url.startswith("/") else url
+            else:
+                row["image"] = None
+            row["created_at"] = to_datetime(row["created_at"])
+            row["updated_at"] = to_datetime(row["updated_at"])
+            row["terms"] = terms_by_recipe.get(row["id"], [])
+        return rows
 
     def get_image(self, obj):
         """
@@ -96,10 +146,33 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     """
     image = serializers.SerializerMethodField()
     facet_terms = serializers.SerializerMethodField()
+    similar = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = "__all__"  # incluye todos los campos + facet_terms
+        exclude = RECIPE_COUNTER_FIELDS  # el resto de los campos + facet_terms + similar
+
+    @staticmethod
+    def prefetch(queryset):
+        """
+        Prepara un queryset para serializar muchas recetas con consultas fijas:
+        recetas + vecinos (JOIN) y un prefetch de términos con su faceta.
+        Los títulos de los vecinos se pasan en el contexto con `similar_recipes`.
+        """
+        return queryset.select_related("similarity").prefetch_related(
+            Prefetch("terms", queryset=Term.objects.select_related("facet"))
+        )
+
+    @staticmethod
+    def similar_recipes(recipes) -> dict:
+        """Una consulta para id/slug/título de los vecinos de todas las recetas."""
+        neighbour_ids = set()
+        for recipe in recipes:
+            try:
+                neighbour_ids.update(recipe_id for recipe_id, _ in recipe.similarity.neighbours)
+            except RecipeSimilarity.DoesNotExist:
+                pass
+        return Recipe.objects.only("id", "slug", "title").in_bulk(neighbour_ids)
 
     def get_image(self, obj):
         """
@@ -120,7 +193,12 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         """
         groups = {}
 
-        for term in obj.terms.select_related("facet"):
+        if "terms" in getattr(obj, "_prefetched_objects_cache", {}):
+            terms = obj.terms.all()  # ver prefetch()
+        else:
+            terms = obj.terms.select_related("facet")
+
+        for term in terms:
             facet = term.facet
             if facet.id not in groups:
                 groups[facet.id] = {
@@ -137,10 +215,94 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
 
         return list(groups.values())
 
+    def get_similar(self, obj):
+        """
+        Recetas similares precalculadas (ver build_similar_recipes).
+        Una lectura por clave primaria + una consulta para títulos/slugs.
+        """
+        try:
+            neighbours = obj.similarity.neighbours
+        except RecipeSimilarity.DoesNotExist:
+            return []
 
+        recipes = self.context.get("similar_recipes")
+        if recipes is None:
+            recipes = Recipe.objects.only("id", "slug", "title").in_bulk(
+                [recipe_id for recipe_id, _ in neighbours]
+            )
+        return [
+            {
+                "id": recipe_id,
+                "slug": recipes[recipe_id].slug,
+                "title": recipes[recipe_id].title,
+                "score": score,
+            }
+            for recipe_id, score in neighbours
+            if recipe_id in recipes
+        ]
+
+
+class PantryMatchSerializer(serializers.Serializer):
+    """
+    Resultado de la búsqueda por despensa: receta + cobertura de ingredientes.
+    """
+    recipe = RecipeListSerializer()
+    coverage = serializers.FloatField()
+    matched = serializers.ListField(child=serializers.CharField())
+    missing = serializers.ListField(child=serializers.CharField())
 
 
 class RecipeTermSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeTerm
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """
+    Búsqueda guardada: mismos parámetros que /api/v1/recipes/ (?q= y ?term=).
+    Al guardar se compila el índice del percolador (recipes/percolator.py).
+    """
+    terms = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Term.objects.all(), required=False
+    )
+
+    class Meta:
+        model = SavedSearch
+        fields = ["id", "name", "q", "terms", "created_at"]
+
+    def validate(self, attrs):
+        q = attrs.get("q", self.instance.q if self.instance else "")
+        if "terms" in attrs:
+            has_terms = bool(attrs["terms"])
+        else:
+            has_terms = bool(self.instance and self.instance.has_terms)
+        if not q.strip() and not has_terms:
+            raise serializers.ValidationError("Indica un texto o al menos un término.")
+        return attrs
+
+    def create(self, validated_data):
+        terms = validated_data.pop("terms", [])
+        search = SavedSearch.objects.create(**validated_data)
+        set_search_terms(search, [term.id for term in terms])
+        return search
+
+    def update(self, instance, validated_data):
+        terms = validated_data.pop("terms", None)
+        instance = super().update(instance, validated_data)
+        if terms is not None:
+            set_search_terms(instance, [term.id for term in terms])
+        return instance
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    """Entrada de la bandeja: receta que coincidió con una búsqueda guardada."""
+    search_name = serializers.CharField(source="search.name", read_only=True)
+    recipe = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ["id", "search", "search_name", "recipe", "created_at", "read_at"]
+
+    def get_recipe(self, obj):
+        return {"id": obj.recipe.id, "slug": obj.recipe.slug, "title": obj.recipe.title}
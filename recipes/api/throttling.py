@@ -0,0 +1,154 @@
+# recipes/api/throttling.py
+"""
+Throttling por cliente y protección contra sobrecarga.
+
+Cada petición se clasifica por costo (`request_cost`):
+
+    - "expensive": búsqueda de texto (?q=), filtros con varios términos
+      (cada término extra suma costo), relevancia y despensa.
+    - "cheap": detalle, árboles, listas sin búsqueda, autocompletado...
+
+CostTokenBucketThrottle: un token bucket por cliente y clase. Las clases
+tienen cubetas separadas, así que agotar las búsquedas no bloquea las
+lecturas baratas. Al vaciarse responde 429 con Retry-After. Las peticiones
+internas de build_snapshot (recipes/snapshot.py) no pasan por las cubetas.
+
+ExpensiveQueryLimitMixin: limita las consultas caras simultáneas por
+proceso. Si el límite está lleno responde 503 con Retry-After de inmediato,
+en lugar de dejar la petición en cola hasta el timeout del worker.
+
+Configuración en settings.API_THROTTLING.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from recipes.internal import is_internal_render
+
+EXPENSIVE = "expensive"
+CHEAP = "cheap"
+
+DEFAULTS = {
+    "BUCKETS": {
+        EXPENSIVE: {"CAPACITY": 30, "REFILL_RATE": 0.5},
+        CHEAP: {"CAPACITY": 300, "REFILL_RATE": 20},
+    },
+    "MAX_EXPENSIVE_IN_FLIGHT": 4,
+    "RETRY_AFTER": 1,
+    "CACHE_ALIAS": "default",
+}
+
+
+def throttling_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "API_THROTTLING", {})}
+
+
+def request_cost(request, view) -> tuple[str, int]:
+    """Clase de costo y tokens que consume la petición."""
+    action = getattr(view, "action", None)
+    params = request.query_params
+    if action == "pantry":
+        return EXPENSIVE, 1
+    if action == "list" and getattr(view, "basename", None) == "recipe":
+        terms = len(params.getlist("term"))
+        if params.get("q", "").strip():
+            return EXPENSIVE, 1 + max(terms - 1, 0)
+        if terms > 1:
+            return EXPENSIVE, terms - 1
+    return CHEAP, 1
+
+
+class CostTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket en la caché compartida: (tokens, última recarga) por
+    cliente y clase. Igual que los throttles de DRF, lee y escribe sin
+    bloqueo: bajo concurrencia puede dejar pasar alguna petición de más.
+    """
+    cache_key_format = "recipes:throttle:{bucket}:{ident}"
+
+    def get_ident(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user-{user.pk}"
+        return super().get_ident(request)
+
+    def allow_request(self, request, view):
+        if is_internal_render(request):
+            return True  # build_snapshot renderiza todo el catálogo de una vez
+        config = throttling_settings()
+        self.bucket, self.cost = request_cost(request, view)
+        bucket = config["BUCKETS"][self.bucket]
+        self.capacity, self.rate = bucket["CAPACITY"], bucket["REFILL_RATE"]
+
+        cache = caches[config["CACHE_ALIAS"]]
+        key = self.cache_key_format.format(bucket=self.bucket, ident=self.get_ident(request))
+        now = time.time()
+        tokens, updated = cache.get(key, (self.capacity, now))
+        self.tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        allowed = self.tokens >= self.cost
+        if allowed:
+            self.tokens -= self.cost
+        cache.set(key, (self.tokens, now), timeout=int(self.capacity / self.rate) + 1)
+        return allowed
+
+    def wait(self):
+        return max(self.cost - self.tokens, 0) / self.rate
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Demasiadas búsquedas en curso, intenta de nuevo en unos segundos."
+    default_code = "overloaded"
+
+    def __init__(self, wait: int, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = wait  # el exception handler de DRF lo envía como Retry-After
+
+
+class ConcurrencyLimiter:
+    """Contador de consultas caras en curso en este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def try_acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+expensive_queries = ConcurrencyLimiter()
+
+
+class ExpensiveQueryLimitMixin:
+    """Para ViewSets con acciones caras (ver request_cost)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)  # autenticación, permisos, throttles
+        if request_cost(request, self)[0] != EXPENSIVE:
+            return
+        config = throttling_settings()
+        if not expensive_queries.try_acquire(config["MAX_EXPENSIVE_IN_FLIGHT"]):
+            raise ServiceOverloaded(wait=config["RETRY_AFTER"])
+        self._holds_expensive_slot = True
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if getattr(self, "_holds_expensive_slot", False):
+                self._holds_expensive_slot = False
+                expensive_queries.release()
@@ -0,0 +1,44 @@
+# recipes/api/urls.py
+"""
+Rutas de la API REST (router de DRF), sin las vistas HTML.
+
+recipes/urls.py las monta junto a las vistas HTML; el perfil "api"
+(recipes_core_demo/urls_api.py) las incluye solas para no importar
+recipes.views en cada cold start.
+"""
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from .views import (
+    TaxonomyViewSet,
+    FacetViewSet,
+    TermViewSet,
+    TermTreeViewSet,
+    FacetTermsTreeViewSet,
+    RecipeViewSet,
+    RecipeTermViewSet,
+    AutocompleteViewSet,
+    ChangesViewSet,
+    RefinementsViewSet,
+    SavedSearchViewSet,
+)
+
+app_name = "recipes"
+
+router = DefaultRouter()
+router.register("taxonomies", TaxonomyViewSet, basename="taxonomy")
+router.register("facets", FacetViewSet, basename="facet")
+router.register("terms", TermViewSet, basename="term")           # plano
+router.register("terms-tree", TermTreeViewSet, basename="term-tree")  # árbol
+router.register("facets-terms-tree", FacetTermsTreeViewSet, basename="facet-terms-tree")  # facetas agrupadas
+router.register("recipes", RecipeViewSet, basename="recipe")
+router.register("recipe-terms", RecipeTermViewSet, basename="recipeterm")
+router.register("autocomplete", AutocompleteViewSet, basename="autocomplete")
+router.register("changes", ChangesViewSet, basename="changes")
+router.register("refinements", RefinementsViewSet, basename="refinements")
+router.register("saved-searches", SavedSearchViewSet, basename="saved-search")
+
+urlpatterns = [
+    # API REST (JSON) generada por el router
+    path("v1/", include(router.urls)),
+]
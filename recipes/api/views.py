@@ -1,9 +1,25 @@
 # recipes/api/views.py
-from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
-from recipes.api.filters import RecipeFilter
-from recipes.models import Taxonomy, Facet, Term, Recipe, RecipeTerm
+from recipes.api.pagination import RelevanceCursorPagination
+from recipes.api.throttling import ExpensiveQueryLimitMixin
+from recipes.api.changes import build_change_feed
+from recipes.autocomplete import autocomplete_index
+from recipes.catalog import catalog_store
+from recipes.cooccurrence import cooccurrence_index
+from recipes.popularity import view_counter
+from recipes.search import rank_recipes
+from recipes.internal import is_internal_render
+from recipes.taxonomy import merge_terms, move_subtree, reorder_terms
+from recipes.api.pantry import normalize_pantry, rank_recipes_for_pantry
+from recipes.models import Taxonomy, Facet, Term, Recipe, RecipeTerm, SavedSearch, SavedSearchMatch
 from recipes.api.serializer import (
     TaxonomySerializer,
     FacetSerializer,
@@ -13,19 +29,82 @@ from recipes.api.serializer import (
     RecipeListSerializer,
     RecipeDetailSerializer,
     FacetTermsTreeSerializer,
+    PantryMatchSerializer,
+    SavedSearchSerializer,
+    SavedSearchMatchSerializer,
 )
 
 
-class TaxonomyViewSet(viewsets.ModelViewSet):
+def term_ids_param(request, name: str) -> list[int]:
+    """Ids de ?<name>=1&<name>=2, con el mismo error que un filtro de DRF."""
+    term_ids = []
+    for value in request.query_params.getlist(name):
+        try:
+            term_ids.append(int(value))
+        except ValueError:
+            raise ValidationError({name: [f"“{value}” is not a valid value."]})
+    return term_ids
+
+
+def prune_term_tree(terms: list[dict], allowed: set[int]) -> list[dict]:
+    """Quita los términos fuera de `allowed` (y con ellos sus hijos)."""
+    return [
+        {**term, "children": prune_term_tree(term["children"], allowed)}
+        for term in terms
+        if term["id"] in allowed
+    ]
+
+
+class CatalogReadMixin:
+    """
+    Con CATALOG["ENABLED"] responde list/retrieve desde el catálogo en
+    memoria (recipes/catalog.py) en lugar de la base de datos. Cada ViewSet
+    indica qué parte del catálogo expone con `list_from_catalog` y
+    `retrieve_from_catalog`; la salida es la misma que la de su serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        catalog = catalog_store.get()
+        if catalog is None:
+            return super().list(request, *args, **kwargs)
+        return Response(self.list_from_catalog(catalog, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        catalog = catalog_store.get()
+        if catalog is None:
+            return super().retrieve(request, *args, **kwargs)
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if self.lookup_field == "pk" and not lookup.lstrip("-").isdigit():
+            raise Http404  # igual que get_object_or_404 de DRF con un pk inválido
+        data = self.retrieve_from_catalog(catalog, request, lookup)
+        if data is None:
+            raise Http404(f"No {self.queryset.model._meta.object_name} matches the given query.")
+        return Response(data)
+
+
+class TaxonomyViewSet(CatalogReadMixin, viewsets.ModelViewSet):
     queryset = Taxonomy.objects.all()
     serializer_class = TaxonomySerializer
 
+    def list_from_catalog(self, catalog, request):
+        return catalog.taxonomy_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        return catalog.taxonomy_detail(pk)
 
-class FacetViewSet(viewsets.ModelViewSet):
+
+class FacetViewSet(CatalogReadMixin, viewsets.ModelViewSet):
     queryset = Facet.objects.all().order_by("order","name")
     serializer_class = FacetSerializer
 
-class TermTreeViewSet(viewsets.ReadOnlyModelViewSet):
+    def list_from_catalog(self, catalog, request):
+        return catalog.facet_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        row = catalog.facet_row(pk)
+        return None if row is None else catalog.facet(row)
+
+class TermTreeViewSet(CatalogReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Devuelve solo términos raíz, con sus hijos anidados recursivamente.
     Ideal para construir el árbol de filtros en el frontend.
@@ -33,7 +112,16 @@ class TermTreeViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Term.objects.filter(parent__isnull=True).order_by("facet", "order", "name")
     serializer_class = TermTreeSerializer
 
-class FacetTermsTreeViewSet(viewsets.ReadOnlyModelViewSet):
+    def list_from_catalog(self, catalog, request):
+        return catalog.term_tree_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        row = catalog.term_row(pk)
+        if row is None or catalog.term(row)["parent"] is not None:
+            return None
+        return catalog.term_tree(row)
+
+class FacetTermsTreeViewSet(CatalogReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet que devuelve facetas con sus términos agrupados jerárquicamente.
 
@@ -74,20 +162,127 @@ class FacetTermsTreeViewSet(viewsets.ReadOnlyModelViewSet):
     ).order_by("order", "name")
     serializer_class = FacetTermsTreeSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        /api/v1/facets-terms-tree/?context_term=3
+
+        Con ?context_term= solo quedan los términos que darían al menos una
+        receta combinados con la selección (ver recipes/cooccurrence.py). Las
+        facetas de la selección se devuelven completas: sus términos se suman
+        con OR y nunca dejan el resultado vacío.
+        """
+        response = super().list(request, *args, **kwargs)
+        context_terms = term_ids_param(request, "context_term")
+        if context_terms:
+            _, counts = cooccurrence_index.counts_for(context_terms)
+            selected = cooccurrence_index.selected_facets(context_terms)
+            response.data = [
+                facet if facet["id"] in selected
+                else {**facet, "terms": prune_term_tree(facet["terms"], set(counts))}
+                for facet in response.data
+            ]
+        return response
+
+    def list_from_catalog(self, catalog, request):
+        return catalog.facet_terms_tree_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        row = catalog.facet_row(pk)
+        return None if row is None else catalog.facet_terms_tree(row)
 
 
-class TermViewSet(viewsets.ModelViewSet):
+
+class TermViewSet(CatalogReadMixin, viewsets.ModelViewSet):
+    """
+    Además del CRUD, reorganización en bloque (solo staff, ver recipes/taxonomy.py):
+
+        POST /api/v1/terms/{id}/move/   {"parent": 12}  o  {"parent": null, "facet": 3}
+        POST /api/v1/terms/{id}/merge/  {"into": 12}
+        POST /api/v1/terms/reorder/     {"ids": [5, 3, 4]}
+    """
     queryset = Term.objects.all()
     serializer_class = TermSerializer
 
+    def list_from_catalog(self, catalog, request):
+        return catalog.term_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        row = catalog.term_row(pk)
+        return None if row is None else catalog.term(row)
+
+    @staticmethod
+    def id_param(data, name, required=True):
+        value = data.get(name)
+        if value is None and not required:
+            return None
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValidationError({name: ["Debe ser el id de un término."]})
+        return value
+
+    @staticmethod
+    def term_pk(pk) -> int:
+        # El pk llega de la URL sin validar: "abc" es un término inexistente
+        if not (pk.isascii() and pk.isdigit()):
+            raise Http404
+        return int(pk)
+
+    def reorganize(self, operation, *args):
+        try:
+            return operation(*args)
+        except DjangoValidationError as exc:
+            raise ValidationError(exc.message_dict)
+
+    @action(detail=True, methods=["post"], permission_classes=[permissions.IsAdminUser])
+    def move(self, request, pk=None):
+        if "parent" not in request.data:
+            raise ValidationError({"parent": ["Este campo es requerido."]})
+        subtree = self.reorganize(
+            move_subtree,
+            self.term_pk(pk),
+            self.id_param(request.data, "parent", required=False),
+            self.id_param(request.data, "facet", required=False),
+        )
+        return Response({"moved": len(subtree)})
 
+    @action(detail=True, methods=["post"], permission_classes=[permissions.IsAdminUser])
+    def merge(self, request, pk=None):
+        into = self.id_param(request.data, "into")
+        relinked = self.reorganize(merge_terms, self.term_pk(pk), into)
+        return Response({"into": into, "relinked": relinked})
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["post"], permission_classes=[permissions.IsAdminUser])
+    def reorder(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list) or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in ids
+        ):
+            raise ValidationError({"ids": ["Debe ser una lista de enteros."]})
+        self.reorganize(reorder_terms, ids)
+        return Response({"reordered": len(ids)})
+
+
+
+class RecipeViewSet(ExpensiveQueryLimitMixin, CatalogReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     lookup_field = 'slug'
+    BATCH_MAX_SLUGS = 100
+
+    # django_filters se importa en el primer listado y no al arrancar el
+    # proceso: en serverless cada cold start paga todos los imports.
+    # Los filtros solo aplican a la lista, no a la búsqueda por slug.
+    @property
+    def filter_backends(self):
+        if self.action != "list":
+            return []
+        from django_filters.rest_framework import DjangoFilterBackend
+
+        return [DjangoFilterBackend]
+
+    @property
+    def filterset_class(self):
+        from recipes.api.filters import RecipeFilter
 
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = RecipeFilter
+        return RecipeFilter
 
     def get_serializer_class(self):
         # Para el detalle (retrieve) usamos el serializer con facet_terms
@@ -96,7 +291,318 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # Para lista, create, update, etc., usamos el serializer simple
         return RecipeListSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        /api/v1/recipes/?q=pollo&ordering=relevance
+
+        Con ordering=relevance los resultados se ordenan por BM25 (título >
+        ingredientes > descripción > instrucciones) y se paginan por cursor.
+        Se combina con ?term=... igual que la búsqueda normal.
+
+        Sin relevancia, la lista se arma con RecipeListSerializer.from_values
+        (dicts planos desde values(), sin overhead por campo).
+
+        /api/v1/recipes/?ordering=newest|updated|title|popular
+        Órdenes respaldados por índices (ver Recipe.ORDERINGS); popular usa
+        las vistas con decaimiento de recipes/popularity.py.
+        """
+        query = request.query_params.get("q", "").strip()
+        if query and request.query_params.get("ordering") == "relevance":
+            return self.relevance_list(request, query)
+
+        catalog = catalog_store.get()
+        if catalog is not None:
+            data = self.list_from_catalog(catalog, request)
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            ordering = request.query_params.get("ordering")
+            if ordering in Recipe.ORDERINGS:
+                queryset = queryset.order_by(*Recipe.ORDERINGS[ordering])
+            data = RecipeListSerializer.from_values(queryset, request)
+        if not is_internal_render(request):
+            view_counter.record_impressions(row["id"] for row in data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if not is_internal_render(request):  # build_snapshot no es una visita
+            view_counter.record_view(response.data["id"])
+        return response
+
+    def list_from_catalog(self, catalog, request):
+        """Mismos filtros (?q=, ?term=) y errores que RecipeFilter."""
+        term_rows = []
+        for term_id in term_ids_param(request, "term"):
+            row = catalog.term_row(term_id)
+            if row is None:
+                raise ValidationError({
+                    "term": [f"Select a valid choice. {term_id} is not one of the available choices."]
+                })
+            term_rows.append(row)
+
+        rows = catalog.filter_recipes(request.query_params.get("q", "").strip(), term_rows)
+        ordering = request.query_params.get("ordering")
+        if ordering in Recipe.ORDERINGS:
+            rows = catalog.order_recipes(rows, ordering)
+        base_uri = request.build_absolute_uri("/")[:-1]
+        return [catalog.recipe(row, base_uri) for row in rows]
+
+    def retrieve_from_catalog(self, catalog, request, slug):
+        return catalog.recipe_detail(slug, request.build_absolute_uri("/")[:-1])
+
+    def relevance_list(self, request, query):
+        queryset = self.filter_queryset(self.get_queryset())
+        ranked = rank_recipes(query, queryset)
+
+        paginator = RelevanceCursorPagination()
+        page = paginator.paginate_ranked(ranked, request)
+
+        scores = dict(page)
+        rows = {
+            row["id"]: row
+            for row in RecipeListSerializer.from_values(
+                Recipe.objects.filter(id__in=scores), request
+            )
+        }
+        data = [
+            {**rows[recipe_id], "score": score}
+            for recipe_id, score in page
+            if recipe_id in rows
+        ]
+        if not is_internal_render(request):
+            view_counter.record_impressions(row["id"] for row in data)
+        return paginator.get_paginated_response(data)
 
-class RecipeTermViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"], url_path="batch")
+    def batch(self, request):
+        """
+        /api/v1/recipes/batch/?slugs=flan,mole,tamales
+
+        Detalle completo (igual que /recipes/<slug>/) de varias recetas en una
+        sola llamada, con un número fijo de consultas sin importar cuántas
+        sean. Respeta el orden pedido e informa los slugs que no existen:
+
+            {"results": [{...}, {...}], "missing": ["tamales"]}
+        """
+        slugs = []
+        for value in request.query_params.getlist("slugs"):
+            for slug in value.split(","):
+                slug = slug.strip()
+                if slug and slug not in slugs:
+                    slugs.append(slug)
+        if not slugs:
+            raise ValidationError({"slugs": ["Indica al menos un slug."]})
+        if len(slugs) > self.BATCH_MAX_SLUGS:
+            raise ValidationError({"slugs": [f"Máximo {self.BATCH_MAX_SLUGS} slugs por llamada."]})
+
+        catalog = catalog_store.get()
+        if catalog is not None:
+            base_uri = request.build_absolute_uri("/")[:-1]
+            found = {slug: catalog.recipe_detail(slug, base_uri) for slug in slugs}
+            found = {slug: data for slug, data in found.items() if data is not None}
+        else:
+            recipes = list(RecipeDetailSerializer.prefetch(Recipe.objects.filter(slug__in=slugs)))
+            context = {
+                **self.get_serializer_context(),
+                "similar_recipes": RecipeDetailSerializer.similar_recipes(recipes),
+            }
+            data = RecipeDetailSerializer(recipes, many=True, context=context).data
+            found = {row["slug"]: row for row in data}
+
+        results = [found[slug] for slug in slugs if slug in found]
+        if not is_internal_render(request):
+            view_counter.record_impressions(row["id"] for row in results)
+        return Response({
+            "results": results,
+            "missing": [slug for slug in slugs if slug not in found],
+        })
+
+    @action(detail=False, methods=["get"], url_path="pantry")
+    def pantry(self, request):
+        """
+        /api/v1/recipes/pantry/?ingredients=huevo,harina,leche&limit=20
+
+        Devuelve recetas ordenadas por cobertura de los ingredientes dados.
+        También acepta ?ingredient=huevo&ingredient=harina.
+        """
+        raw_items = request.query_params.getlist("ingredient")
+        for value in request.query_params.getlist("ingredients"):
+            raw_items.extend(value.split(","))
+        pantry = normalize_pantry(raw_items)
+
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), 100)
+        except ValueError:
+            limit = 20
+
+        matches = rank_recipes_for_pantry(pantry, limit=max(limit, 1))
+        serializer = PantryMatchSerializer(
+            matches, many=True, context=self.get_serializer_context()
+        )
+        return Response({"pantry": pantry, "results": serializer.data})
+
+
+class RecipeTermViewSet(CatalogReadMixin, viewsets.ModelViewSet):
     queryset = RecipeTerm.objects.all()
-    serializer_class = RecipeTermSerializer
\ No newline at end of file
+    serializer_class = RecipeTermSerializer
+
+    def list_from_catalog(self, catalog, request):
+        return catalog.recipe_term_list()
+
+    def retrieve_from_catalog(self, catalog, request, pk):
+        return catalog.recipe_term_detail(pk)
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    Sugerencias para la caja de búsqueda (títulos de recetas y términos).
+
+    Endpoint: /api/v1/autocomplete/?q=pol&limit=10
+
+    Se responde desde un índice de prefijos en memoria, sin consultar la
+    base de datos por cada tecla.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 50)
+        except ValueError:
+            limit = 10
+        return Response(autocomplete_index.suggest(query, limit=max(limit, 1)))
+
+
+class ChangesViewSet(viewsets.ViewSet):
+    """
+    Sincronización incremental del catálogo (ver recipes/api/changes.py).
+
+    Endpoint: /api/v1/changes/?since=0&limit=500
+
+    Se empieza con since=0 y se repite con el "next" de cada respuesta
+    mientras "has_more" sea true.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            since = -1
+        if since < 0:
+            raise ValidationError({"since": ["Debe ser un entero mayor o igual a 0."]})
+        try:
+            limit = min(int(request.query_params.get("limit", 500)), 1000)
+        except ValueError:
+            limit = 500
+        return Response(build_change_feed(since, max(limit, 1), request))
+
+
+class RefinementsViewSet(viewsets.ViewSet):
+    """
+    Sugerencias "refinar por" para la selección actual de términos.
+
+    Endpoint: /api/v1/refinements/?term=3&term=8&limit=10
+
+    {
+        "total": 42,          # recetas que cumplen la selección
+        "results": [
+            {"id": 5, "name": "Pastel", "facet_id": 1, "facet": "Tipo de plato", "count": 17},
+            ...
+        ]
+    }
+
+    Solo se sugieren términos que acotan el resultado (0 < count < total) y
+    de facetas que no están en la selección, ordenados por número de recetas. Se responde desde la matriz de
+    co-ocurrencia en memoria (recipes/cooccurrence.py).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def list(self, request):
+        term_ids = term_ids_param(request, "term")
+        if not term_ids:
+            raise ValidationError({"term": ["Indica al menos un término."]})
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), 50)
+        except ValueError:
+            limit = 10
+
+        total, refinements = cooccurrence_index.refinements(term_ids, limit=max(limit, 1))
+        terms = {
+            row["id"]: row
+            for row in Term.objects.filter(id__in=[term_id for term_id, _ in refinements]).values(
+                "id", "name", "facet_id", facet_name=F("facet__name")
+            )
+        }
+        results = [
+            {
+                "id": term_id,
+                "name": terms[term_id]["name"],
+                "facet_id": terms[term_id]["facet_id"],
+                "facet": terms[term_id]["facet_name"],
+                "count": count,
+            }
+            for term_id, count in refinements
+            if term_id in terms
+        ]
+        return Response({"total": total, "results": results})
+
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    Búsquedas guardadas del usuario y su bandeja de coincidencias.
+
+    Endpoints:
+        /api/v1/saved-searches/                      (CRUD)
+        /api/v1/saved-searches/inbox/?search=3&unread=1&limit=50
+        POST /api/v1/saved-searches/inbox/mark-read/  {"ids": [1, 2]} o {} para todas
+
+    Las coincidencias se registran al crear o re-etiquetar recetas
+    (recipes/percolator.py), no al consultar.
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            SavedSearch.objects.filter(user=self.request.user)
+            .prefetch_related("terms")
+            .order_by("id")
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def inbox_queryset(self, request):
+        matches = SavedSearchMatch.objects.filter(search__user=request.user)
+        search_id = request.query_params.get("search")
+        if search_id:
+            if not search_id.isdigit():
+                raise ValidationError({"search": [f"“{search_id}” is not a valid value."]})
+            matches = matches.filter(search_id=int(search_id))
+        if request.query_params.get("unread") in ("1", "true"):
+            matches = matches.filter(read_at__isnull=True)
+        return matches
+
+    @action(detail=False, methods=["get"], url_path="inbox")
+    def inbox(self, request):
+        try:
+            limit = min(int(request.query_params.get("limit", 50)), 200)
+        except ValueError:
+            limit = 50
+        matches = (
+            self.inbox_queryset(request)
+            .select_related("search", "recipe")
+            .order_by("-id")[:max(limit, 1)]
+        )
+        return Response(SavedSearchMatchSerializer(matches, many=True).data)
+
+    @action(detail=False, methods=["post"], url_path="inbox/mark-read")
+    def mark_read(self, request):
+        matches = self.inbox_queryset(request).filter(read_at__isnull=True)
+        ids = request.data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                raise ValidationError({"ids": ["Debe ser una lista de enteros."]})
+            matches = matches.filter(id__in=ids)
+        return Response({"updated": matches.update(read_at=timezone.now())})
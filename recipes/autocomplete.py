@@ -0,0 +1,244 @@
+"""
+Índice en memoria para autocompletar títulos de recetas y nombres de términos.
+
+Estructura: lista ordenada de (palabra_normalizada, entry_key). Una búsqueda
+por prefijo es un `bisect` + recorrido del rango contiguo de claves, sin tocar
+la base de datos. Las sugerencias se ordenan por popularidad, entendida como
+el número de recetas a las que lleva la sugerencia (1 para una receta, número
+de recetas etiquetadas para un término).
+
+El índice se construye de forma perezosa en la primera consulta y se mantiene
+con las señales de Recipe/Term/Facet/RecipeTerm (ver recipes/signals.py),
+aplicadas después del commit. Para que otros procesos (workers) detecten
+cambios se usa una versión compartida en el cache de Django, que por eso debe
+ser un cache compartido entre procesos (ver recipes/checks.py).
+"""
+import bisect
+import re
+import threading
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .ingredients import strip_accents
+
+VERSION_CACHE_KEY = "recipes:autocomplete:version"
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_words(text: str) -> list[str]:
+    """'Tacos de Pollo' -> ['tacos', 'de', 'pollo']"""
+    return _WORD_RE.findall(strip_accents((text or "").lower()))
+
+
+@dataclass
+class Suggestion:
+    kind: str  # "recipe" | "term"
+    id: int
+    label: str
+    popularity: int | None = 0
+    slug: str | None = None
+    facet_id: int | None = None
+    facet: str | None = None
+    words: list[str] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.kind, self.id)
+
+    def as_dict(self) -> dict:
+        data = {
+            "type": self.kind,
+            "id": self.id,
+            "label": self.label,
+            "popularity": self.popularity,
+        }
+        if self.kind == "recipe":
+            data["slug"] = self.slug
+        else:
+            data["facet_id"] = self.facet_id
+            data["facet"] = self.facet
+        return data
+
+
+class AutocompleteIndex:
+    """
+    Índice de prefijos ordenado. Seguro entre hilos: las escrituras y la
+    reconstrucción se hacen bajo un lock; las lecturas trabajan sobre la
+    lista vigente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: list[tuple[str, tuple[str, int]]] = []
+        self._entries: dict[tuple[str, int], Suggestion] = {}
+        self._version = None
+        self._built = False
+
+    # ---- construcción -------------------------------------------------
+
+    def rebuild(self) -> None:
+        """Carga todas las recetas y términos (2 consultas)."""
+        from .models import Recipe, Term
+
+        # La versión se lee antes que los datos: un cambio publicado durante
+        # la carga deja el índice con una versión vieja y se vuelve a construir
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+
+        entries = {}
+        for recipe_id, title, slug in Recipe.objects.values_list("id", "title", "slug"):
+            entry = Suggestion("recipe", recipe_id, title, popularity=1, slug=slug)
+            entries[entry.key] = entry
+
+        terms = Term.objects.annotate(recipe_count=Count("recipes")).values_list(
+            "id", "name", "facet_id", "facet__name", "recipe_count"
+        )
+        for term_id, name, facet_id, facet_name, recipe_count in terms:
+            entry = Suggestion(
+                "term", term_id, name,
+                popularity=recipe_count, facet_id=facet_id, facet=facet_name,
+            )
+            entries[entry.key] = entry
+
+        keys = []
+        for entry in entries.values():
+            entry.words = normalize_words(entry.label)
+            keys.extend((word, entry.key) for word in set(entry.words))
+        keys.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._version = version
+            self._built = True
+
+    def _ensure_fresh(self) -> None:
+        if not self._built or cache.get(VERSION_CACHE_KEY) != self._version:
+            self.rebuild()
+
+    # ---- cambios incrementales ----------------------------------------
+
+    def _bump_version(self) -> None:
+        """
+        Publica el cambio local. Si otro proceso publicó uno entre medio
+        (la versión no es la anterior + 1), este índice no lo tiene: se marca
+        para reconstruir en lugar de adoptar ese número.
+        """
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # La clave expiró entre add() e incr()
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+            version = 1
+        if self._version is None or version != self._version + 1:
+            self._built = False
+        self._version = version
+
+    def invalidate(self) -> None:
+        """Fuerza una reconstrucción completa en la próxima consulta."""
+        with self._lock:
+            self._built = False
+            self._bump_version()
+
+    def upsert(self, entry: Suggestion) -> None:
+        """
+        Inserta o reemplaza una sugerencia (solo se tocan sus claves).
+        Si `entry.popularity` es None se conserva la popularidad actual.
+        """
+        if not self._built:
+            self._bump_version()
+            return
+        entry.words = normalize_words(entry.label)
+        with self._lock:
+            old = self._entries.get(entry.key)
+            if entry.popularity is None:
+                entry.popularity = old.popularity if old else 0
+            # Copia al escribir: las lecturas en curso siguen con la lista anterior
+            keys = self._without_keys(old)
+            for word in set(entry.words):
+                bisect.insort(keys, (word, entry.key))
+            self._entries[entry.key] = entry
+            self._keys = keys
+            self._bump_version()
+
+    def remove(self, kind: str, obj_id: int) -> None:
+        if not self._built:
+            self._bump_version()
+            return
+        with self._lock:
+            old = self._entries.pop((kind, obj_id), None)
+            self._keys = self._without_keys(old)
+            self._bump_version()
+
+    def add_popularity(self, kind: str, obj_id: int, delta: int) -> None:
+        """Ajusta la popularidad sin reindexar (ej. al etiquetar una receta)."""
+        if not self._built:
+            self._bump_version()
+            return
+        with self._lock:
+            entry = self._entries.get((kind, obj_id))
+            if entry is not None:
+                entry.popularity = max(entry.popularity + delta, 0)
+            self._bump_version()
+
+    def rename_facet(self, facet_id: int, name: str) -> None:
+        if not self._built:
+            self._bump_version()
+            return
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.kind == "term" and entry.facet_id == facet_id:
+                    entry.facet = name
+            self._bump_version()
+
+    def _without_keys(self, entry: Suggestion | None) -> list:
+        keys = list(self._keys)
+        if entry is None:
+            return keys
+        for word in set(entry.words):
+            pos = bisect.bisect_left(keys, (word, entry.key))
+            if pos < len(keys) and keys[pos] == (word, entry.key):
+                del keys[pos]
+        return keys
+
+    # ---- consulta -----------------------------------------------------
+
+    def suggest(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Sugerencias cuyo texto contiene una palabra que empieza con la última
+        palabra de `query` y contiene el resto de palabras como prefijos.
+
+        Example:
+            >>> autocomplete_index.suggest("tacos de po")
+            [{'type': 'recipe', 'label': 'Tacos de pollo', ...}]
+        """
+        words = normalize_words(query)
+        if not words:
+            return []
+        self._ensure_fresh()
+
+        prefix, required = words[-1], words[:-1]
+        keys = self._keys
+        entries = self._entries
+
+        matches = {}
+        pos = bisect.bisect_left(keys, (prefix,))
+        while pos < len(keys) and keys[pos][0].startswith(prefix):
+            entry = entries.get(keys[pos][1])
+            pos += 1
+            if entry is None or entry.key in matches:
+                continue
+            if all(any(w.startswith(r) for w in entry.words) for r in required):
+                matches[entry.key] = entry
+
+        ranked = sorted(
+            matches.values(),
+            key=lambda e: (-e.popularity, len(e.label), e.label),
+        )
+        return [entry.as_dict() for entry in ranked[:limit]]
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,648 @@
+"""
+Catálogo en memoria de solo lectura (modo opcional).
+
+Con `CATALOG["ENABLED"]` las lecturas de la API (listas, detalle, árboles de
+taxonomía y filtros de recetas) se responden desde aquí, sin consultar la base
+de datos. La búsqueda por relevancia y la despensa siguen usando sus índices
+en la BD.
+
+Formato: todo el catálogo son arreglos planos (módulo `array`) más un único
+blob UTF-8 con los textos, guardados en un archivo binario. Cada worker lo abre
+con `mmap`, así las páginas se comparten entre procesos por el page cache del
+sistema operativo en lugar de duplicar objetos Python por proceso. Las filas se
+guardan ya en el orden que devuelve la API y las relaciones (hijos de un
+término, términos de una receta, recetas de un término) como listas CSR
+(`*_indptr` + valores).
+
+Versionado: cada escritura sobre Taxonomy/Facet/Term/Recipe/RecipeTerm (ver
+recipes/signals.py) publica una versión nueva en un archivo junto al snapshot
+(o en el cache de Django si no hay archivo, ver CatalogStore). El siguiente
+lector que ve una versión distinta a la cargada reconstruye desde la BD y
+reescribe el archivo; los demás workers lo vuelven a mapear. Las escrituras masivas (`QuerySet.update`, `bulk_create`) no emiten
+señales: después de ellas hay que llamar a `catalog_store.invalidate()` o
+ejecutar `python manage.py build_catalog`.
+
+Configuración (settings.CATALOG):
+    ENABLED         Responder las lecturas desde el catálogo
+    SNAPSHOT_PATH   Archivo compartido entre workers (None = solo en memoria)
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import uuid
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = "recipes:catalog:version"
+
+DEFAULT_SETTINGS = {
+    "ENABLED": False,
+    "SNAPSHOT_PATH": None,
+}
+
+MAGIC = b"RCAT"
+FORMAT_VERSION = 1
+NULL = -1  # referencia vacía en las columnas enteras (parent, image, slug)
+
+
+def get_catalog_settings() -> dict:
+    return {**DEFAULT_SETTINGS, **getattr(settings, "CATALOG", {})}
+
+
+# ---- construcción -----------------------------------------------------------
+
+
+class _StringTable:
+    """Textos deduplicados en un blob UTF-8 + offsets."""
+
+    def __init__(self):
+        self.offsets = array("q", [0])
+        self.blob = bytearray()
+        self._index: dict[str, int] = {}
+
+    def add(self, text: str | None) -> int:
+        if text is None:
+            return NULL
+        index = self._index.get(text)
+        if index is None:
+            self.blob += text.encode()
+            self.offsets.append(len(self.blob))
+            index = self._index[text] = len(self.offsets) - 2
+        return index
+
+
+def _csr(groups: list[list[int]]) -> tuple[array, array]:
+    indptr = array("q", [0])
+    values = array("q")
+    for group in groups:
+        values.extend(group)
+        indptr.append(len(values))
+    return indptr, values
+
+
+def _rows_by_id(ids: list[int]) -> array:
+    return array("q", sorted(range(len(ids)), key=ids.__getitem__))
+
+
+def build_columns() -> dict[str, array]:
+    """Lee el catálogo completo (6 consultas) y lo convierte en arreglos."""
+    from rest_framework.fields import DateTimeField
+
+    from .models import Facet, Recipe, RecipeSimilarity, RecipeTerm, Taxonomy, Term
+
+    strings = _StringTable()
+    columns: dict[str, array] = {}
+
+    # Taxonomías: por id (el ViewSet no define orden)
+    taxonomies = list(Taxonomy.objects.order_by("id").values_list("id", "name"))
+    columns["taxonomy_id"] = array("q", [t[0] for t in taxonomies])
+    columns["taxonomy_name"] = array("q", [strings.add(t[1]) for t in taxonomies])
+
+    # Facetas: Meta.ordering ("order", "name")
+    facets = sorted(
+        Facet.objects.values_list("id", "taxonomy_id", "name", "description", "order"),
+        key=lambda f: (f[4], f[2], f[0]),
+    )
+    facet_row = {facet[0]: row for row, facet in enumerate(facets)}
+    columns["facet_id"] = array("q", [f[0] for f in facets])
+    columns["facet_taxonomy"] = array("q", [f[1] for f in facets])
+    columns["facet_name"] = array("q", [strings.add(f[2]) for f in facets])
+    columns["facet_description"] = array("q", [strings.add(f[3]) for f in facets])
+    columns["facet_order"] = array("q", [f[4] for f in facets])
+    columns["facet_rows_by_id"] = _rows_by_id([f[0] for f in facets])
+
+    # Términos: Meta.ordering ("facet", "parent__id", "order", "name"),
+    # donde "facet" se expande al orden de Facet
+    terms = sorted(
+        Term.objects.values_list("id", "facet_id", "parent_id", "name", "description", "order"),
+        key=lambda t: (facet_row[t[1]], t[2] is not None, t[2] or 0, t[5], t[3], t[0]),
+    )
+    term_row = {term[0]: row for row, term in enumerate(terms)}
+    columns["term_id"] = array("q", [t[0] for t in terms])
+    columns["term_facet"] = array("q", [t[1] for t in terms])
+    columns["term_parent"] = array("q", [NULL if t[2] is None else t[2] for t in terms])
+    columns["term_name"] = array("q", [strings.add(t[3]) for t in terms])
+    columns["term_description"] = array("q", [strings.add(t[4]) for t in terms])
+    columns["term_order"] = array("q", [t[5] for t in terms])
+    columns["term_rows_by_id"] = _rows_by_id([t[0] for t in terms])
+
+    # Árbol: hijos de cada término y raíces de cada faceta, por ("order", "name")
+    children: list[list[int]] = [[] for _ in terms]
+    roots: list[list[int]] = [[] for _ in facets]
+    for row, term in sorted(enumerate(terms), key=lambda item: (item[1][5], item[1][3], item[1][0])):
+        if term[2] is None:
+            roots[facet_row[term[1]]].append(row)
+        else:
+            children[term_row[term[2]]].append(row)
+    columns["term_children_indptr"], columns["term_children"] = _csr(children)
+    columns["facet_roots_indptr"], columns["facet_roots"] = _csr(roots)
+
+    # Recetas: por id
+    to_datetime = DateTimeField().to_representation
+    recipes = list(Recipe.objects.order_by("id").values_list(
+        "id", "title", "slug", "description", "instructions", "ingredients_text",
+        "image", "created_at", "updated_at", "popularity",
+    ))
+    recipe_row = {recipe[0]: row for row, recipe in enumerate(recipes)}
+    columns["recipe_id"] = array("q", [r[0] for r in recipes])
+    for position, name in enumerate(
+        ("title", "slug", "description", "instructions", "ingredients_text"), start=1
+    ):
+        columns[f"recipe_{name}"] = array("q", [strings.add(r[position]) for r in recipes])
+    columns["recipe_image"] = array("q", [strings.add(r[6] or None) for r in recipes])
+    columns["recipe_created_at"] = array("q", [strings.add(to_datetime(r[7])) for r in recipes])
+    columns["recipe_updated_at"] = array("q", [strings.add(to_datetime(r[8])) for r in recipes])
+    columns["recipe_rows_by_slug"] = array("q", sorted(
+        (row for row, r in enumerate(recipes) if r[2] is not None),
+        key=lambda row: recipes[row][2],
+    ))
+
+    # Posición de cada receta en cada orden de la API (Recipe.ORDERINGS)
+    positions = {"id": 0, "title": 1, "created_at": 7, "updated_at": 8, "popularity": 9}
+    for ordering, fields in Recipe.ORDERINGS.items():
+        order = list(range(len(recipes)))
+        for field in reversed(fields):
+            position = positions[field.lstrip("-")]
+            order.sort(key=lambda row: recipes[row][position], reverse=field.startswith("-"))
+        rank = [0] * len(recipes)
+        for place, row in enumerate(order):
+            rank[row] = place
+        columns[f"recipe_rank_{ordering}"] = array("q", rank)
+
+    # Etiquetas: términos por receta (orden de Term) y recetas por término
+    links = list(RecipeTerm.objects.order_by("id").values_list("id", "recipe_id", "term_id"))
+    columns["recipe_term_id"] = array("q", [link[0] for link in links])
+    columns["recipe_term_recipe"] = array("q", [link[1] for link in links])
+    columns["recipe_term_term"] = array("q", [link[2] for link in links])
+
+    terms_of: list[list[int]] = [[] for _ in recipes]
+    recipes_of: list[list[int]] = [[] for _ in terms]
+    for _, recipe_id, term_id in links:
+        terms_of[recipe_row[recipe_id]].append(term_row[term_id])
+        recipes_of[term_row[term_id]].append(recipe_row[recipe_id])
+    columns["recipe_terms_indptr"], columns["recipe_terms"] = _csr([sorted(g) for g in terms_of])
+    columns["term_recipes_indptr"], columns["term_recipes"] = _csr([sorted(g) for g in recipes_of])
+
+    # Similares precalculados (solo vecinos que siguen existiendo)
+    neighbours: list[list] = [[] for _ in recipes]
+    for recipe_id, stored in RecipeSimilarity.objects.values_list("recipe_id", "neighbours"):
+        if recipe_id in recipe_row:
+            neighbours[recipe_row[recipe_id]] = [
+                (recipe_row[other_id], score) for other_id, score in stored if other_id in recipe_row
+            ]
+    columns["similar_indptr"], columns["similar_rows"] = _csr(
+        [[row for row, _ in group] for group in neighbours]
+    )
+    columns["similar_scores"] = array("d", [score for group in neighbours for _, score in group])
+
+    columns["strings_offsets"] = strings.offsets
+    columns["strings_blob"] = array("B", strings.blob)
+    return columns
+
+
+def dump(columns: dict[str, array], version: str) -> bytes:
+    """
+    Serializa los arreglos:
+        MAGIC | largo del header (uint32) | header JSON | arreglos alineados a 8 bytes
+    """
+    header = {"format": FORMAT_VERSION, "version": version, "arrays": {}}
+    chunks = []
+    offset = 0
+    for name, values in columns.items():
+        data = values.tobytes()
+        data += b"\0" * (-len(data) % 8)
+        header["arrays"][name] = [values.typecode, offset, len(values)]
+        chunks.append(data)
+        offset += len(data)
+
+    raw_header = json.dumps(header).encode()
+    raw_header += b" " * (-(len(MAGIC) + 4 + len(raw_header)) % 8)
+    return MAGIC + struct.pack("<I", len(raw_header)) + raw_header + b"".join(chunks)
+
+
+# ---- lectura ----------------------------------------------------------------
+
+
+class Catalog:
+    """
+    Vista de solo lectura sobre un snapshot serializado con `dump` (bytes o
+    mmap). Los métodos públicos devuelven exactamente los mismos dicts que
+    los serializers de recipes/api/serializer.py.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("No es un snapshot del catálogo.")
+        (header_size,) = struct.unpack_from("<I", view, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(view[start:start + header_size]))
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError("Formato de snapshot incompatible.")
+
+        self.version = header["version"]
+        self.size = len(view)
+        base = start + header_size
+        for name, (typecode, offset, count) in header["arrays"].items():
+            end = base + offset + count * array(typecode).itemsize
+            setattr(self, name, view[base + offset:end].cast(typecode))
+
+    # ---- utilidades -----------------------------------------------------
+
+    def _text(self, index: int) -> str | None:
+        if index == NULL:
+            return None
+        return str(self.strings_blob[self.strings_offsets[index]:self.strings_offsets[index + 1]], "utf-8")
+
+    @staticmethod
+    def _find(ids, rows_by_id, pk) -> int | None:
+        """Fila con id `pk` usando el índice ordenado `rows_by_id`."""
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        pos = bisect_left(range(len(rows_by_id)), pk, key=lambda i: ids[rows_by_id[i]])
+        if pos < len(rows_by_id) and ids[rows_by_id[pos]] == pk:
+            return rows_by_id[pos]
+        return None
+
+    def _recipe_row_by_slug(self, slug: str) -> int | None:
+        rows = self.recipe_rows_by_slug
+        pos = bisect_left(range(len(rows)), slug, key=lambda i: self._text(self.recipe_slug[rows[i]]))
+        if pos < len(rows) and self._text(self.recipe_slug[rows[pos]]) == slug:
+            return rows[pos]
+        return None
+
+    def term_row(self, pk) -> int | None:
+        return self._find(self.term_id, self.term_rows_by_id, pk)
+
+    def facet_row(self, pk) -> int | None:
+        return self._find(self.facet_id, self.facet_rows_by_id, pk)
+
+    # ---- taxonomía ------------------------------------------------------
+
+    def taxonomy(self, row: int) -> dict:
+        return {"id": self.taxonomy_id[row], "name": self._text(self.taxonomy_name[row])}
+
+    def taxonomy_list(self) -> list[dict]:
+        return [self.taxonomy(row) for row in range(len(self.taxonomy_id))]
+
+    def taxonomy_detail(self, pk) -> dict | None:
+        row = self._find(self.taxonomy_id, range(len(self.taxonomy_id)), pk)
+        return None if row is None else self.taxonomy(row)
+
+    def facet(self, row: int) -> dict:
+        return {
+            "id": self.facet_id[row],
+            "name": self._text(self.facet_name[row]),
+            "description": self._text(self.facet_description[row]),
+            "order": self.facet_order[row],
+            "taxonomy": self.facet_taxonomy[row],
+        }
+
+    def facet_list(self) -> list[dict]:
+        return [self.facet(row) for row in range(len(self.facet_id))]
+
+    def term(self, row: int) -> dict:
+        parent = self.term_parent[row]
+        return {
+            "id": self.term_id[row],
+            "name": self._text(self.term_name[row]),
+            "description": self._text(self.term_description[row]),
+            "order": self.term_order[row],
+            "facet": self.term_facet[row],
+            "parent": None if parent == NULL else parent,
+        }
+
+    def term_list(self) -> list[dict]:
+        return [self.term(row) for row in range(len(self.term_id))]
+
+    def term_tree(self, row: int) -> dict:
+        """Igual que TermTreeSerializer: término con sus hijos recursivamente."""
+        start, end = self.term_children_indptr[row], self.term_children_indptr[row + 1]
+        return {
+            "id": self.term_id[row],
+            "name": self._text(self.term_name[row]),
+            "description": self._text(self.term_description[row]),
+            "order": self.term_order[row],
+            "children": [self.term_tree(child) for child in self.term_children[start:end]],
+        }
+
+    def _roots_of(self, facet_row: int):
+        return self.facet_roots[self.facet_roots_indptr[facet_row]:self.facet_roots_indptr[facet_row + 1]]
+
+    def term_tree_list(self) -> list[dict]:
+        """Raíces ordenadas por ("facet", "order", "name")."""
+        return [
+            self.term_tree(root)
+            for facet_row in range(len(self.facet_id))
+            for root in self._roots_of(facet_row)
+        ]
+
+    def facet_terms_tree(self, row: int) -> dict:
+        return {
+            "id": self.facet_id[row],
+            "name": self._text(self.facet_name[row]),
+            "description": self._text(self.facet_description[row]),
+            "order": self.facet_order[row],
+            "terms": [self.term_tree(root) for root in self._roots_of(row)],
+        }
+
+    def facet_terms_tree_list(self) -> list[dict]:
+        return [self.facet_terms_tree(row) for row in range(len(self.facet_id))]
+
+    def expand_terms(self, term_rows) -> set[int]:
+        """Filas de los términos dados + todos sus descendientes."""
+        expanded = set(term_rows)
+        queue = list(expanded)
+        while queue:
+            row = queue.pop()
+            for child in self.term_children[self.term_children_indptr[row]:self.term_children_indptr[row + 1]]:
+                if child not in expanded:
+                    expanded.add(child)
+                    queue.append(child)
+        return expanded
+
+    # ---- recetas --------------------------------------------------------
+
+    def _terms_of(self, row: int):
+        return self.recipe_terms[self.recipe_terms_indptr[row]:self.recipe_terms_indptr[row + 1]]
+
+    def _image_url(self, row: int, base_uri: str) -> str | None:
+        name = self._text(self.recipe_image[row])
+        if name is None:
+            return None
+        from .models import Recipe
+
+        url = Recipe._meta.get_field("image").storage.url(name)
+        return base_uri + url if url.startswith("/") else url
+
+    def recipe(self, row: int, base_uri: str = "") -> dict:
+        """Igual que RecipeListSerializer."""
+        return {
+            "id": self.recipe_id[row],
+            "image": self._image_url(row, base_uri),
+            "title": self._text(self.recipe_title[row]),
+            "slug": self._text(self.recipe_slug[row]),
+            "description": self._text(self.recipe_description[row]),
+            "instructions": self._text(self.recipe_instructions[row]),
+            "ingredients_text": self._text(self.recipe_ingredients_text[row]),
+            "created_at": self._text(self.recipe_created_at[row]),
+            "updated_at": self._text(self.recipe_updated_at[row]),
+            "terms": [self.term_id[term] for term in self._terms_of(row)],
+        }
+
+    def recipe_detail(self, slug: str, base_uri: str = "") -> dict | None:
+        """Igual que RecipeDetailSerializer (facet_terms + similar)."""
+        row = self._recipe_row_by_slug(slug)
+        if row is None:
+            return None
+
+        groups: dict[int, dict] = {}
+        for term in self._terms_of(row):
+            facet_id = self.term_facet[term]
+            if facet_id not in groups:
+                groups[facet_id] = {
+                    "facet_id": facet_id,
+                    "facet_name": self._text(self.facet_name[self.facet_row(facet_id)]),
+                    "terms": [],
+                }
+            groups[facet_id]["terms"].append(
+                {"id": self.term_id[term], "name": self._text(self.term_name[term])}
+            )
+
+        start, end = self.similar_indptr[row], self.similar_indptr[row + 1]
+        similar = [
+            {
+                "id": self.recipe_id[other],
+                "slug": self._text(self.recipe_slug[other]),
+                "title": self._text(self.recipe_title[other]),
+                "score": score,
+            }
+            for other, score in zip(self.similar_rows[start:end], self.similar_scores[start:end])
+        ]
+
+        data = self.recipe(row, base_uri)
+        return {
+            "id": data.pop("id"),
+            "image": data.pop("image"),
+            "facet_terms": list(groups.values()),
+            "similar": similar,
+            **data,
+        }
+
+    def filter_recipes(self, query: str = "", term_rows=None) -> list[int]:
+        """
+        Filas de recetas (en orden de id) que cumplen los mismos filtros que
+        RecipeFilter: texto en cualquiera de los 4 campos y, por cada faceta
+        de los términos dados, al menos uno de ellos o de sus descendientes.
+        """
+        if term_rows:
+            groups: dict[int, list[int]] = {}
+            for term in term_rows:
+                groups.setdefault(self.term_facet[term], []).append(term)
+            # OR dentro de cada faceta, AND entre facetas (ver recipes/faceting.py)
+            rows = None
+            for group in groups.values():
+                matched = set()
+                for term in self.expand_terms(group):
+                    matched.update(self.term_recipes[self.term_recipes_indptr[term]:self.term_recipes_indptr[term + 1]])
+                rows = matched if rows is None else rows & matched
+            rows = sorted(rows)
+        else:
+            rows = range(len(self.recipe_id))
+
+        query = query.lower()
+        if not query:
+            return list(rows)
+        fields = (
+            self.recipe_title, self.recipe_description,
+            self.recipe_ingredients_text, self.recipe_instructions,
+        )
+        return [
+            row for row in rows
+            if any(query in (self._text(field[row]) or "").lower() for field in fields)
+        ]
+
+    def order_recipes(self, rows, ordering: str) -> list[int]:
+        """Ordena filas de recetas según uno de Recipe.ORDERINGS."""
+        rank = getattr(self, f"recipe_rank_{ordering}")
+        return sorted(rows, key=rank.__getitem__)
+
+    def recipe_term(self, row: int) -> dict:
+        return {
+            "id": self.recipe_term_id[row],
+            "recipe": self.recipe_term_recipe[row],
+            "term": self.recipe_term_term[row],
+        }
+
+    def recipe_term_list(self) -> list[dict]:
+        return [self.recipe_term(row) for row in range(len(self.recipe_term_id))]
+
+    def recipe_term_detail(self, pk) -> dict | None:
+        row = self._find(self.recipe_term_id, range(len(self.recipe_term_id)), pk)
+        return None if row is None else self.recipe_term(row)
+
+
+def open_snapshot(path) -> Catalog | None:
+    """Mapea el archivo en memoria; None si no existe o no es válido."""
+    try:
+        with open(path, "rb") as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):  # ValueError: archivo vacío
+        return None
+    try:
+        return Catalog(buffer)
+    except (ValueError, KeyError, struct.error):
+        return None
+
+
+def write_snapshot(path, data: bytes) -> None:
+    """Escritura atómica: los lectores ven el archivo viejo o el nuevo."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+
+# ---- versión compartida -----------------------------------------------------
+#
+# Con SNAPSHOT_PATH la versión vigente se publica en un archivo junto al
+# snapshot (`<SNAPSHOT_PATH>.version`), reemplazado de forma atómica en cada
+# invalidación: todos los workers de la máquina lo ven sin depender del
+# backend del cache. Cada lectura hace un stat(); el archivo solo se vuelve a
+# leer cuando cambia su inode o su mtime. Un snapshot escrito por un worker
+# que empezó a reconstruir antes de una invalidación queda con la versión
+# vieja en su header y se descarta al compararla.
+#
+# Sin SNAPSHOT_PATH (solo memoria) la versión va en el cache de Django, que
+# debe ser compartido entre procesos (ver recipes/checks.py).
+
+
+def version_stamp_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.name}.version")
+
+
+def write_version_stamp(path, version: str, replace: bool = True) -> None:
+    """
+    Publica la versión. Con replace=False solo si no hay ninguna publicada
+    (equivalente a cache.add: os.link falla si el destino ya existe).
+    """
+    stamp = version_stamp_path(path)
+    stamp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = stamp.with_name(f"{stamp.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(version)
+    try:
+        if replace:
+            tmp.replace(stamp)
+        else:
+            os.link(tmp, stamp)
+    except FileExistsError:
+        pass
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class CatalogStore:
+    """
+    Catálogo vigente del proceso. `get()` cuesta un stat() del archivo de
+    versión (o una lectura del cache sin SNAPSHOT_PATH) por petición; solo
+    cuando la versión cambia se vuelve a mapear el archivo o, si está
+    desactualizado, se reconstruye desde la BD.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Catalog | None = None
+        self._stamp: tuple | None = None  # (inode, mtime, versión) leído por última vez
+
+    def published_version(self, path) -> str | None:
+        if not path:
+            return cache.get(VERSION_CACHE_KEY)
+        stamp = version_stamp_path(path)
+        try:
+            stat = stamp.stat()
+        except FileNotFoundError:
+            return None
+        cached = self._stamp
+        if cached is not None and cached[:2] == (stat.st_ino, stat.st_mtime_ns):
+            return cached[2]
+        try:
+            version = stamp.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+        self._stamp = (stat.st_ino, stat.st_mtime_ns, version)
+        return version
+
+    def publish(self, path, version: str, replace: bool = True) -> None:
+        """
+        Con el modo desactivado no se publica nada: las señales llaman a
+        invalidate() en cada escritura y no deben tocar el disco (en un
+        despliegue de solo lectura fallaría después del commit).
+        """
+        if not get_catalog_settings()["ENABLED"]:
+            return
+        if path:
+            write_version_stamp(path, version, replace=replace)
+        elif replace:
+            cache.set(VERSION_CACHE_KEY, version, timeout=None)
+        else:
+            cache.add(VERSION_CACHE_KEY, version, timeout=None)
+
+    def get(self) -> Catalog | None:
+        """Catálogo actual, o None si el modo está desactivado."""
+        config = get_catalog_settings()
+        if not config["ENABLED"]:
+            return None
+
+        path = config["SNAPSHOT_PATH"]
+        version = self.published_version(path)
+        catalog = self._catalog
+        if catalog is not None and version in (None, catalog.version):
+            return catalog
+
+        with self._lock:
+            catalog = self._catalog
+            if catalog is None or version not in (None, catalog.version):
+                catalog = self._catalog = self._load(version, path)
+            if version is None:
+                self.publish(path, catalog.version, replace=False)
+        return catalog
+
+    def _load(self, version: str | None, path) -> Catalog:
+        if path:
+            catalog = open_snapshot(path)
+            # Sin versión publicada se confía en el archivo existente
+            if catalog is not None and version in (None, catalog.version):
+                return catalog
+        return self.rebuild(version)
+
+    def rebuild(self, version: str | None = None) -> Catalog:
+        """Reconstruye desde la BD y, si hay SNAPSHOT_PATH, reescribe el archivo."""
+        data = dump(build_columns(), version or uuid.uuid4().hex)
+        path = get_catalog_settings()["SNAPSHOT_PATH"]
+        if not path:
+            return Catalog(data)
+        write_snapshot(path, data)
+        return open_snapshot(path)
+
+    def refresh(self) -> Catalog:
+        """Reconstruye ya y publica la versión nueva (comando build_catalog)."""
+        catalog = self._catalog = self.rebuild()
+        self.publish(get_catalog_settings()["SNAPSHOT_PATH"], catalog.version)
+        return catalog
+
+    def invalidate(self) -> None:
+        """Publica una versión nueva: todos los procesos recargan en su próxima lectura."""
+        self.publish(get_catalog_settings()["SNAPSHOT_PATH"], uuid.uuid4().hex)
+
+
+catalog_store = CatalogStore()
@@ -0,0 +1,49 @@
+# recipes/checks.py
+"""
+Checks de arranque (`manage.py check`, runserver, migrate...) y de
+despliegue (`manage.py check --deploy`).
+
+Las invalidaciones entre workers de los índices en memoria viajan por el
+cache de Django. Con un cache local al proceso (LocMemCache, el de por
+omisión) cada worker solo ve sus propias invalidaciones y los demás siguen
+sirviendo datos viejos.
+"""
+from django.core.cache import caches
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_is_process_local(alias: str = "default") -> bool:
+    backend = type(caches[alias])
+    return f"{backend.__module__}.{backend.__qualname__}" in PROCESS_LOCAL_CACHES
+
+
+@register()
+def catalog_cache_check(app_configs, **kwargs):
+    from .catalog import get_catalog_settings
+
+    config = get_catalog_settings()
+    if config["ENABLED"] and not config["SNAPSHOT_PATH"] and cache_is_process_local():
+        return [Warning(
+            "CATALOG sin SNAPSHOT_PATH publica su versión en un cache local al proceso.",
+            hint="Configura SNAPSHOT_PATH o un cache compartido (Redis, Memcached) en CACHES.",
+            id="recipes.W001",
+        )]
+    return []
+
+
+@register(deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    # Solo con `check --deploy`: en desarrollo runserver es un solo proceso
+    if not cache_is_process_local():
+        return []
+    return [Warning(
+        "El cache por omisión es local al proceso: los workers no ven las "
+        "invalidaciones del autocompletado ni de la co-ocurrencia de los demás.",
+        hint="Configura un cache compartido (Redis, Memcached) en CACHES.",
+        id="recipes.W002",
+    )]
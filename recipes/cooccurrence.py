@@ -0,0 +1,291 @@
+# recipes/cooccurrence.py
+"""
+Matriz de co-ocurrencia término×término para sugerencias "refinar por".
+
+    counts[a, b] = número de recetas etiquetadas con a y con b
+
+Cada receta cuenta también para los ancestros de sus términos (una receta
+"Pastel" es también "Postre"), igual que los filtros de recipes/faceting.py,
+así que para un término seleccionado la fila counts[t] es exacta: cuántas
+recetas quedarían al agregar cada otro término. Con varios términos se
+aplica la misma semántica (OR dentro de una faceta, AND entre facetas) sobre
+las listas de recetas por término, también en memoria.
+
+Los términos de una faceta que ya está en la selección no acotan: se suman
+con OR. Su conteo se calcula contra la selección sin esa faceta (cuántas
+recetas aporta cada alternativa), no contra el resultado actual.
+
+La matriz es dispersa: una fila {columna: conteo} por término, solo con los
+pares que aparecen juntos en alguna receta, así que la memoria crece con los
+pares reales y no con n_terms². Se construye de forma perezosa en la primera
+consulta (2 consultas SQL) y se actualiza de forma incremental, después del
+commit, con las señales de RecipeTerm (ver recipes/signals.py): un cambio de
+etiqueta solo toca las filas de los términos de esa receta. Igual que el
+índice de autocompletado, una versión en el cache de Django avisa a los demás
+procesos que deben reconstruirla.
+
+numpy se importa al construir, no al cargar el módulo (ver startup_report).
+"""
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = "recipes:cooccurrence:version"
+
+
+class CooccurrenceIndex:
+    """
+    Matriz de co-ocurrencia y listas de recetas por término. Las escrituras
+    se hacen bajo un lock; una lectura concurrente puede ver un conteo a
+    medio actualizar, nunca una estructura inconsistente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._built = False
+        self.term_ids = []  # columna -> id de término
+        self.column_of: dict[int, int] = {}
+        self.term_facet: list[int] = []
+        self.facet_columns: dict[int, list[int]] = {}  # faceta -> columnas
+        self.ancestors: list[tuple[int, ...]] = []  # columna -> columnas de ella y sus ancestros
+        self.counts: list[dict[int, int]] = []  # columna -> {columna: recetas}
+        self.recipe_terms: dict[int, frozenset[int]] = {}  # receta -> columnas etiquetadas
+        self.postings: list[set[int]] = []  # columna -> recetas (con ancestros)
+
+    # ---- construcción -------------------------------------------------
+
+    def rebuild(self) -> None:
+        """Carga términos y etiquetas (2 consultas) y arma la matriz."""
+        import numpy as np
+
+        from .models import RecipeTerm, Term
+
+        # La versión se lee antes que los datos (ver AutocompleteIndex.rebuild)
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY)
+
+        terms = list(Term.objects.order_by("id").values_list("id", "parent_id", "facet_id"))
+        term_ids = [term[0] for term in terms]
+        column_of = {term_id: column for column, term_id in enumerate(term_ids)}
+        parent_of = {term_id: parent_id for term_id, parent_id, _ in terms}
+
+        ancestors = []
+        for term_id in term_ids:
+            chain, current = [], term_id
+            while current is not None and current in column_of and column_of[current] not in chain:
+                chain.append(column_of[current])
+                current = parent_of[current]
+            ancestors.append(tuple(chain))
+
+        recipe_terms: dict[int, set[int]] = {}
+        for recipe_id, term_id in RecipeTerm.objects.values_list("recipe_id", "term_id"):
+            recipe_terms.setdefault(recipe_id, set()).add(column_of[term_id])
+
+        n_terms = len(term_ids)
+        postings: list[set[int]] = [set() for _ in term_ids]
+        closures = []
+        for recipe_id, columns in recipe_terms.items():
+            closure = self._closure(columns, ancestors)
+            closures.append(closure)
+            for column in closure:
+                postings[column].add(recipe_id)
+
+        # Todos los pares (a, b) de cada receta: cada fila de la matriz
+        # incidencia receta×término contribuye su producto exterior
+        lengths = np.array([len(closure) for closure in closures], dtype=np.int64)
+        flat = np.fromiter(
+            (c for closure in closures for c in closure), dtype=np.int64, count=int(lengths.sum())
+        )
+        element_lengths = np.repeat(lengths, lengths)
+        element_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        offsets = np.cumsum(element_lengths) - element_lengths
+        positions = (
+            np.repeat(element_starts, element_lengths)
+            + np.arange(int(element_lengths.sum())) - np.repeat(offsets, element_lengths)
+        )
+        pairs = np.repeat(flat, element_lengths) * n_terms + flat[positions]
+        # Solo los pares presentes, ordenados por fila: se parten en un dict por fila
+        pairs, pair_counts = np.unique(pairs, return_counts=True)
+        rows = pairs // n_terms
+        bounds = np.searchsorted(rows, np.arange(n_terms + 1))
+        columns, pair_counts = (pairs % n_terms).tolist(), pair_counts.tolist()
+        counts = [
+            dict(zip(columns[start:end], pair_counts[start:end]))
+            for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+        ]
+
+        with self._lock:
+            self.term_ids = term_ids
+            self.column_of = column_of
+            self.term_facet = [term[2] for term in terms]
+            self.facet_columns = {}
+            for column, term in enumerate(terms):
+                self.facet_columns.setdefault(term[2], []).append(column)
+            self.ancestors = ancestors
+            self.counts = counts
+            self.recipe_terms = {recipe_id: frozenset(c) for recipe_id, c in recipe_terms.items()}
+            self.postings = postings
+            self._version = version
+            self._built = True
+
+    @staticmethod
+    def _closure(columns, ancestors) -> tuple[int, ...]:
+        return tuple(sorted({a for column in columns for a in ancestors[column]}))
+
+    def _ensure_fresh(self) -> None:
+        if not self._built or cache.get(VERSION_CACHE_KEY) != self._version:
+            self.rebuild()
+
+    # ---- cambios incrementales ----------------------------------------
+
+    def _bump_version(self) -> None:
+        """
+        Publica el cambio local. Si otro proceso publicó uno entre medio
+        (la versión no es la anterior + 1), la matriz no lo tiene: se marca
+        para reconstruir en lugar de adoptar ese número.
+        """
+        cache.add(VERSION_CACHE_KEY, 0, timeout=None)
+        try:
+            version = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # La clave expiró entre add() e incr()
+            cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+            version = 1
+        if self._version is None or version != self._version + 1:
+            self._built = False
+        self._version = version
+
+    def invalidate(self) -> None:
+        """Fuerza una reconstrucción completa (términos nuevos, cambios de jerarquía)."""
+        with self._lock:
+            self._built = False
+            self._bump_version()
+
+    def tag(self, recipe_id: int, term_id: int) -> None:
+        self._retag(recipe_id, term_id, add=True)
+
+    def untag(self, recipe_id: int, term_id: int) -> None:
+        self._retag(recipe_id, term_id, add=False)
+
+    def _retag(self, recipe_id: int, term_id: int, add: bool) -> None:
+        with self._lock:
+            if not self._built or term_id not in self.column_of:
+                self._built = False
+                self._bump_version()
+                return
+            old = self.recipe_terms.get(recipe_id, frozenset())
+            column = self.column_of[term_id]
+            new = old | {column} if add else old - {column}
+            if new == old:
+                return
+
+            old_closure = self._closure(old, self.ancestors)
+            new_closure = self._closure(new, self.ancestors)
+            for a in old_closure:
+                row = self.counts[a]
+                for b in old_closure:
+                    row[b] -= 1
+                    if not row[b]:
+                        del row[b]
+            for a in new_closure:
+                row = self.counts[a]
+                for b in new_closure:
+                    row[b] = row.get(b, 0) + 1
+            for a in set(old_closure) - set(new_closure):
+                self.postings[a].discard(recipe_id)
+            for a in set(new_closure) - set(old_closure):
+                self.postings[a].add(recipe_id)
+            if new:
+                self.recipe_terms[recipe_id] = new
+            else:
+                self.recipe_terms.pop(recipe_id, None)
+            self._bump_version()
+
+    # ---- consulta -----------------------------------------------------
+
+    def counts_for(self, term_ids) -> tuple[int, dict[int, int]]:
+        """
+        Recetas que cumplen la selección y, para cada término, cuántas de
+        ellas lo tienen: (total, {term_id: count}) sin los conteos en cero.
+        Para los términos de una faceta seleccionada el conteo es contra la
+        selección sin esa faceta (OR dentro de la faceta).
+        Un id desconocido no deja ninguna receta.
+        """
+        self._ensure_fresh()
+        columns = set()
+        for term_id in term_ids:
+            if term_id not in self.column_of:
+                return 0, {}
+            columns.add(self.column_of[term_id])
+        if not columns:
+            return 0, {}
+
+        groups: dict[int, list[int]] = {}
+        for column in columns:
+            groups.setdefault(self.term_facet[column], []).append(column)
+        matching_by_facet = {
+            facet: set().union(*(self.postings[column] for column in group))
+            for facet, group in groups.items()
+        }
+
+        if len(columns) == 1:
+            (column,) = columns
+            total = self.counts[column].get(column, 0)
+            row = dict(self.counts[column])
+        else:
+            matching = set.intersection(*matching_by_facet.values())
+            total = len(matching)
+            row = self._count_terms(matching)
+
+        for facet in groups:
+            others = [recipes for other, recipes in matching_by_facet.items() if other != facet]
+            if others:
+                sideways = self._count_terms(set.intersection(*others))
+            else:
+                sideways = {c: len(self.postings[c]) for c in self.facet_columns[facet]}
+            for column in self.facet_columns[facet]:
+                row[column] = sideways.get(column, 0)
+
+        return total, {
+            self.term_ids[column]: count for column, count in sorted(row.items()) if count
+        }
+
+    def _count_terms(self, recipe_ids) -> dict[int, int]:
+        return Counter(
+            c
+            for recipe_id in recipe_ids
+            for c in self._closure(self.recipe_terms[recipe_id], self.ancestors)
+        )
+
+    def selected_facets(self, term_ids) -> set[int]:
+        """Facetas de los términos dados (se ignoran los ids desconocidos)."""
+        self._ensure_fresh()
+        return {
+            self.term_facet[self.column_of[term_id]]
+            for term_id in term_ids
+            if term_id in self.column_of
+        }
+
+    def refinements(self, term_ids, limit: int = 10) -> tuple[int, list[tuple[int, int]]]:
+        """
+        Términos que acotan la selección actual: aparecen en alguna de las
+        recetas, pero no en todas (los que están en todas no filtran nada).
+        Ordenados por número de recetas. Los términos de las facetas ya
+        seleccionadas se suman con OR (amplían, no acotan) y no se incluyen.
+
+        Returns:
+            (total, [(term_id, count), ...])
+        """
+        total, counts = self.counts_for(term_ids)
+        selected = self.selected_facets(term_ids)
+        useful = [
+            (term_id, count) for term_id, count in counts.items()
+            if count < total and self.term_facet[self.column_of[term_id]] not in selected
+        ]
+        useful.sort(key=lambda item: (-item[1], item[0]))
+        return total, useful[:limit]
+
+
+cooccurrence_index = CooccurrenceIndex()
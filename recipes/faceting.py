@@ -0,0 +1,75 @@
+"""
+Semántica booleana de los filtros por término (búsqueda facetada):
+
+    - OR dentro de una faceta:   Postre o Entrada
+    - AND entre facetas:         (Postre o Entrada) y Horneado
+    - cada término incluye a sus descendientes (Postre -> pastel, panqué...)
+
+Cada faceta se traduce a un EXISTS correlacionado sobre RecipeTerm, que
+SQLite resuelve con el índice único (recipe_id, term_id). No hay JOIN contra
+la tabla intermedia, así que tampoco hace falta DISTINCT.
+
+Lo usan RecipeFilter (API) y la vista HTML recipe_list.
+"""
+from django.db.models import Exists, OuterRef
+
+from .models import RecipeTerm, Term
+
+
+def group_term_ids_by_facet(term_ids) -> list[list[int]]:
+    """
+    Agrupa los términos seleccionados por faceta y expande cada grupo a sus
+    descendientes. Un descendiente cuenta en el grupo de la faceta del
+    término seleccionado aunque su fila tenga otra faceta: Term no impide
+    que un hijo quede en una faceta distinta a la del padre (la API escribe
+    facet y parent por separado).
+    Una sola consulta: (id, padre, faceta) de toda la taxonomía.
+    Un id que no existe forma un grupo vacío (no coincide ninguna receta).
+
+    Ejemplo:
+        >>> group_term_ids_by_facet([3, 8])  # Postre (Tipo), Horneado (Técnica)
+        [[3, 4, 6], [8]]
+    """
+    selected = {int(term_id) for term_id in term_ids}
+    if not selected:
+        return []
+
+    rows = Term.objects.order_by().values_list("id", "parent_id", "facet_id")
+
+    facet_of: dict[int, int] = {}
+    children: dict[int, list[int]] = {}
+    for term_id, parent_id, facet_id in rows:
+        facet_of[term_id] = facet_id
+        if parent_id is not None:
+            children.setdefault(parent_id, []).append(term_id)
+
+    groups: dict[int, set[int]] = {}
+    unknown = False
+    for term_id in selected:
+        if term_id not in facet_of:
+            unknown = True
+            continue
+        group = groups.setdefault(facet_of[term_id], set())
+        queue = [term_id]
+        while queue:
+            current = queue.pop()
+            if current not in group:
+                group.add(current)
+                queue.extend(children.get(current, ()))
+
+    result = [sorted(groups[facet_id]) for facet_id in sorted(groups)]
+    return result + [[]] if unknown else result
+
+
+def filter_by_term_groups(queryset, groups: list[list[int]]):
+    """
+    Aplica un EXISTS por grupo: la receta debe tener al menos un término de
+    cada grupo.
+    """
+    for term_ids in groups:
+        if not term_ids:
+            return queryset.none()
+        queryset = queryset.filter(
+            Exists(RecipeTerm.objects.filter(recipe_id=OuterRef("pk"), term_id__in=term_ids))
+        )
+    return queryset
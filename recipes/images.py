@@ -0,0 +1,183 @@
+# recipes/images.py
+"""
+Imágenes de recetas direccionadas por contenido.
+
+El nombre del archivo es el SHA-256 de sus bytes:
+
+    recipes/sha256/3f/3fa9...c2.jpg
+
+- Subir dos veces la misma foto no duplica el archivo: la segunda subida
+  reutiliza la ruta existente.
+- Una URL nunca cambia de contenido, así que se puede cachear para siempre
+  (Cache-Control: immutable, ver recipes.views.serve_media) y el hash es
+  también el ETag.
+- Cada archivo tiene un contador de referencias (ImageBlob.refcount) que se
+  mantiene desde recipes/signals.py. Los archivos que quedan sin referencias
+  se borran con `python manage.py cleanup_images`, nunca al guardar: otra
+  receta puede volver a subir la misma foto mientras tanto.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+CAS_PREFIX = "recipes/sha256"
+CAS_NAME_RE = re.compile(rf"^{CAS_PREFIX}/[0-9a-f]{{2}}/(?P<digest>[0-9a-f]{{64}})\.\w+$")
+
+# Tiempo mínimo sin referencias antes de borrar un archivo
+ORPHAN_GRACE = timedelta(hours=1)
+
+
+def content_digest(content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def digest_from_name(name: str) -> str | None:
+    """SHA-256 de una ruta direccionada por contenido (None para rutas antiguas)."""
+    match = CAS_NAME_RE.match(name)
+    return match["digest"] if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage que ignora el nombre subido (salvo la extensión) y
+    guarda cada archivo bajo el hash de su contenido.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        ext = os.path.splitext(name)[1].lower().replace(" ", "") or ".jpg"
+        digest = content_digest(content)
+        name = f"{CAS_PREFIX}/{digest[:2]}/{digest}{ext}"
+        if self.exists(name):
+            # Deduplicado: mismo contenido, misma ruta. Se renueva la fecha del
+            # archivo para que collect_orphans no lo borre mientras se guarda
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
+
+
+# ---- contador de referencias ----------------------------------------------
+
+def retain_image(name: str) -> None:
+    from .models import ImageBlob
+
+    if not name:
+        return
+    blob, created = ImageBlob.objects.get_or_create(name=name, defaults={"refcount": 1})
+    if not created:
+        ImageBlob.objects.filter(pk=blob.pk).update(
+            refcount=F("refcount") + 1, updated_at=timezone.now()
+        )
+
+
+def release_image(name: str) -> None:
+    from .models import ImageBlob
+
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F("refcount") - 1, updated_at=timezone.now()
+    )
+
+
+def recount_images() -> int:
+    """
+    Recalcula los contadores desde Recipe.image (p. ej. después de un
+    queryset.update() o un borrado masivo, que no emiten señales).
+    Devuelve cuántos contadores cambiaron.
+    """
+    from .models import ImageBlob, Recipe
+
+    counts = dict(
+        Recipe.objects.exclude(image="").exclude(image__isnull=True)
+        .values_list("image").annotate(references=Count("id")).order_by()
+    )
+    changed = 0
+    now = timezone.now()
+    for blob in ImageBlob.objects.all():
+        refcount = counts.pop(blob.name, 0)
+        if blob.refcount != refcount:
+            ImageBlob.objects.filter(pk=blob.pk).update(refcount=refcount, updated_at=now)
+            changed += 1
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, refcount=refcount) for name, refcount in counts.items()]
+    )
+    return changed + len(counts)
+
+
+def _stored_cas_files(storage):
+    directories, _ = storage.listdir(CAS_PREFIX) if storage.exists(CAS_PREFIX) else ([], [])
+    for directory in directories:
+        for filename in storage.listdir(f"{CAS_PREFIX}/{directory}")[1]:
+            yield f"{CAS_PREFIX}/{directory}/{filename}"
+
+
+def collect_orphans(grace: timedelta = ORPHAN_GRACE, dry_run: bool = False) -> list[str]:
+    """
+    Borra los archivos sin referencias desde hace más de `grace`:
+    - filas ImageBlob con refcount 0,
+    - archivos direccionados por contenido sin fila (subidas cuyo guardado
+      falló o se revirtió).
+    Devuelve las rutas borradas (o que se borrarían con dry_run).
+    """
+    from .models import ImageBlob
+
+    cutoff = timezone.now() - grace
+    removed = []
+    for name in ImageBlob.objects.filter(refcount=0, updated_at__lt=cutoff).order_by(
+        "id"
+    ).values_list("name", flat=True):
+        if dry_run or _remove_if_unreferenced(name, cutoff):
+            removed.append(name)
+
+    known = set(ImageBlob.objects.values_list("name", flat=True))
+    for name in _stored_cas_files(recipe_image_storage):
+        if name in known or name in removed:
+            continue
+        if recipe_image_storage.get_modified_time(name) >= cutoff:
+            continue
+        if dry_run or _remove_if_unreferenced(name, cutoff):
+            removed.append(name)
+    return removed
+
+
+def _remove_if_unreferenced(name: str, cutoff) -> bool:
+    """
+    Borra la fila y el archivo si siguen sin referencias. Se vuelve a revisar
+    en la misma transacción que borra la fila (con la fila bloqueada): una
+    receta que subió la misma foto durante la limpieza conserva su archivo.
+    """
+    from .models import ImageBlob, Recipe
+
+    with transaction.atomic():
+        blobs = list(ImageBlob.objects.select_for_update().filter(name=name))
+        if any(blob.refcount or blob.updated_at >= cutoff for blob in blobs):
+            return False
+        if Recipe.objects.filter(image=name).exists():
+            return False  # contador desfasado (ver recount_images)
+        if (
+            recipe_image_storage.exists(name)
+            and recipe_image_storage.get_modified_time(name) >= cutoff
+        ):
+            return False  # subida deduplicada en curso
+        ImageBlob.objects.filter(name=name).delete()
+        recipe_image_storage.delete(name)
+    return True
@@ -0,0 +1,102 @@
+"""
+Normalización de ingredientes a partir del texto libre de las recetas.
+
+Convierte líneas como "2 tazas de harina de trigo, cernida" en un nombre
+canónico ("harina de trigo") que sirve como clave del vocabulario de
+ingredientes. No toca la base de datos (SRP): solo transforma texto.
+"""
+import re
+import unicodedata
+
+# Unidades y medidas comunes que se descartan al inicio de una línea
+UNITS = {
+    "taza", "tazas", "cucharada", "cucharadas", "cucharadita", "cucharaditas",
+    "cda", "cdas", "cdta", "cdtas", "g", "gr", "grs", "gramo", "gramos",
+    "kg", "kilo", "kilos", "kilogramo", "kilogramos", "mg", "ml", "l", "lt",
+    "litro", "litros", "oz", "onza", "onzas", "lb", "libra", "libras",
+    "pieza", "piezas", "pza", "pzas", "pizca", "pizcas", "diente", "dientes",
+    "lata", "latas", "paquete", "paquetes", "rebanada", "rebanadas",
+    "hoja", "hojas", "rama", "ramas", "manojo", "manojos", "puñado", "puñados",
+    "chorrito", "chorro", "sobre", "sobres", "barra", "barras", "vaso", "vasos",
+}
+
+# Palabras de relleno que no forman parte del nombre del ingrediente
+FILLER_WORDS = {"de", "del", "al", "gusto", "un", "una", "unos", "unas", "y", "o"}
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·]+|\d+[.)])\s+")
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_QUANTITY_RE = re.compile(r"^[\d\s/.,½¼¾⅓⅔-]+")
+_WORD_RE = re.compile(r"[a-zñ]+")
+
+
+def strip_accents(value: str) -> str:
+    """Quita acentos conservando la ñ (azúcar -> azucar, piña -> piña)."""
+    value = value.replace("ñ", "\0")
+    decomposed = unicodedata.normalize("NFKD", value)
+    plain = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return plain.replace("\0", "ñ")
+
+
+def singularize(word: str) -> str:
+    """
+    Singular aproximado para español.
+    huevos -> huevo, limones -> limon, nueces -> nuez.
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith("ces"):
+        return word[:-3] + "z"
+    if word.endswith("es") and word[-3] in "lrndj":
+        return word[:-2]
+    if word.endswith("s") and word[-2] in "aeiou":
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(line: str) -> str:
+    """
+    Normaliza una línea de ingredientes a su nombre canónico.
+
+    Args:
+        line: Línea de texto libre (ej. "2 tazas de Harina, cernida")
+
+    Returns:
+        Nombre canónico en minúsculas y sin acentos (ej. "harina"),
+        o cadena vacía si la línea no contiene un ingrediente.
+    """
+    value = strip_accents(line.lower())
+    value = _BULLET_RE.sub("", value)
+    value = _PARENS_RE.sub(" ", value)
+    # Lo que va después de la coma suele ser preparación ("picado", "cernida")
+    value = value.split(",", 1)[0]
+    value = _QUANTITY_RE.sub("", value)
+
+    words = _WORD_RE.findall(value)
+
+    # Descarta unidades y conectores iniciales: "tazas de", "pizca de"
+    while words and (words[0] in UNITS or words[0] in FILLER_WORDS):
+        words.pop(0)
+    # Descarta conectores finales: "sal al gusto"
+    while words and words[-1] in FILLER_WORDS:
+        words.pop()
+
+    return " ".join(
+        word if word in FILLER_WORDS else singularize(word) for word in words
+    )
+
+
+def parse_ingredients_text(text: str) -> set[str]:
+    """
+    Extrae el conjunto de ingredientes canónicos de un texto libre.
+    Acepta un ingrediente por línea o separados por punto y coma.
+
+    Example:
+        >>> parse_ingredients_text("2 huevos\\n1 taza de azúcar; Sal al gusto")
+        {'huevo', 'azucar', 'sal'}
+    """
+    names = set()
+    for line in re.split(r"[\n;]+", text or ""):
+        name = normalize_ingredient(line)
+        if name:
+            names.add(name)
+    return names
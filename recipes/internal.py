@@ -0,0 +1,16 @@
+# recipes/internal.py
+"""
+Marca de las peticiones internas del snapshot (ver recipes/snapshot.py).
+
+Vive aparte para que las vistas y el throttling la consulten sin importar
+el código del snapshot, que el perfil "api" no usa.
+"""
+
+# Clave del environ WSGI que marca las peticiones del Client interno. No
+# empieza con HTTP_, así que ningún cliente externo la puede enviar.
+INTERNAL_RENDER_KEY = "recipes.internal_render"
+
+
+def is_internal_render(request) -> bool:
+    """True para las peticiones del snapshot: sin throttling ni conteo de vistas."""
+    return bool(request.META.get(INTERNAL_RENDER_KEY))
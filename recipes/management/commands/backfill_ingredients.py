@@ -0,0 +1,34 @@
+# recipes/management/commands/backfill_ingredients.py
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye el índice estructurado de ingredientes para recetas existentes.
+
+    Uso:
+        python manage.py backfill_ingredients
+        python manage.py backfill_ingredients --batch-size 200
+    """
+
+    help = "Parsea ingredients_text de todas las recetas y rellena RecipeIngredient."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Número de recetas leídas por lote (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only("id", "ingredients_text").order_by("id")
+
+        total = 0
+        for recipe in recipes.iterator(chunk_size=options["batch_size"]):
+            recipe.sync_ingredients()
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Ingredientes indexados para {total} recetas."))
@@ -0,0 +1,27 @@
+# recipes/management/commands/build_catalog.py
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import catalog_store, get_catalog_settings
+
+
+class Command(BaseCommand):
+    """
+    Genera el snapshot del catálogo en memoria y publica su versión, para
+    que los workers lo mapeen al arrancar sin reconstruirlo desde la BD.
+
+    Uso:
+        python manage.py build_catalog
+
+    Necesario después de escrituras masivas que no emiten señales
+    (QuerySet.update, bulk_create, loaddata con raw=True).
+    """
+
+    help = "Reconstruye el snapshot del catálogo de solo lectura."
+
+    def handle(self, *args, **options):
+        catalog = catalog_store.refresh()
+        path = get_catalog_settings()["SNAPSHOT_PATH"] or "(solo memoria)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Catálogo {catalog.version} en {path}: {len(catalog.recipe_id)} recetas, "
+            f"{len(catalog.term_id)} términos, {catalog.size / 1024:.1f} KiB."
+        ))
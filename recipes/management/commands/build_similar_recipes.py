@@ -0,0 +1,39 @@
+# recipes/management/commands/build_similar_recipes.py
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import DEFAULT_TOP_K, build_similar_recipes
+
+
+class Command(BaseCommand):
+    """
+    Precalcula las "recetas similares" a partir de sus términos.
+
+    Uso:
+        python manage.py build_similar_recipes            # incremental
+        python manage.py build_similar_recipes --full     # recálculo completo
+        python manage.py build_similar_recipes --top-k 5
+    """
+
+    help = "Calcula los top-k vecinos por similitud coseno de términos para cada receta."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recalcula todas las recetas, no solo las que cambiaron de etiquetas.",
+        )
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=DEFAULT_TOP_K,
+            help=f"Número de vecinos por receta (default: {DEFAULT_TOP_K}).",
+        )
+
+    def handle(self, *args, **options):
+        summary = build_similar_recipes(top_k=options["top_k"], full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{summary['recomputed']} recetas recalculadas, "
+                f"{summary['updated']} filas guardadas de {summary['recipes']}."
+            )
+        )
@@ -0,0 +1,153 @@
+# recipes/management/commands/build_snapshot.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes.snapshot import (
+    MANIFEST_VERSION,
+    init_worker,
+    load_manifest,
+    recipe_signatures,
+    render_recipes,
+    render_trees,
+    write_manifest,
+)
+
+
+class Command(BaseCommand):
+    """
+    Prerenderiza el catálogo a archivos estáticos para servirlos desde el CDN.
+
+    Uso:
+        python manage.py build_snapshot --base-url https://recetas.vercel.app
+        python manage.py build_snapshot --full --workers 8
+        python manage.py build_snapshot --output /tmp/snapshot
+
+    Por defecto es incremental: solo se vuelven a renderizar las recetas cuya
+    firma (updated_at, términos, similares y el updated_at de cada similar)
+    cambió desde el último manifest.
+    Si cambian los árboles de taxonomía se reconstruye todo, porque los
+    nombres de facetas/términos aparecen en cada detalle.
+    """
+
+    help = "Renderiza detalles HTML/JSON y árboles de taxonomía a un directorio estático."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=str(settings.BASE_DIR / "snapshot"),
+            help="Directorio de salida (default: BASE_DIR/snapshot).",
+        )
+        parser.add_argument(
+            "--base-url",
+            default="http://localhost",
+            help="URL pública del sitio; se usa para las URLs absolutas de imágenes.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Procesos para renderizar en paralelo (1 = sin pool).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Recetas por tarea enviada al pool (default: 50).",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignora el manifest anterior y renderiza todo.",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options["output"]
+        base_url = options["base_url"].rstrip("/")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+        previous = load_manifest(output_dir) or {"files": {}, "recipes": {}}
+        old_files = previous["files"]
+        old_recipes = previous["recipes"]
+        if options["full"] or previous.get("base_url") != base_url:
+            old_recipes = {}
+
+        init_worker(os.environ["DJANGO_SETTINGS_MODULE"], base_url)
+        tree_files = render_trees(output_dir)
+        if old_recipes and any(
+            old_files.get(path, {}).get("sha256") != entry["sha256"]
+            for path, entry in tree_files.items()
+        ):
+            self.stdout.write("La taxonomía cambió: reconstrucción completa.")
+            old_recipes = {}
+
+        signatures = recipe_signatures()
+
+        changed = [
+            (recipe_id, data["slug"])
+            for recipe_id, data in signatures.items()
+            if old_recipes.get(str(recipe_id), {}).get("signature") != data["signature"]
+        ]
+        changed_ids = {recipe_id for recipe_id, _ in changed}
+
+        recipe_files = self.render(output_dir, base_url, changed, options)
+
+        # Se conservan los archivos de recetas sin cambios
+        for path, entry in old_files.items():
+            recipe_id = entry.get("recipe")
+            if recipe_id in signatures and recipe_id not in changed_ids:
+                recipe_files[path] = entry
+
+        # Archivos huérfanos: recetas borradas o con slug nuevo
+        removed = 0
+        for path, entry in old_files.items():
+            if entry.get("recipe") is not None and path not in recipe_files:
+                target = Path(output_dir) / entry["file"]
+                target.unlink(missing_ok=True)
+                if target.parent.is_dir() and not any(target.parent.iterdir()):
+                    target.parent.rmdir()
+                removed += 1
+
+        write_manifest(output_dir, {
+            "version": MANIFEST_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "files": {**tree_files, **recipe_files},
+            "recipes": {str(recipe_id): data for recipe_id, data in signatures.items()},
+        })
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot en {output_dir}: {len(changed)} recetas renderizadas, "
+            f"{len(signatures) - len(changed)} sin cambios, {removed} archivos eliminados."
+        ))
+
+    def render(self, output_dir, base_url, recipes, options) -> dict:
+        if not recipes:
+            return {}
+
+        size = max(options["batch_size"], 1)
+        batches = [recipes[i:i + size] for i in range(0, len(recipes), size)]
+        workers = min(options["workers"], len(batches))
+
+        if workers <= 1:
+            files = {}
+            for batch in batches:
+                files.update(render_recipes(output_dir, batch))
+            return files
+
+        # Cada proceso abre su propia conexión; no se heredan las del padre
+        connections.close_all()
+        files = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(os.environ["DJANGO_SETTINGS_MODULE"], base_url),
+        ) as pool:
+            for result in pool.map(render_recipes, [output_dir] * len(batches), batches):
+                files.update(result)
+        return files
@@ -0,0 +1,53 @@
+# recipes/management/commands/cleanup_images.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import ORPHAN_GRACE, collect_orphans, recount_images
+
+
+class Command(BaseCommand):
+    """
+    Borra las imágenes que ninguna receta usa (ver recipes/images.py).
+
+    Uso:
+        python manage.py cleanup_images                # borra huérfanas
+        python manage.py cleanup_images --dry-run      # solo lista
+        python manage.py cleanup_images --recount      # recalcula contadores antes
+        python manage.py cleanup_images --grace-minutes 0
+    """
+
+    help = "Borra los archivos de imagen sin referencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Lista los archivos que se borrarían sin borrarlos.",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Recalcula los contadores desde Recipe.image (tras updates masivos).",
+        )
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=int(ORPHAN_GRACE.total_seconds() // 60),
+            help="Minutos sin referencias antes de borrar un archivo "
+                 f"(default: {int(ORPHAN_GRACE.total_seconds() // 60)}).",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            changed = recount_images()
+            self.stdout.write(f"{changed} contadores corregidos.")
+
+        removed = collect_orphans(
+            grace=timedelta(minutes=options["grace_minutes"]),
+            dry_run=options["dry_run"],
+        )
+        for name in removed:
+            self.stdout.write(f"  {name}")
+        verb = "se borrarían" if options["dry_run"] else "borrados"
+        self.stdout.write(self.style.SUCCESS(f"{len(removed)} archivos {verb}."))
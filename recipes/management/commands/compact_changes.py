@@ -0,0 +1,20 @@
+# recipes/management/commands/compact_changes.py
+from django.core.management.base import BaseCommand
+
+from recipes.api.changes import compact_change_log
+
+
+class Command(BaseCommand):
+    """
+    Compacta el registro de cambios (/api/v1/changes/): deja solo la última
+    entrada de cada objeto.
+
+    Uso:
+        python manage.py compact_changes
+    """
+
+    help = "Borra las entradas del registro de cambios superadas por una más reciente."
+
+    def handle(self, *args, **options):
+        deleted = compact_change_log()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} entradas eliminadas."))
@@ -0,0 +1,19 @@
+# recipes/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from recipes.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye el índice BM25 (postings, longitudes y doc_freq).
+
+    Uso:
+        python manage.py rebuild_search_index
+    """
+
+    help = "Reconstruye desde cero el índice de búsqueda por relevancia."
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido para {total} recetas."))
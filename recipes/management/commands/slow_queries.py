@@ -0,0 +1,59 @@
+# recipes/management/commands/slow_queries.py
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.querylog import aggregate, query_log_settings, read_entries
+
+SORT_FIELDS = {"total": "total_ms", "count": "count", "p95": "p95_ms", "max": "max_ms"}
+
+
+class Command(BaseCommand):
+    """
+    Resumen del registro de consultas lentas (settings.SLOW_QUERY_LOG["PATH"]),
+    agrupado por huella del SQL normalizado.
+
+    Uso:
+        python manage.py slow_queries
+        python manage.py slow_queries --sort p95 --limit 5 --plans
+        python manage.py slow_queries --clear
+    """
+
+    help = "Agrupa las consultas lentas registradas por huella, con conteos y percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Archivo de registro (por omisión el de settings).")
+        parser.add_argument("--sort", choices=SORT_FIELDS, default="total")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--plans", action="store_true", help="Muestra el plan de cada consulta.")
+        parser.add_argument("--clear", action="store_true", help="Vacía el registro.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or query_log_settings()["PATH"]
+        if not path:
+            raise CommandError("SLOW_QUERY_LOG['PATH'] no está configurado.")
+
+        if options["clear"]:
+            open(path, "w").close()
+            self.stdout.write(self.style.SUCCESS("Registro vaciado."))
+            return
+
+        groups = aggregate(read_entries(path))
+        if not groups:
+            self.stdout.write("Sin consultas lentas registradas.")
+            return
+
+        groups.sort(key=lambda group: group[SORT_FIELDS[options["sort"]]], reverse=True)
+        for group in groups[:options["limit"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{group['fingerprint']}  x{group['count']}  total {group['total_ms']:.0f} ms  "
+                f"p50 {group['p50_ms']:.0f}  p95 {group['p95_ms']:.0f}  "
+                f"p99 {group['p99_ms']:.0f}  max {group['max_ms']:.0f} ms"
+            ))
+            self.stdout.write(f"  {group['sql']}")
+            if group["params"]:
+                self.stdout.write(f"  params: {group['params']}")
+            views = sorted(group["views"].items(), key=lambda item: -item[1])
+            self.stdout.write("  vistas: " + ", ".join(f"{view} ({count})" for view, count in views))
+            if options["plans"] and group["plan"]:
+                for line in group["plan"]:
+                    self.stdout.write(f"    {line}")
+        self.stdout.write(f"{len(groups)} consultas distintas.")
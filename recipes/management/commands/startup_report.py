@@ -0,0 +1,116 @@
+# recipes/management/commands/startup_report.py
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en un proceso nuevo (python -X importtime) para medir un cold
+# start real: importar la app WSGI y atender una primera petición.
+PROBE = """
+import io, json, os, sys, time
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+
+path, _, query = sys.argv[2].partition("?")
+status = []
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query,
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+    "HTTP_HOST": "localhost", "HTTP_ACCEPT": "application/json",
+    "wsgi.version": (1, 0), "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(),
+    "wsgi.errors": sys.stderr, "wsgi.multithread": False,
+    "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+body = b"".join(application(environ, lambda s, h, *a: status.append(s)))
+done = time.perf_counter()
+print(json.dumps({
+    "setup_ms": (ready - started) * 1000,
+    "first_response_ms": (done - ready) * 1000,
+    "status": status[0] if status else None,
+    "bytes": len(body),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """
+    Suma el tiempo propio (self, en µs) de cada módulo por paquete raíz.
+
+    Líneas de `-X importtime`:
+        import time:       412 |       1203 | django.utils.functional
+    """
+    totals: dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # cabecera
+        package = fields[2].strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(fields[0])
+    return totals
+
+
+class Command(BaseCommand):
+    """
+    Mide el cold start: tiempo de importar/configurar la app WSGI, tiempo
+    de la primera respuesta y qué paquetes cuestan más al importarse.
+
+    Uso:
+        python manage.py startup_report
+        python manage.py startup_report --settings-module recipes_core_demo.settings_api
+        python manage.py startup_report --path /api/v1/recipes/ --top 15
+    """
+
+    help = "Reporta el costo de arranque (imports y primera petición) en un proceso nuevo."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-module",
+            default=settings.SETTINGS_MODULE,
+            help="Settings a medir (default: los actuales).",
+        )
+        parser.add_argument(
+            "--path",
+            default="/api/v1/facets-terms-tree/",
+            help="URL de la primera petición.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Paquetes a listar, de mayor a menor tiempo de import.",
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE,
+             options["settings_module"], options["path"]],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else "Error")
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        packages = parse_importtime(result.stderr)
+        total_ms = sum(packages.values()) / 1000
+
+        self.stdout.write(f"Settings:          {options['settings_module']}")
+        self.stdout.write(f"Setup (WSGI):      {timings['setup_ms']:.1f} ms")
+        self.stdout.write(
+            f"Primera respuesta: {timings['first_response_ms']:.1f} ms "
+            f"({timings['status']}, {timings['bytes']} bytes) -> {options['path']}"
+        )
+        self.stdout.write(f"Imports totales:   {total_ms:.1f} ms en {len(packages)} paquetes")
+        self.stdout.write("")
+
+        ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        for package, micros in ranked[:options["top"]]:
+            self.stdout.write(f"  {micros / 1000:8.1f} ms  {package}")
@@ -0,0 +1,198 @@
+# recipes/middleware.py
+"""
+Compresión gzip/brotli de respuestas HTML y de la API, y registro de
+consultas lentas por petición (ver recipes/querylog.py).
+
+WhiteNoise solo comprime archivos estáticos; este middleware comprime el
+resto según `Accept-Encoding`. Los cuerpos comprimidos de respuestas GET
+se guardan en el cache de Django indexados por el hash del contenido, así una
+respuesta caliente (árbol de facetas, detalle de receta) se comprime una sola
+vez aunque se renderice muchas veces. El HTML y las respuestas con token CSRF
+no pasan por ese cache (ver CompressionMiddleware).
+
+Configuración (settings.RESPONSE_COMPRESSION):
+    MIN_SIZE         Tamaño mínimo en bytes para comprimir
+    GZIP_LEVEL       Nivel de gzip (1-9)
+    BROTLI_QUALITY   Calidad de brotli (0-11)
+    CACHE_ALIAS      Alias de cache para los cuerpos comprimidos (None = sin cache)
+    CACHE_TIMEOUT    Segundos que se conserva cada cuerpo comprimido
+    CACHE_MAX_SIZE   Cuerpos más grandes (bytes) se comprimen sin cachear; el
+                     número de entradas lo limita el backend (MAX_ENTRIES)
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from .querylog import log_slow_queries, query_log_settings
+
+DEFAULT_SETTINGS = {
+    "MIN_SIZE": 512,
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,
+    "CACHE_ALIAS": "default",
+    "CACHE_TIMEOUT": 300,
+    "CACHE_MAX_SIZE": 256 * 1024,
+}
+
+# Mismo relleno que django.middleware.gzip.GZipMiddleware
+HTML_MAX_RANDOM_BYTES = 100
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def get_compression_settings() -> dict:
+    return {**DEFAULT_SETTINGS, **getattr(settings, "RESPONSE_COMPRESSION", {})}
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """
+    'gzip, deflate, br;q=0' -> {'gzip', 'deflate'}
+    Las codificaciones con q=0 se consideran rechazadas.
+    """
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = params.strip().removeprefix("q=")
+        if params and quality.replace(".", "", 1).isdigit() and float(quality) == 0:
+            continue
+        encodings.add(name)
+    return encodings
+
+
+def uses_csrf_token(request, response) -> bool:
+    """True si la vista usó el token CSRF (get_token) o la respuesta fija su cookie."""
+    return bool(request.META.get("CSRF_COOKIE_NEEDS_UPDATE")) or (
+        settings.CSRF_COOKIE_NAME in response.cookies
+    )
+
+
+def compress(body: bytes, encoding: str, config: dict) -> bytes:
+    if encoding == "br":
+        import brotli  # solo si algún cliente acepta br
+
+        return brotli.compress(body, quality=config["BROTLI_QUALITY"])
+    return gzip.compress(body, compresslevel=config["GZIP_LEVEL"], mtime=0)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime respuestas no-streaming con brotli (preferido) o gzip.
+    Debe ir justo después de SecurityMiddleware/WhiteNoise para comprimir
+    la respuesta final.
+
+    BREACH: una respuesta que lleva el token CSRF (en el cuerpo o en la
+    cookie) no se comprime. El HTML, que puede reflejar la entrada del
+    usuario junto a otros secretos, se comprime solo con gzip y relleno
+    aleatorio como GZipMiddleware de Django, sin pasar por el cache.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if response.status_code != 200 and response.status_code < 400:
+            return response
+
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        config = get_compression_settings()
+        body = response.content
+        if len(body) < config["MIN_SIZE"]:
+            return response
+
+        # El ETag solo sirve si el cliente puede guardar la respuesta y revalidarla
+        digest = None
+        revalidable = (
+            request.method in ("GET", "HEAD")
+            and response.status_code == 200
+            and "no-store" not in response.get("Cache-Control", "")
+        )
+        if revalidable and not response.has_header("ETag"):
+            digest = hashlib.sha1(body).hexdigest()
+            response.headers["ETag"] = f'W/"{digest}"'
+            conditional = get_conditional_response(
+                request, etag=response.headers["ETag"], response=response
+            )
+            if conditional is not response:
+                return conditional
+
+        if uses_csrf_token(request, response):
+            return response
+
+        encodings = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        is_html = content_type.startswith("text/html")
+        if "br" in encodings and not is_html:
+            encoding = "br"
+        elif "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            return response
+
+        if is_html:
+            compressed = compress_string(body, max_random_bytes=HTML_MAX_RANDOM_BYTES)
+        elif revalidable and len(body) <= config["CACHE_MAX_SIZE"]:
+            digest = digest or hashlib.sha1(body).hexdigest()
+            compressed = self.get_compressed(body, digest, encoding, config)
+        else:
+            compressed = compress(body, encoding, config)
+        if len(compressed) >= len(body):
+            return response
+
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def get_compressed(self, body, digest, encoding, config) -> bytes:
+        """Devuelve el cuerpo comprimido, reutilizando el cache por hash."""
+        if not config["CACHE_ALIAS"]:
+            return compress(body, encoding, config)
+
+        level = config["BROTLI_QUALITY"] if encoding == "br" else config["GZIP_LEVEL"]
+        cache = caches[config["CACHE_ALIAS"]]
+        key = f"recipes:compressed:{encoding}:{level}:{digest}"
+
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, config)
+            cache.set(key, compressed, config["CACHE_TIMEOUT"])
+        return compressed
+
+
+class SlowQueryLogMiddleware:
+    """
+    Registra las consultas de la petición que superan
+    SLOW_QUERY_LOG["THRESHOLD_MS"], con la vista que las originó.
+    Con ENABLED = False no envuelve nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not query_log_settings()["ENABLED"]:
+            return self.get_response(request)
+        with log_slow_queries(view=lambda: self.view_name(request)):
+            return self.get_response(request)
+
+    @staticmethod
+    def view_name(request) -> str:
+        match = getattr(request, "resolver_match", None)  # None hasta resolver la URL
+        return f"{request.method} {match.view_name if match else request.path}"
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre normalizado')),
+            ],
+            options={
+                'verbose_name': 'Ingrediente',
+                'verbose_name_plural': 'Ingredientes',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_links', to='recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_links', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name': 'Ingrediente de receta',
+                'verbose_name_plural': 'Ingredientes de receta',
+                'indexes': [models.Index(fields=['ingredient', 'recipe'], name='recipeingredient_posting_idx')],
+                'unique_together': {('recipe', 'ingredient')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='recipes.recipe')),
+                ('neighbours', models.JSONField(default=list, help_text='Lista [[recipe_id, score], ...] ordenada por similitud descendente.', verbose_name='Vecinos')),
+                ('terms_fingerprint', models.CharField(blank=True, help_text='Hash de los términos usados en el último cálculo (refresco incremental).', max_length=40, verbose_name='Huella de términos')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Similitud de receta',
+                'verbose_name_plural': 'Similitudes de receta',
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe')),
+                ('title_length', models.PositiveIntegerField(default=0)),
+                ('ingredients_length', models.PositiveIntegerField(default=0)),
+                ('description_length', models.PositiveIntegerField(default=0)),
+                ('instructions_length', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Documento de búsqueda',
+                'verbose_name_plural': 'Documentos de búsqueda',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTermStat',
+            fields=[
+                ('token', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('doc_freq', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estadística de término de búsqueda',
+                'verbose_name_plural': 'Estadísticas de términos de búsqueda',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeSearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('field', models.PositiveSmallIntegerField(choices=[(1, 'Título'), (2, 'Ingredientes'), (3, 'Descripción'), (4, 'Instrucciones')])),
+                ('term_frequency', models.PositiveIntegerField(default=1)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='recipes.recipe')),
+            ],
+            options={
+                'verbose_name': 'Posting de búsqueda',
+                'verbose_name_plural': 'Postings de búsqueda',
+                'unique_together': {('token', 'recipe', 'field')},
+            },
+        ),
+    ]
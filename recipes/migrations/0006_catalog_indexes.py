@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_at', 'id'], name='recipe_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['updated_at', 'id'], name='recipe_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['title', 'id'], name='recipe_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeterm',
+            index=models.Index(fields=['term', 'recipe'], name='recipeterm_term_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='term',
+            index=models.Index(fields=['facet', 'parent', 'order', 'name'], name='term_facet_tree_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='term',
+            index=models.Index(fields=['parent', 'order', 'name'], name='term_children_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:49
+
+from django.db import migrations, models
+
+# Orden de dependencias: un cliente puede aplicar los cambios en secuencia
+SEED_MODELS = (
+    ("taxonomy", "Taxonomy"),
+    ("facet", "Facet"),
+    ("term", "Term"),
+    ("recipe", "Recipe"),
+    ("recipeterm", "RecipeTerm"),
+)
+
+
+def seed_change_log(apps, schema_editor):
+    """Una entrada por objeto existente: ?since=0 devuelve el catálogo completo."""
+    ChangeLogEntry = apps.get_model("recipes", "ChangeLogEntry")
+    for entity, model_name in SEED_MODELS:
+        ids = apps.get_model("recipes", model_name).objects.order_by("id").values_list("id", flat=True)
+        ChangeLogEntry.objects.bulk_create(
+            (ChangeLogEntry(entity=entity, object_id=object_id) for object_id in ids.iterator()),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('taxonomy', 'Taxonomía'), ('facet', 'Faceta'), ('term', 'Término'), ('recipe', 'Receta'), ('recipeterm', 'Etiqueta de receta')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False, help_text='Lápida: el objeto fue borrado.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio del catálogo',
+                'verbose_name_plural': 'Cambios del catálogo',
+                'indexes': [models.Index(fields=['entity', 'object_id', 'id'], name='changelog_object_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:54
+
+import recipes.images
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_image_blobs(apps, schema_editor):
+    """Contadores para las imágenes existentes (conservan su ruta anterior)."""
+    Recipe = apps.get_model("recipes", "Recipe")
+    ImageBlob = apps.get_model("recipes", "ImageBlob")
+    counts = (
+        Recipe.objects.exclude(image="").exclude(image__isnull=True)
+        .values_list("image").annotate(references=Count("id")).order_by()
+    )
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, refcount=refcount) for name, refcount in counts],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_change_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Imagen principal de la receta. Se guarda con el hash de su contenido.', null=True, storage=recipes.images.ContentAddressedStorage(), upload_to='recipes/', verbose_name='Imagen principal'),
+        ),
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Ruta')),
+                ('refcount', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de imagen',
+                'verbose_name_plural': 'Archivos de imagen',
+                'indexes': [models.Index(fields=['refcount', 'updated_at'], name='imageblob_orphan_idx')],
+            },
+        ),
+        migrations.RunPython(seed_image_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='impression_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Impresiones'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='Vistas con decaimiento temporal (ver recipes/popularity.py).', verbose_name='Popularidad'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='view_count',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Vistas'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['popularity', 'id'], name='recipe_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_popularity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('q', models.CharField(blank=True, max_length=200, verbose_name='Texto')),
+                ('has_terms', models.BooleanField(default=False, editable=False, help_text='Sin términos la búsqueda se evalúa para cada receta (solo texto).')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Búsqueda guardada',
+                'verbose_name_plural': 'Búsquedas guardadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_key', models.BooleanField(default=False)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='recipes.savedsearch')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.term')),
+            ],
+            options={
+                'verbose_name': 'Término de búsqueda guardada',
+                'verbose_name_plural': 'Términos de búsqueda guardada',
+            },
+        ),
+        migrations.AddField(
+            model_name='savedsearch',
+            name='terms',
+            field=models.ManyToManyField(blank=True, related_name='saved_searches', through='recipes.SavedSearchTerm', to='recipes.term'),
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='recipes.savedsearch')),
+            ],
+            options={
+                'verbose_name': 'Coincidencia de búsqueda guardada',
+                'verbose_name_plural': 'Coincidencias de búsquedas guardadas',
+                'indexes': [models.Index(fields=['search', 'read_at', 'id'], name='savedsearch_inbox_idx')],
+                'unique_together': {('search', 'recipe')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchterm',
+            index=models.Index(fields=['term', 'is_key', 'search'], name='savedsearch_key_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedsearchterm',
+            unique_together={('search', 'term')},
+        ),
+    ]
@@ -0,0 +1,70 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_search_index(apps, schema_editor):
+    """
+    Indexa las recetas que existían antes de 0005_search_index (las nuevas se
+    indexan con las señales). Solo toca las recetas sin documento, así que se
+    puede volver a aplicar sin duplicar postings ni doc_freq.
+    """
+    from recipes.search import FIELD_SOURCES, tokenize
+
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeSearchDocument = apps.get_model("recipes", "RecipeSearchDocument")
+    RecipeSearchPosting = apps.get_model("recipes", "RecipeSearchPosting")
+    SearchTermStat = apps.get_model("recipes", "SearchTermStat")
+
+    attrs = [attr for attr, _ in FIELD_SOURCES.values()]
+    pending = (
+        Recipe.objects.filter(search_document__isnull=True)
+        .order_by("id").values_list("id", *attrs)
+    )
+    doc_freq = Counter()
+    postings, documents = [], []
+    for recipe_id, *texts in pending.iterator(chunk_size=500):
+        lengths, tokens_seen = {}, set()
+        for (field, (_, length_attr)), text in zip(FIELD_SOURCES.items(), texts):
+            tokens = tokenize(text)
+            lengths[length_attr] = len(tokens)
+            tokens_seen.update(tokens)
+            postings.extend(
+                RecipeSearchPosting(
+                    recipe_id=recipe_id, token=token, field=int(field), term_frequency=tf
+                )
+                for token, tf in Counter(tokens).items()
+            )
+        documents.append(RecipeSearchDocument(recipe_id=recipe_id, **lengths))
+        doc_freq.update(tokens_seen)
+        if len(postings) >= 5000:
+            RecipeSearchPosting.objects.bulk_create(postings, batch_size=500)
+            postings = []
+    RecipeSearchPosting.objects.bulk_create(postings, batch_size=500)
+    RecipeSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+    SearchTermStat.objects.bulk_create(
+        [SearchTermStat(token=token, doc_freq=0) for token in doc_freq],
+        batch_size=500, ignore_conflicts=True,
+    )
+    # Un UPDATE por valor distinto de doc_freq, no uno por token
+    by_count: dict[int, list[str]] = {}
+    for token, count in doc_freq.items():
+        by_count.setdefault(count, []).append(token)
+    for count, tokens in by_count.items():
+        for start in range(0, len(tokens), 500):
+            SearchTermStat.objects.filter(token__in=tokens[start:start + 500]).update(
+                doc_freq=F("doc_freq") + count
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_saved_searches'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+# POPULARITY_EPOCH de recipes/popularity.py antes de esta migración (2025-01-01 UTC)
+LEGACY_EPOCH = 1735689600.0
+
+
+def record_legacy_scale(apps, schema_editor):
+    """
+    Los puntajes existentes se calcularon contra LEGACY_EPOCH con la vida
+    media configurada; la primera escritura los reescala (ver sync_scale).
+    """
+    PopularityScale = apps.get_model("recipes", "PopularityScale")
+    half_life_days = getattr(settings, "POPULARITY", {}).get("HALF_LIFE_DAYS", 7)
+    PopularityScale.objects.get_or_create(
+        pk=1, defaults={"epoch": LEGACY_EPOCH, "half_life_days": half_life_days}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_backfill_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.FloatField(help_text='Instante de referencia (timestamp Unix).', verbose_name='Referencia')),
+                ('half_life_days', models.FloatField(blank=True, null=True, verbose_name='Vida media (días)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Escala de popularidad',
+                'verbose_name_plural': 'Escala de popularidad',
+            },
+        ),
+        migrations.RunPython(record_legacy_scale, migrations.RunPython.noop),
+    ]
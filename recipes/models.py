@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.utils.text import slugify
 
-from .utils import generate_recipe_image_filename
+from .images import recipe_image_storage
+from .ingredients import parse_ingredients_text
 
 
 # Create your models here.
@@ -92,6 +94,12 @@ class Term(models.Model):
         verbose_name_plural = "Términos"
         unique_together = ("facet", "name", "parent")
         ordering = ("facet", "parent__id", "order", "name")
+        indexes = [
+            # Raíces de una faceta ya ordenadas (árbol de facetas) y orden por defecto
+            models.Index(fields=["facet", "parent", "order", "name"], name="term_facet_tree_idx"),
+            # Hijos de un término ya ordenados (TermTreeSerializer)
+            models.Index(fields=["parent", "order", "name"], name="term_children_idx"),
+        ]
 
     def __str__(self) -> str:
         if self.parent:
@@ -127,14 +135,25 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         "Imagen principal",
-        upload_to=generate_recipe_image_filename,
+        upload_to="recipes/",
+        storage=recipe_image_storage,  # ruta = SHA-256 del contenido (ver recipes/images.py)
         blank=True,
         null=True,
-        help_text="Imagen principal de la receta. Se renombrará automáticamente.",
+        help_text="Imagen principal de la receta. Se guarda con el hash de su contenido.",
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Contadores escritos en lotes por recipes/popularity.py (no editables)
+    view_count = models.PositiveBigIntegerField("Vistas", default=0, editable=False)
+    impression_count = models.PositiveBigIntegerField("Impresiones", default=0, editable=False)
+    popularity = models.FloatField(
+        "Popularidad",
+        default=0,
+        editable=False,
+        help_text="Vistas con decaimiento temporal (ver recipes/popularity.py).",
+    )
+
     # Relación N a N con Term (Termino_has_Objeto)
     terms = models.ManyToManyField(
         Term,
@@ -143,9 +162,25 @@ class Recipe(models.Model):
         blank=True,
     )
 
+    # Órdenes de la API (?ordering=); cada uno tiene su índice en Meta.indexes.
+    # El id desempata para que el orden sea total y estable.
+    ORDERINGS = {
+        "newest": ("-created_at", "-id"),
+        "updated": ("-updated_at", "-id"),
+        "title": ("title", "id"),
+        "popular": ("-popularity", "-id"),
+    }
+
     class Meta:
         verbose_name = "Receta"
         verbose_name_plural = "Recetas"
+        indexes = [
+            # SQLite recorre los índices en ambos sentidos: sirven para DESC
+            models.Index(fields=["created_at", "id"], name="recipe_created_idx"),
+            models.Index(fields=["updated_at", "id"], name="recipe_updated_idx"),
+            models.Index(fields=["title", "id"], name="recipe_title_idx"),
+            models.Index(fields=["popularity", "id"], name="recipe_popular_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -158,6 +193,47 @@ class Recipe(models.Model):
             self.slug = slug
         super().save(*args, **kwargs)
 
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "ingredients_text" in update_fields:
+            self.sync_ingredients()
+
+    def sync_ingredients(self) -> None:
+        """
+        Sincroniza el índice estructurado de ingredientes (RecipeIngredient)
+        con el texto libre de `ingredients_text`.
+        Solo inserta/borra la diferencia, no reescribe todo el conjunto.
+        """
+        names = {
+            name[:Ingredient._meta.get_field("name").max_length]
+            for name in parse_ingredients_text(self.ingredients_text)
+        }
+
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in names],
+            ignore_conflicts=True,
+        )
+        wanted_ids = set(
+            Ingredient.objects.filter(name__in=names).values_list("id", flat=True)
+        )
+        current_ids = set(
+            RecipeIngredient.objects.filter(recipe=self).values_list(
+                "ingredient_id", flat=True
+            )
+        )
+
+        stale_ids = current_ids - wanted_ids
+        if stale_ids:
+            RecipeIngredient.objects.filter(
+                recipe=self, ingredient_id__in=stale_ids
+            ).delete()
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe=self, ingredient_id=ingredient_id)
+                for ingredient_id in wanted_ids - current_ids
+            ],
+            ignore_conflicts=True,
+        )
+
     def __str__(self) -> str:
         return self.title
 
@@ -173,6 +249,303 @@ class RecipeTerm(models.Model):
         verbose_name = "Etiqueta de receta"
         verbose_name_plural = "Etiquetas de receta"
         unique_together = ("recipe", "term")
+        indexes = [
+            # Recetas de un término sin tocar la tabla (el único cubre receta -> términos)
+            models.Index(fields=["term", "recipe"], name="recipeterm_term_recipe_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.recipe} – {self.term}"
+
+
+class Ingredient(models.Model):
+    """
+    Vocabulario normalizado de ingredientes (ej. 'harina', 'huevo').
+    Se alimenta automáticamente a partir de `Recipe.ingredients_text`.
+    """
+    name = models.CharField("Nombre normalizado", max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = "Ingrediente"
+        verbose_name_plural = "Ingredientes"
+        ordering = ("name",)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    """
+    Conjunto de ingredientes de cada receta. Funciona como índice invertido:
+    por ingrediente se obtienen las recetas que lo usan.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="ingredient_links",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="recipe_links",
+    )
+
+    class Meta:
+        verbose_name = "Ingrediente de receta"
+        verbose_name_plural = "Ingredientes de receta"
+        unique_together = ("recipe", "ingredient")
+        indexes = [
+            # Lista de "postings": ingrediente -> recetas
+            models.Index(fields=["ingredient", "recipe"], name="recipeingredient_posting_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.recipe} – {self.ingredient}"
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Vecinos precalculados ("recetas similares") de cada receta.
+    Una fila por receta para que la consulta sea O(1) por clave primaria.
+    Se genera con `python manage.py build_similar_recipes`.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="similarity",
+    )
+    neighbours = models.JSONField(
+        "Vecinos",
+        default=list,
+        help_text="Lista [[recipe_id, score], ...] ordenada por similitud descendente.",
+    )
+    terms_fingerprint = models.CharField(
+        "Huella de términos",
+        max_length=40,
+        blank=True,
+        help_text="Hash de los términos usados en el último cálculo (refresco incremental).",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Similitud de receta"
+        verbose_name_plural = "Similitudes de receta"
+
+    def __str__(self) -> str:
+        return f"{self.recipe} ({len(self.neighbours)} similares)"
+
+
+class SearchField(models.IntegerChoices):
+    TITLE = 1, "Título"
+    INGREDIENTS = 2, "Ingredientes"
+    DESCRIPTION = 3, "Descripción"
+    INSTRUCTIONS = 4, "Instrucciones"
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    Longitud (en tokens) de cada campo indexado de la receta.
+    Necesaria para la normalización por longitud de BM25.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title_length = models.PositiveIntegerField(default=0)
+    ingredients_length = models.PositiveIntegerField(default=0)
+    description_length = models.PositiveIntegerField(default=0)
+    instructions_length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Documento de búsqueda"
+        verbose_name_plural = "Documentos de búsqueda"
+
+    def __str__(self) -> str:
+        return str(self.recipe)
+
+
+class RecipeSearchPosting(models.Model):
+    """
+    Índice invertido: frecuencia de un token en un campo de una receta.
+    """
+    token = models.CharField(max_length=100)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="search_postings",
+    )
+    field = models.PositiveSmallIntegerField(choices=SearchField.choices)
+    term_frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Posting de búsqueda"
+        verbose_name_plural = "Postings de búsqueda"
+        unique_together = ("token", "recipe", "field")
+
+    def __str__(self) -> str:
+        return f"{self.token} @ {self.recipe_id}:{self.get_field_display()}"
+
+
+class SearchTermStat(models.Model):
+    """
+    Estadística precalculada por token: en cuántas recetas aparece
+    (en cualquier campo). Alimenta el IDF de BM25 sin contar postings.
+    """
+    token = models.CharField(max_length=100, primary_key=True)
+    doc_freq = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Estadística de término de búsqueda"
+        verbose_name_plural = "Estadísticas de términos de búsqueda"
+
+    def __str__(self) -> str:
+        return f"{self.token} ({self.doc_freq})"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Registro de cambios del catálogo para sincronización incremental
+    (/api/v1/changes/?since=<id>). El id autoincremental es el token: en
+    SQLite las escrituras se serializan, así que los ids se asignan en orden
+    de commit. Se escribe desde recipes/signals.py.
+    """
+
+    class Entity(models.TextChoices):
+        TAXONOMY = "taxonomy", "Taxonomía"
+        FACET = "facet", "Faceta"
+        TERM = "term", "Término"
+        RECIPE = "recipe", "Receta"
+        RECIPE_TERM = "recipeterm", "Etiqueta de receta"
+
+    entity = models.CharField(max_length=20, choices=Entity.choices)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(
+        default=False,
+        help_text="Lápida: el objeto fue borrado.",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Cambio del catálogo"
+        verbose_name_plural = "Cambios del catálogo"
+        indexes = [
+            # Compactación: última entrada de cada objeto
+            models.Index(fields=["entity", "object_id", "id"], name="changelog_object_idx"),
+        ]
+
+    def __str__(self) -> str:
+        action = "borrado" if self.deleted else "alta/cambio"
+        return f"#{self.id} {self.entity}:{self.object_id} ({action})"
+
+
+class ImageBlob(models.Model):
+    """
+    Archivo de imagen direccionado por contenido y cuántas recetas lo usan
+    (ver recipes/images.py). Con refcount 0 es candidato a borrarse con
+    `python manage.py cleanup_images`.
+    """
+    name = models.CharField("Ruta", max_length=255, unique=True)
+    refcount = models.PositiveIntegerField("Referencias", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Archivo de imagen"
+        verbose_name_plural = "Archivos de imagen"
+        indexes = [
+            models.Index(fields=["refcount", "updated_at"], name="imageblob_orphan_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.refcount})"
+
+
+class PopularityScale(models.Model):
+    """
+    Referencia de Recipe.popularity (una sola fila, ver recipes/popularity.py):
+    los puntajes son vistas con decaimiento expresadas en el instante `epoch`
+    con la vida media `half_life_days`.
+    """
+    epoch = models.FloatField("Referencia", help_text="Instante de referencia (timestamp Unix).")
+    half_life_days = models.FloatField("Vida media (días)", null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Escala de popularidad"
+        verbose_name_plural = "Escala de popularidad"
+
+    def __str__(self) -> str:
+        return f"{self.epoch} ({self.half_life_days} días)"
+
+
+class SavedSearch(models.Model):
+    """
+    Búsqueda guardada de un usuario: los mismos parámetros que RecipeFilter
+    (?q= y ?term=). Cada receta nueva o re-etiquetada se prueba contra las
+    búsquedas guardadas y las coincidencias quedan en SavedSearchMatch
+    (ver recipes/percolator.py).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="saved_searches",
+    )
+    name = models.CharField("Nombre", max_length=200)
+    q = models.CharField("Texto", max_length=200, blank=True)
+    terms = models.ManyToManyField(
+        Term,
+        through="SavedSearchTerm",
+        related_name="saved_searches",
+        blank=True,
+    )
+    has_terms = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Sin términos la búsqueda se evalúa para cada receta (solo texto).",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Búsqueda guardada"
+        verbose_name_plural = "Búsquedas guardadas"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class SavedSearchTerm(models.Model):
+    """
+    Término de una búsqueda guardada. Las filas con is_key=True forman el
+    índice del percolador: los términos de una sola faceta (la más
+    selectiva), que toda receta coincidente debe tener.
+    """
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="search_terms")
+    term = models.ForeignKey(Term, on_delete=models.CASCADE)
+    is_key = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Término de búsqueda guardada"
+        verbose_name_plural = "Términos de búsqueda guardada"
+        unique_together = ("search", "term")
+        indexes = [
+            # Percolador: búsquedas indexadas bajo los términos de una receta
+            models.Index(fields=["term", "is_key", "search"], name="savedsearch_key_idx"),
+        ]
+
+
+class SavedSearchMatch(models.Model):
+    """Bandeja de entrada: recetas que coincidieron con una búsqueda guardada."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="matches")
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Coincidencia de búsqueda guardada"
+        verbose_name_plural = "Coincidencias de búsquedas guardadas"
+        unique_together = ("search", "recipe")
+        indexes = [
+            models.Index(fields=["search", "read_at", "id"], name="savedsearch_inbox_idx"),
+        ]
@@ -0,0 +1,146 @@
+# recipes/percolator.py
+"""
+Percolador de búsquedas guardadas: en lugar de re-ejecutar cada búsqueda
+sobre todo el catálogo, cada receta nueva o re-etiquetada se prueba contra
+las búsquedas que podrían coincidir con ella.
+
+Compilación (al guardar la búsqueda, `set_search_terms`):
+    Los términos se agrupan por faceta como en RecipeFilter (OR dentro de
+    una faceta, AND entre facetas). Toda receta que coincida tiene algún
+    término de cada grupo, así que basta indexar la búsqueda bajo un grupo:
+    el de la faceta más selectiva (menos recetas) queda con is_key=True.
+
+Evaluación (`percolate`, después del commit que cambió la receta):
+    1. Términos de la receta más sus ancestros (una receta "Pastel" cumple
+       una búsqueda por "Postre").
+    2. Candidatas: búsquedas con una clave entre esos términos, más las de
+       solo texto.
+    3. Cada candidata se evalúa en Python con la misma semántica que
+       RecipeFilter y las coincidencias van a SavedSearchMatch.
+
+Número fijo de consultas por lote de recetas, sin importar cuántas
+búsquedas guardadas haya. El texto (?q=) se compara sin distinguir
+mayúsculas, como icontains.
+"""
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+
+from .faceting import group_term_ids_by_facet
+from .models import (
+    Recipe,
+    RecipeTerm,
+    SavedSearch,
+    SavedSearchMatch,
+    SavedSearchTerm,
+    Term,
+)
+
+# Campos que busca RecipeFilter.filter_q
+TEXT_FIELDS = ("title", "description", "ingredients_text", "instructions")
+
+
+@transaction.atomic
+def set_search_terms(search: SavedSearch, term_ids) -> None:
+    """Guarda los términos de la búsqueda y elige su grupo clave."""
+    facet_of = dict(Term.objects.filter(id__in=set(term_ids)).values_list("id", "facet_id"))
+    selected: dict[int, list[int]] = {}
+    for term_id, facet_id in facet_of.items():
+        selected.setdefault(facet_id, []).append(term_id)
+
+    key_facet = None
+    if selected:
+        def recipe_count(facet_id):
+            expanded = group_term_ids_by_facet(selected[facet_id])[0]
+            recipes = RecipeTerm.objects.filter(term_id__in=expanded).values("recipe_id")
+            return recipes.distinct().count()
+
+        key_facet = min(sorted(selected), key=recipe_count)
+
+    SavedSearchTerm.objects.filter(search=search).delete()
+    SavedSearchTerm.objects.bulk_create([
+        SavedSearchTerm(search=search, term_id=term_id, is_key=facet_id == key_facet)
+        for term_id, facet_id in facet_of.items()
+    ])
+    if search.has_terms != bool(facet_of):
+        search.has_terms = bool(facet_of)
+        search.save(update_fields=["has_terms"])
+
+
+def percolate(recipe_ids) -> int:
+    """
+    Prueba las recetas contra las búsquedas guardadas. Devuelve cuántas
+    coincidencias hubo (incluidas las que ya estaban en la bandeja).
+    """
+    recipes = list(Recipe.objects.filter(id__in=set(recipe_ids)).values("id", *TEXT_FIELDS))
+    if not recipes:
+        return 0
+
+    parent_of = dict(Term.objects.order_by().values_list("id", "parent_id"))
+    tagged: dict[int, set[int]] = {recipe["id"]: set() for recipe in recipes}
+    for recipe_id, term_id in RecipeTerm.objects.filter(recipe_id__in=tagged).values_list(
+        "recipe_id", "term_id"
+    ):
+        while term_id is not None and term_id not in tagged[recipe_id]:
+            tagged[recipe_id].add(term_id)
+            term_id = parent_of.get(term_id)
+    all_terms = set().union(*tagged.values())
+
+    candidates = dict(
+        SavedSearch.objects.filter(
+            Q(has_terms=False) | Q(search_terms__is_key=True, search_terms__term_id__in=all_terms)
+        ).distinct().values_list("id", "q")
+    )
+    groups: dict[int, dict[int, set[int]]] = {search_id: {} for search_id in candidates}
+    for search_id, term_id, facet_id in SavedSearchTerm.objects.filter(
+        search_id__in=candidates
+    ).values_list("search_id", "term_id", "term__facet_id"):
+        groups[search_id].setdefault(facet_id, set()).add(term_id)
+
+    matches = []
+    for recipe in recipes:
+        terms = tagged[recipe["id"]]
+        texts = [(recipe[field] or "").lower() for field in TEXT_FIELDS]
+        for search_id, q in candidates.items():
+            if not all(group & terms for group in groups[search_id].values()):
+                continue
+            q = q.strip().lower()
+            if q and not any(q in text for text in texts):
+                continue
+            matches.append(SavedSearchMatch(search_id=search_id, recipe_id=recipe["id"]))
+
+    # Una coincidencia por (búsqueda, receta): re-etiquetar no la duplica
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+# ---- agrupación por transacción --------------------------------------------
+#
+# Crear una receta y etiquetarla emite varias señales; se acumulan los ids y
+# se evalúan una sola vez después del commit.
+
+_pending = threading.local()
+
+
+def _run_pending() -> None:
+    recipe_ids = _pending.__dict__.pop("recipe_ids", set())
+    if recipe_ids:
+        percolate(recipe_ids)
+
+
+def schedule_percolation(recipe_ids) -> None:
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        # Autocommit: on_commit ejecuta en el acto; se evalúa sin pasar por _pending
+        transaction.on_commit(partial(percolate, set(recipe_ids)), robust=True)
+        return
+    registered = "recipe_ids" in _pending.__dict__ and any(
+        func is _run_pending for _, func, _ in connection.run_on_commit
+    )
+    if not registered:
+        _pending.recipe_ids = set()  # descarta restos de una transacción revertida
+    _pending.recipe_ids.update(recipe_ids)
+    if not registered:
+        transaction.on_commit(_run_pending, robust=True)
@@ -0,0 +1,204 @@
+# recipes/popularity.py
+"""
+Contadores de vistas e impresiones con escritura diferida (write-behind).
+
+Escribir una fila por cada vista serializaría todas las peticiones en el
+lock de escritura de SQLite. En su lugar cada proceso acumula en memoria:
+
+    - vistas: detalle de una receta (API y HTML),
+    - impresiones: la receta aparece en una lista o en /recipes/batch/,
+
+y cada FLUSH_INTERVAL segundos (o al juntar MAX_PENDING recetas) las suma a
+la base de datos con un UPDATE por lote de recetas.
+
+Recipe.popularity guarda las vistas con decaimiento temporal sin tener que
+reescribir las filas viejas: cada vista vale 2 ** (t / vida media), con t
+medido desde la referencia guardada en PopularityScale. Una vista de hoy vale
+el doble que una de hace una vida media, y el orden ?ordering=popular
+(Recipe.ORDERINGS) lee la columna indexada directamente. Con
+HALF_LIFE_DAYS = None cada vista vale 1.
+
+Para que los pesos no crezcan sin límite, sync_scale reescala la columna
+(un UPDATE de todas las filas) cuando la referencia queda a más de
+REBASE_AFTER_HALF_LIVES vidas medias, y también cuando cambia
+HALF_LIFE_DAYS: los puntajes pasan a ser las vistas con decaimiento a ese
+instante y la vida media nueva rige desde ahí. Cada proceso lo revisa al
+escribir, como mucho cada SCALE_CHECK_INTERVAL segundos.
+
+Un proceso que termina pierde como mucho lo acumulado desde la última
+escritura. El catálogo en memoria (recipes/catalog.py) toma el orden
+"popular" de su última reconstrucción.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, FloatField, Subquery, Value, When
+from django.db.models.functions import Power
+
+DEFAULTS = {
+    "FLUSH_INTERVAL": 30,  # segundos
+    "MAX_PENDING": 1000,  # recetas distintas acumuladas
+    "HALF_LIFE_DAYS": 7,
+}
+
+# Parámetros por UPDATE: 3 CASE de 2 parámetros por receta + la lista IN
+BATCH_SIZE = 100
+
+# 2 ** 32 como peso máximo: lejos del desborde de un float
+REBASE_AFTER_HALF_LIVES = 32
+SCALE_CHECK_INTERVAL = 3600  # segundos
+
+
+def popularity_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "POPULARITY", {})}
+
+
+def decay_factor(seconds: float, half_life_days: float | None) -> float:
+    """2 ** (seconds / vida media): lo que vale ahora una vista de hace -seconds."""
+    if half_life_days is None:
+        return 1.0
+    return 2.0 ** (seconds / (half_life_days * 86400))
+
+
+def sync_scale(half_life_days: float | None, now: float | None = None):
+    """
+    Reescala Recipe.popularity al instante `now` si la referencia quedó lejos
+    o si cambió la vida media. Devuelve la PopularityScale vigente.
+    """
+    from .models import PopularityScale, Recipe
+
+    now = time.time() if now is None else now
+    with transaction.atomic():
+        scale, _ = PopularityScale.objects.select_for_update().get_or_create(
+            pk=1, defaults={"epoch": now, "half_life_days": half_life_days}
+        )
+        elapsed = now - scale.epoch
+        far = (
+            scale.half_life_days is not None
+            and elapsed > REBASE_AFTER_HALF_LIVES * scale.half_life_days * 86400
+        )
+        if far or scale.half_life_days != half_life_days:
+            # Exponente negativo: puede llegar a 0.0, nunca desborda
+            factor = decay_factor(-elapsed, scale.half_life_days)
+            if factor != 1.0:
+                Recipe.objects.update(popularity=F("popularity") * factor)
+            scale.epoch, scale.half_life_days = now, half_life_days
+            scale.save()
+    return scale
+
+
+class ViewCounter:
+    """Acumulador por proceso, seguro entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Counter = Counter()
+        self._impressions: Counter = Counter()
+        # Pesos relativos a _reference (timestamp Unix de la última escritura)
+        self._weights: defaultdict = defaultdict(float)
+        self._reference = time.time()
+        self._last_flush = time.monotonic()
+        self._scale_checked: float | None = None
+
+    def record_view(self, recipe_id: int) -> None:
+        half_life_days = popularity_settings()["HALF_LIFE_DAYS"]
+        with self._lock:
+            self._views[recipe_id] += 1
+            self._weights[recipe_id] += decay_factor(time.time() - self._reference, half_life_days)
+        self._maybe_flush()
+
+    def record_impressions(self, recipe_ids) -> None:
+        with self._lock:
+            self._impressions.update(recipe_ids)
+        self._maybe_flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._views.keys() | self._impressions.keys())
+
+    def clear(self) -> None:
+        """Descarta lo acumulado sin escribirlo; la escala se revisa al escribir."""
+        with self._lock:
+            self._views, self._impressions = Counter(), Counter()
+            self._weights = defaultdict(float)
+            self._reference = time.time()
+            self._scale_checked = None
+
+    def _maybe_flush(self) -> None:
+        config = popularity_settings()
+        due = time.monotonic() - self._last_flush >= config["FLUSH_INTERVAL"]
+        if due or self.pending() >= config["MAX_PENDING"]:
+            try:
+                self.flush()
+            except DatabaseError:
+                pass  # los contadores se conservan para la próxima escritura
+
+    def flush(self) -> int:
+        """Escribe lo acumulado. Devuelve cuántas recetas se actualizaron."""
+        from .models import PopularityScale, Recipe
+
+        half_life_days = popularity_settings()["HALF_LIFE_DAYS"]
+        if self._scale_checked is None or (
+            time.monotonic() - self._scale_checked >= SCALE_CHECK_INTERVAL
+        ):
+            sync_scale(half_life_days)
+            self._scale_checked = time.monotonic()
+
+        with self._lock:
+            views, impressions, weights = self._views, self._impressions, self._weights
+            reference = self._reference
+            self._views, self._impressions = Counter(), Counter()
+            self._weights = defaultdict(float)
+            self._reference = time.time()
+            self._last_flush = time.monotonic()
+
+        # Los pesos pasan de `reference` a la referencia de la BD en el mismo
+        # UPDATE: otro proceso puede haberla movido desde la última revisión
+        to_scale = Value(1.0)
+        if half_life_days is not None:
+            epoch = Subquery(PopularityScale.objects.filter(pk=1).values("epoch")[:1])
+            to_scale = Power(
+                Value(2.0),
+                (Value(reference) - epoch) / Value(half_life_days * 86400.0),
+                output_field=FloatField(),
+            )
+
+        recipe_ids = sorted(views.keys() | impressions.keys())
+        updated = 0
+        try:
+            for start in range(0, len(recipe_ids), BATCH_SIZE):
+                batch = recipe_ids[start:start + BATCH_SIZE]
+                updated += Recipe.objects.filter(id__in=batch).update(
+                    view_count=F("view_count") + _increments(batch, views),
+                    impression_count=F("impression_count") + _increments(batch, impressions),
+                    popularity=F("popularity")
+                    + _increments(batch, weights, default=0.0) * to_scale,
+                )
+        except DatabaseError:
+            # Se devuelven los lotes no escritos (y el que falló) al acumulador
+            pending = set(recipe_ids[start:])
+            with self._lock:
+                rescale = decay_factor(reference - self._reference, half_life_days)
+                for recipe_id in pending:
+                    self._views[recipe_id] += views.get(recipe_id, 0)
+                    self._impressions[recipe_id] += impressions.get(recipe_id, 0)
+                    self._weights[recipe_id] += weights.get(recipe_id, 0.0) * rescale
+            raise
+        return updated
+
+
+def _increments(batch: list[int], counts, default=0):
+    whens = [
+        When(id=recipe_id, then=Value(counts[recipe_id]))
+        for recipe_id in batch
+        if counts.get(recipe_id)
+    ]
+    if not whens:
+        return Value(default)
+    return Case(*whens, default=Value(default))
+
+
+view_counter = ViewCounter()
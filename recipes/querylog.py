@@ -0,0 +1,220 @@
+# recipes/querylog.py
+"""
+Registro de consultas lentas.
+
+SlowQueryLogMiddleware (recipes/middleware.py) envuelve cada petición con
+`connection.execute_wrapper(SlowQueryLogger(...))`; también se puede usar
+directamente en comandos o tareas:
+
+    with log_slow_queries("build_similar_recipes"):
+        ...
+
+Cada consulta que supera THRESHOLD_MS agrega una línea JSON a PATH con:
+
+    fingerprint   hash del SQL normalizado
+    sql           SQL normalizado: literales -> ?, listas IN (...) colapsadas
+                  (la expansión de descendientes produce una lista distinta
+                  por cada selección, pero es la misma consulta)
+    params        forma de los parámetros, p. ej. "int*120, str"
+    duration_ms, view, at
+    plan          EXPLAIN QUERY PLAN (EXPLAIN fuera de SQLite), solo la
+                  primera vez que cada proceso ve esa huella
+
+`python manage.py slow_queries` agrupa el archivo por huella con conteos y
+percentiles. Configuración en settings.SLOW_QUERY_LOG.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+DEFAULTS = {
+    "ENABLED": False,
+    "THRESHOLD_MS": 100,
+    "EXPLAIN": True,
+    "PATH": None,  # None = no se registra nada
+}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+_READ_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def query_log_settings() -> dict:
+    return {**DEFAULTS, **getattr(settings, "SLOW_QUERY_LOG", {})}
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+def params_shape(params, many: bool = False) -> str:
+    """(1, 2, 3, 'x') -> "int*3, str". Nunca guarda los valores."""
+    if params is None:
+        return ""
+    if many:
+        params = list(params)
+        return f"{len(params)} x ({params_shape(params[0]) if params else ''})"
+    if isinstance(params, dict):
+        return ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items())
+    runs: list[list] = []
+    for value in params:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ", ".join(name if count == 1 else f"{name}*{count}" for name, count in runs)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = min(max(math.ceil(fraction * len(sorted_values)), 1), len(sorted_values))
+    return sorted_values[rank - 1]
+
+
+class SlowQueryLogger:
+    """Wrapper para connection.execute_wrapper()."""
+
+    # Huellas ya explicadas en este proceso
+    explained: set[str] = set()
+    _write_lock = threading.Lock()
+    _local = threading.local()  # evita registrar el propio EXPLAIN
+
+    def __init__(self, connection, view=None, config=None):
+        self.connection = connection
+        self.view = view  # str o callable (la vista se resuelve durante la petición)
+        self.config = config or query_log_settings()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, "active", False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)  # las que fallan no se registran
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= self.config["THRESHOLD_MS"]:
+            self._local.active = True
+            try:
+                self.record(sql, params, many, duration_ms)
+            finally:
+                self._local.active = False
+        return result
+
+    def record(self, sql, params, many, duration_ms) -> dict:
+        normalized = normalize_sql(sql)
+        key = fingerprint(normalized)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "fingerprint": key,
+            "sql": normalized,
+            "params": params_shape(params, many),
+            "duration_ms": round(duration_ms, 2),
+            "view": self.view() if callable(self.view) else self.view,
+            "plan": None,
+        }
+        if self.config["EXPLAIN"] and not many and key not in self.explained:
+            entry["plan"] = self.explain(sql, params)
+            if entry["plan"] is not None:
+                self.explained.add(key)
+        if self.config["PATH"]:
+            line = json.dumps(entry, ensure_ascii=False)
+            with self._write_lock, open(self.config["PATH"], "a", encoding="utf-8") as log:
+                log.write(line + "\n")
+        return entry
+
+    def explain(self, sql, params) -> list[str] | None:
+        if not _READ_RE.match(sql):
+            return None  # solo lecturas
+        prefix = "EXPLAIN QUERY PLAN " if self.connection.vendor == "sqlite" else "EXPLAIN "
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+        except DatabaseError:
+            return None
+        if self.connection.vendor == "sqlite":
+            # (id, padre, no usado, detalle): se indenta por nivel
+            depth = {0: -1}
+            lines = []
+            for node_id, parent_id, _, detail in rows:
+                depth[node_id] = depth.get(parent_id, -1) + 1
+                lines.append("  " * depth[node_id] + detail)
+            return lines
+        return [str(row[0]) for row in rows]
+
+
+@contextmanager
+def log_slow_queries(view=None, using=None):
+    """Registra las consultas lentas del bloque en todas las conexiones (o en `using`)."""
+    config = query_log_settings()
+    targets = [connections[using]] if using else connections.all()
+    with ExitStack() as stack:
+        for connection in targets:
+            stack.enter_context(
+                connection.execute_wrapper(SlowQueryLogger(connection, view, config))
+            )
+        yield
+
+
+def read_entries(path) -> list[dict]:
+    entries = []
+    try:
+        with open(path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # línea cortada por un proceso que terminó a la mitad
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def aggregate(entries) -> list[dict]:
+    """Agrupa por huella: conteo, percentiles, vistas y el último plan capturado."""
+    groups: dict[str, dict] = {}
+    for entry in entries:
+        group = groups.setdefault(entry["fingerprint"], {
+            "fingerprint": entry["fingerprint"],
+            "sql": entry["sql"],
+            "params": entry["params"],
+            "durations": [],
+            "views": {},
+            "plan": None,
+            "last_seen": entry["at"],
+        })
+        group["durations"].append(entry["duration_ms"])
+        view = entry.get("view") or "-"
+        group["views"][view] = group["views"].get(view, 0) + 1
+        group["plan"] = entry.get("plan") or group["plan"]
+        group["last_seen"] = max(group["last_seen"], entry["at"])
+
+    for group in groups.values():
+        durations = sorted(group.pop("durations"))
+        group.update(
+            count=len(durations),
+            total_ms=round(sum(durations), 2),
+            p50_ms=percentile(durations, 0.50),
+            p95_ms=percentile(durations, 0.95),
+            p99_ms=percentile(durations, 0.99),
+            max_ms=durations[-1],
+        )
+    return list(groups.values())
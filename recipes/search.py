@@ -0,0 +1,215 @@
+"""
+Ranking de relevancia BM25F para la búsqueda de recetas.
+
+El índice vive en la base de datos (RecipeSearchPosting, RecipeSearchDocument
+y SearchTermStat) y se actualiza al guardar/borrar cada receta (los guardados
+con update_fields que no incluyen texto no reindexan). Las recetas anteriores
+al índice se cargan en la migración 0011_backfill_search_index. En la consulta
+solo se leen los postings de los tokens buscados, restringidos a las recetas
+que ya pasaron los demás filtros, y el score se calcula de forma vectorizada
+con NumPy sobre ese conjunto de candidatas.
+
+NumPy se importa dentro de `rank_recipes`: este módulo se carga al arrancar
+(vía las señales) y la indexación no lo necesita.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Avg, Count, F
+
+from .autocomplete import normalize_words
+from .ingredients import singularize
+from .models import (
+    Recipe,
+    RecipeSearchDocument,
+    RecipeSearchPosting,
+    SearchField,
+    SearchTermStat,
+)
+
+# Parámetros estándar de BM25
+K1 = 1.2
+B = 0.75
+
+# Un token en el título pesa más que en las instrucciones
+FIELD_BOOSTS = {
+    SearchField.TITLE: 3.0,
+    SearchField.INGREDIENTS: 2.0,
+    SearchField.DESCRIPTION: 1.5,
+    SearchField.INSTRUCTIONS: 1.0,
+}
+
+FIELD_SOURCES = {
+    SearchField.TITLE: ("title", "title_length"),
+    SearchField.INGREDIENTS: ("ingredients_text", "ingredients_length"),
+    SearchField.DESCRIPTION: ("description", "description_length"),
+    SearchField.INSTRUCTIONS: ("instructions", "instructions_length"),
+}
+
+# Campos de Recipe cuyo cambio obliga a reindexar
+INDEXED_FIELDS = frozenset(attr for attr, _ in FIELD_SOURCES.values())
+
+STOPWORDS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los",
+    "o", "para", "por", "se", "sin", "su", "un", "una", "y",
+}
+
+MAX_TOKEN_LENGTH = RecipeSearchPosting._meta.get_field("token").max_length
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    'Pollos asados con limón' -> ['pollo', 'asado', 'limon']
+    Mismas reglas para indexar y para consultar.
+    """
+    return [
+        singularize(word)[:MAX_TOKEN_LENGTH]
+        for word in normalize_words(text)
+        if word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+# ---- mantenimiento del índice ---------------------------------------------
+
+
+def _adjust_doc_freq(tokens, delta: int) -> None:
+    if not tokens:
+        return
+    if delta > 0:
+        SearchTermStat.objects.bulk_create(
+            [SearchTermStat(token=token, doc_freq=0) for token in tokens],
+            ignore_conflicts=True,
+        )
+    SearchTermStat.objects.filter(token__in=tokens).update(doc_freq=F("doc_freq") + delta)
+
+
+@transaction.atomic
+def index_recipe(recipe: Recipe) -> None:
+    """
+    Reindexa una receta: reemplaza sus postings y longitudes de campo
+    y ajusta el doc_freq solo de los tokens que entran o salen.
+    """
+    postings = []
+    lengths = {}
+    for field, (attr, length_attr) in FIELD_SOURCES.items():
+        tokens = tokenize(getattr(recipe, attr))
+        lengths[length_attr] = len(tokens)
+        postings.extend(
+            RecipeSearchPosting(recipe=recipe, token=token, field=field, term_frequency=tf)
+            for token, tf in Counter(tokens).items()
+        )
+
+    old_tokens = set(
+        RecipeSearchPosting.objects.filter(recipe=recipe).values_list("token", flat=True)
+    )
+    new_tokens = {posting.token for posting in postings}
+
+    RecipeSearchPosting.objects.filter(recipe=recipe).delete()
+    RecipeSearchPosting.objects.bulk_create(postings)
+    RecipeSearchDocument.objects.update_or_create(recipe=recipe, defaults=lengths)
+
+    _adjust_doc_freq(new_tokens - old_tokens, 1)
+    _adjust_doc_freq(old_tokens - new_tokens, -1)
+
+
+def unindex_recipe(recipe: Recipe) -> None:
+    """Descuenta los tokens de una receta que se va a borrar."""
+    tokens = set(
+        RecipeSearchPosting.objects.filter(recipe=recipe).values_list("token", flat=True)
+    )
+    _adjust_doc_freq(tokens, -1)
+
+
+@transaction.atomic
+def rebuild_search_index() -> int:
+    """Reconstruye todo el índice desde cero. Devuelve el número de recetas."""
+    RecipeSearchPosting.objects.all().delete()
+    RecipeSearchDocument.objects.all().delete()
+    SearchTermStat.objects.all().delete()
+
+    total = 0
+    for recipe in Recipe.objects.order_by("id").iterator(chunk_size=500):
+        index_recipe(recipe)
+        total += 1
+    return total
+
+
+# ---- consulta -------------------------------------------------------------
+
+
+def rank_recipes(query: str, queryset) -> list[tuple[int, float]]:
+    """
+    Calcula BM25F de `query` sobre las recetas de `queryset`.
+
+    Args:
+        query: Texto buscado
+        queryset: Recetas candidatas (ya filtradas por términos, etc.)
+
+    Returns:
+        Lista [(recipe_id, score), ...] ordenada por score descendente y
+        id ascendente (orden estable para paginar por cursor).
+    """
+    import numpy as np
+
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return []
+
+    rows = list(
+        RecipeSearchPosting.objects.filter(
+            token__in=tokens, recipe__in=queryset.values("id")
+        ).values_list("recipe_id", "token", "field", "term_frequency")
+    )
+    if not rows:
+        return []
+
+    stats = RecipeSearchDocument.objects.aggregate(
+        total=Count("recipe"),
+        **{
+            f"avg_{field.value}": Avg(length_attr)
+            for field, (_, length_attr) in FIELD_SOURCES.items()
+        },
+    )
+    doc_freq = dict(
+        SearchTermStat.objects.filter(token__in=tokens).values_list("token", "doc_freq")
+    )
+
+    recipe_ids, recipe_pos = np.unique(
+        np.array([r[0] for r in rows], dtype=np.int64), return_inverse=True
+    )
+    token_index = {token: i for i, token in enumerate(tokens)}
+    token_pos = np.array([token_index[r[1]] for r in rows], dtype=np.int64)
+    fields = np.array([r[2] for r in rows], dtype=np.int64)
+    tf = np.array([r[3] for r in rows], dtype=np.float64)
+
+    # Longitudes por (receta candidata, campo)
+    length_table = np.zeros((len(recipe_ids), len(SearchField) + 1))
+    for recipe_id, *field_lengths in RecipeSearchDocument.objects.filter(
+        recipe_id__in=recipe_ids.tolist()
+    ).values_list("recipe_id", *(attr for _, attr in FIELD_SOURCES.values())):
+        row = np.searchsorted(recipe_ids, recipe_id)
+        for field, length in zip(FIELD_SOURCES, field_lengths):
+            length_table[row, field] = length
+
+    boosts = np.zeros(len(SearchField) + 1)
+    avg_lengths = np.ones(len(SearchField) + 1)
+    for field in FIELD_SOURCES:
+        boosts[field] = FIELD_BOOSTS[field]
+        avg_lengths[field] = stats[f"avg_{field.value}"] or 1.0
+
+    # tf ponderado por campo (BM25F): boost * tf / (1 - b + b * len / avg_len)
+    norm = 1 - B + B * length_table[recipe_pos, fields] / avg_lengths[fields]
+    weighted_tf = np.zeros(len(recipe_ids) * len(tokens))
+    np.add.at(
+        weighted_tf, recipe_pos * len(tokens) + token_pos, boosts[fields] * tf / norm
+    )
+    weighted_tf = weighted_tf.reshape(len(recipe_ids), len(tokens))
+
+    total = stats["total"] or 1
+    df = np.array([doc_freq.get(token, 0) for token in tokens], dtype=np.float64)
+    idf = np.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    scores = (idf * weighted_tf * (K1 + 1) / (weighted_tf + K1)).sum(axis=1)
+
+    order = np.lexsort((recipe_ids, -scores))
+    return [(int(recipe_ids[i]), round(float(scores[i]), 6)) for i in order]
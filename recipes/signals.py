@@ -0,0 +1,300 @@
+# recipes/signals.py
+"""
+Mantiene sincronizadas las estructuras derivadas (índices en memoria)
+con las escrituras sobre los modelos del catálogo.
+"""
+from functools import partial, wraps
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .autocomplete import Suggestion, autocomplete_index
+from .catalog import catalog_store
+from .cooccurrence import cooccurrence_index
+from .images import release_image, retain_image
+from .models import ChangeLogEntry, Facet, Recipe, RecipeTerm, Taxonomy, Term
+from .percolator import TEXT_FIELDS, schedule_percolation
+from .search import INDEXED_FIELDS, index_recipe, unindex_recipe
+from .taxonomy import reorganizing, terms_reorganized
+
+
+def on_commit(func, *args):
+    """
+    Aplica el cambio a un índice en memoria solo si la transacción se
+    confirma: una escritura revertida no debe aparecer en las sugerencias.
+    """
+    transaction.on_commit(partial(func, *args))
+
+
+def per_row(receiver_func):
+    """
+    Receptor por fila que no corre durante una reorganización en bloque
+    (recipes/taxonomy.py): allí terms_reorganized invalida todo una vez.
+    """
+    @wraps(receiver_func)
+    def wrapper(sender, **kwargs):
+        if not reorganizing():
+            receiver_func(sender, **kwargs)
+    return wrapper
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    on_commit(
+        autocomplete_index.upsert,
+        Suggestion("recipe", instance.id, instance.title, popularity=1, slug=instance.slug),
+    )
+    update_fields = kwargs.get("update_fields")
+    # save(update_fields=["view_count", ...]) no cambia el texto indexado
+    if update_fields is None or not INDEXED_FIELDS.isdisjoint(update_fields):
+        index_recipe(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Antes del CASCADE: los postings aún existen para descontar doc_freq
+    unindex_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    on_commit(autocomplete_index.remove, "recipe", instance.id)
+
+
+@receiver(post_save, sender=Term)
+def term_saved(sender, instance, **kwargs):
+    on_commit(
+        autocomplete_index.upsert,
+        Suggestion(
+            "term", instance.id, instance.name,
+            popularity=None, facet_id=instance.facet_id, facet=instance.facet.name,
+        ),
+    )
+
+
+@receiver(post_delete, sender=Term)
+@per_row
+def term_deleted(sender, instance, **kwargs):
+    on_commit(autocomplete_index.remove, "term", instance.id)
+
+
+@receiver(post_save, sender=Facet)
+def facet_saved(sender, instance, created, **kwargs):
+    if not created:
+        on_commit(autocomplete_index.rename_facet, instance.id, instance.name)
+
+
+@receiver(post_save, sender=RecipeTerm)
+def recipe_term_saved(sender, instance, created, **kwargs):
+    if created:
+        on_commit(autocomplete_index.add_popularity, "term", instance.term_id, 1)
+
+
+@receiver(post_delete, sender=RecipeTerm)
+@per_row
+def recipe_term_deleted(sender, instance, **kwargs):
+    on_commit(autocomplete_index.add_popularity, "term", instance.term_id, -1)
+
+
+@receiver(m2m_changed, sender=Recipe.terms.through)
+def recipe_terms_changed(sender, action, **kwargs):
+    # recipe.terms.add()/remove()/clear() no emiten post_save por fila
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(autocomplete_index.invalidate)
+
+
+@receiver(post_save, sender=Taxonomy)
+@receiver(post_delete, sender=Taxonomy)
+@receiver(post_save, sender=Facet)
+@receiver(post_delete, sender=Facet)
+@receiver(post_save, sender=Term)
+@receiver(post_delete, sender=Term)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeTerm)
+@receiver(post_delete, sender=RecipeTerm)
+@receiver(m2m_changed, sender=Recipe.terms.through)
+@per_row
+def catalog_changed(sender, **kwargs):
+    if kwargs.get("action", "post").startswith("pre"):
+        return  # m2m_changed emite pre_* y post_*; basta con el post
+    # Tras el commit: si otro proceso recarga antes, leería los datos viejos
+    transaction.on_commit(catalog_store.invalidate)
+
+
+# ---- registro de cambios (/api/v1/changes/) --------------------------------
+
+CHANGE_ENTITIES = {
+    Taxonomy: ChangeLogEntry.Entity.TAXONOMY,
+    Facet: ChangeLogEntry.Entity.FACET,
+    Term: ChangeLogEntry.Entity.TERM,
+    Recipe: ChangeLogEntry.Entity.RECIPE,
+    RecipeTerm: ChangeLogEntry.Entity.RECIPE_TERM,
+}
+
+
+def log_changes(entity: str, object_ids, deleted: bool = False) -> None:
+    ChangeLogEntry.objects.bulk_create(
+        [ChangeLogEntry(entity=entity, object_id=object_id, deleted=deleted) for object_id in object_ids]
+    )
+
+
+@receiver(post_save, sender=Taxonomy)
+@receiver(post_save, sender=Facet)
+@receiver(post_save, sender=Term)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeTerm)
+def log_saved(sender, instance, **kwargs):
+    log_changes(CHANGE_ENTITIES[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Taxonomy)
+@receiver(post_delete, sender=Facet)
+@receiver(post_delete, sender=Term)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=RecipeTerm)
+@per_row
+def log_deleted(sender, instance, **kwargs):
+    # Los CASCADE también pasan por aquí (una lápida por fila borrada)
+    log_changes(CHANGE_ENTITIES[sender], [instance.pk], deleted=True)
+
+
+def _recipe_term_ids(instance, reverse: bool, pk_set) -> list[int]:
+    owner, other = ("term_id", "recipe_id") if reverse else ("recipe_id", "term_id")
+    links = RecipeTerm.objects.filter(**{owner: instance.pk})
+    if pk_set is not None:
+        links = links.filter(**{f"{other}__in": pk_set})
+    return list(links.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.terms.through)
+def log_recipe_terms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # recipe.terms.add()/remove()/clear() no emiten post_save/post_delete de
+    # RecipeTerm: los ids de las filas se leen antes de borrarlas
+    if action in ("pre_remove", "pre_clear"):
+        instance._removed_recipe_term_ids = _recipe_term_ids(instance, reverse, pk_set)
+    elif action in ("post_remove", "post_clear"):
+        log_changes(
+            ChangeLogEntry.Entity.RECIPE_TERM,
+            instance.__dict__.pop("_removed_recipe_term_ids", []),
+            deleted=True,
+        )
+    elif action == "post_add":
+        log_changes(ChangeLogEntry.Entity.RECIPE_TERM, _recipe_term_ids(instance, reverse, pk_set))
+
+
+# ---- referencias a imágenes (ver recipes/images.py) ------------------------
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_changing(sender, instance, **kwargs):
+    # Aquí image.name todavía es el nombre subido: la ruta final se conoce
+    # en post_save, después de que el campo guarda el archivo
+    update_fields = kwargs.get("update_fields")
+    if instance._state.adding:
+        instance._previous_image = ""
+    elif update_fields is not None and "image" not in update_fields:
+        instance._previous_image = instance.image.name or ""
+    else:
+        instance._previous_image = (
+            Recipe.objects.filter(pk=instance.pk).values_list("image", flat=True).first() or ""
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    previous = instance.__dict__.pop("_previous_image", "")
+    current = instance.image.name or ""
+    if previous != current:
+        retain_image(current)
+        release_image(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_image_released(sender, instance, **kwargs):
+    release_image(instance.image.name or "")
+
+
+# ---- co-ocurrencia de términos (ver recipes/cooccurrence.py) ---------------
+
+@receiver(post_save, sender=RecipeTerm)
+def cooccurrence_tagged(sender, instance, created, **kwargs):
+    if created:
+        on_commit(cooccurrence_index.tag, instance.recipe_id, instance.term_id)
+    else:
+        on_commit(cooccurrence_index.invalidate)  # no se conoce el término anterior
+
+
+@receiver(post_delete, sender=RecipeTerm)
+@per_row
+def cooccurrence_untagged(sender, instance, **kwargs):
+    on_commit(cooccurrence_index.untag, instance.recipe_id, instance.term_id)
+
+
+@receiver(m2m_changed, sender=Recipe.terms.through)
+def cooccurrence_terms_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        on_commit(cooccurrence_index.invalidate)
+
+
+@receiver(post_save, sender=Term)
+@receiver(post_delete, sender=Term)
+@per_row
+def cooccurrence_hierarchy_changed(sender, **kwargs):
+    # Términos nuevos o cambios de padre: nuevas columnas o ancestros
+    on_commit(cooccurrence_index.invalidate)
+
+
+# ---- búsquedas guardadas (ver recipes/percolator.py) -----------------------
+
+@receiver(pre_save, sender=Recipe)
+def recipe_text_changing(sender, instance, **kwargs):
+    # Los contadores (view_count, popularity...) no cambian qué búsquedas
+    # coinciden: solo se percola si cambió el texto que compara q
+    update_fields = kwargs.get("update_fields")
+    if instance._state.adding:
+        instance._text_changed = True
+    elif update_fields is not None and set(TEXT_FIELDS).isdisjoint(update_fields):
+        instance._text_changed = False
+    else:
+        previous = Recipe.objects.filter(pk=instance.pk).values_list(*TEXT_FIELDS).first()
+        instance._text_changed = previous != tuple(getattr(instance, field) for field in TEXT_FIELDS)
+
+
+@receiver(post_save, sender=Recipe)
+def percolate_recipe(sender, instance, created, **kwargs):
+    # Las etiquetas nuevas llegan por RecipeTerm/m2m_changed (abajo)
+    if instance.__dict__.pop("_text_changed", True) or created:
+        schedule_percolation([instance.pk])
+
+
+@receiver(post_save, sender=RecipeTerm)
+def percolate_recipe_term(sender, instance, **kwargs):
+    schedule_percolation([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.terms.through)
+def percolate_recipe_terms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        schedule_percolation([instance.pk])
+    elif pk_set:
+        schedule_percolation(pk_set)  # term.recipes.add(...)
+
+
+# ---- reorganización en bloque (ver recipes/taxonomy.py) -------------------
+
+@receiver(terms_reorganized)
+def taxonomy_reorganized(sender, term_ids, deleted_term_ids, recipe_term_ids,
+                         deleted_recipe_term_ids, recipe_ids, **kwargs):
+    # Una sola invalidación por operación, en lugar de una por fila
+    transaction.on_commit(autocomplete_index.invalidate)
+    transaction.on_commit(cooccurrence_index.invalidate)
+    transaction.on_commit(catalog_store.invalidate)
+    log_changes(ChangeLogEntry.Entity.TERM, term_ids)
+    log_changes(ChangeLogEntry.Entity.TERM, deleted_term_ids, deleted=True)
+    log_changes(ChangeLogEntry.Entity.RECIPE_TERM, recipe_term_ids)
+    log_changes(ChangeLogEntry.Entity.RECIPE_TERM, deleted_recipe_term_ids, deleted=True)
+    if recipe_ids:
+        schedule_percolation(recipe_ids)
@@ -0,0 +1,217 @@
+"""
+Cálculo batch de "recetas similares".
+
+Construye una matriz dispersa receta×término (CSR sobre arreglos NumPy)
+a partir de RecipeTerm, pondera cada término con IDF normalizado por faceta
+y obtiene los top-k vecinos por similitud coseno. El resultado se guarda
+en RecipeSimilarity para leerlo en O(1) desde el detalle de la receta.
+"""
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import transaction
+
+from .catalog import catalog_store
+from .models import Recipe, RecipeSimilarity, RecipeTerm
+
+DEFAULT_TOP_K = 10
+
+
+@dataclass
+class TermMatrix:
+    """
+    Matriz receta×término en formato CSR, con filas normalizadas (L2)
+    y su transpuesta (CSC) para recorrer recetas por término.
+    """
+    recipe_ids: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    fingerprints: list[str]
+    term_indptr: np.ndarray
+    term_rows: np.ndarray
+    term_data: np.ndarray
+
+    @classmethod
+    def from_database(cls) -> "TermMatrix":
+        recipe_ids = np.fromiter(
+            Recipe.objects.order_by("id").values_list("id", flat=True), dtype=np.int64
+        )
+        rows = list(
+            RecipeTerm.objects.order_by("recipe_id", "term_id").values_list(
+                "recipe_id", "term_id", "term__facet_id"
+            )
+        )
+        n_recipes = len(recipe_ids)
+
+        row_of = np.searchsorted(
+            recipe_ids, np.array([r[0] for r in rows], dtype=np.int64)
+        )
+        term_ids, columns = np.unique(
+            np.array([r[1] for r in rows], dtype=np.int64), return_inverse=True
+        )
+        facet_ids = np.array([r[2] for r in rows], dtype=np.int64)
+
+        # IDF suavizado: términos muy comunes ("Fácil") pesan menos
+        doc_freq = np.bincount(columns, minlength=len(term_ids))
+        idf = np.log((1 + n_recipes) / (1 + doc_freq)) + 1.0
+
+        # Normalización por faceta: una faceta con muchas etiquetas en la
+        # receta no domina a las demás (peso / sqrt(n_terms_en_faceta))
+        facet_key = row_of * (facet_ids.max(initial=0) + 1) + facet_ids
+        _, facet_group = np.unique(facet_key, return_inverse=True)
+        facet_counts = np.bincount(facet_group)
+        data = idf[columns] / np.sqrt(facet_counts[facet_group])
+
+        indptr = np.zeros(n_recipes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of, minlength=n_recipes), out=indptr[1:])
+
+        # Normalización L2 por fila: el producto punto pasa a ser el coseno
+        norms = np.sqrt(np.bincount(row_of, weights=data ** 2, minlength=n_recipes))
+        norms[norms == 0] = 1.0
+        data = data / norms[row_of]
+
+        fingerprints = [
+            hashlib.sha1(
+                ",".join(map(str, term_ids[columns[indptr[i]:indptr[i + 1]]])).encode()
+            ).hexdigest()
+            for i in range(n_recipes)
+        ]
+
+        # Transpuesta CSC: para cada término, las recetas que lo usan
+        order = np.argsort(columns, kind="stable")
+        term_indptr = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=term_indptr[1:])
+
+        return cls(
+            recipe_ids=recipe_ids,
+            indptr=indptr,
+            indices=columns,
+            data=data,
+            fingerprints=fingerprints,
+            term_indptr=term_indptr,
+            term_rows=row_of[order],
+            term_data=data[order],
+        )
+
+    def scores_for_row(self, row: int) -> np.ndarray:
+        """Similitud coseno de la fila `row` contra todas las recetas."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        columns = self.indices[start:end]
+        weights = self.data[start:end]
+
+        starts = self.term_indptr[columns]
+        lengths = self.term_indptr[columns + 1] - starts
+        # Posiciones de todas las listas de recetas de los términos de la fila
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+        scores = np.bincount(
+            self.term_rows[positions],
+            weights=np.repeat(weights, lengths) * self.term_data[positions],
+            minlength=len(self.recipe_ids),
+        )
+        scores[row] = 0.0
+        return scores
+
+    def top_k(self, scores: np.ndarray, k: int) -> list[list]:
+        """Top-k vecinos con score > 0 como [[recipe_id, score], ...]."""
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [[int(self.recipe_ids[i]), round(float(scores[i]), 4)] for i in candidates]
+
+
+def build_similar_recipes(top_k: int = DEFAULT_TOP_K, full: bool = False) -> dict:
+    """
+    Calcula y guarda los vecinos de cada receta.
+
+    En modo incremental (por defecto) solo se recalculan las filas de
+    recetas cuya huella de términos cambió; las listas de las demás recetas
+    se parchean con los nuevos scores de esas filas (la similitud es
+    simétrica), sin recalcularlas. Si una lista llena pierde vecinos
+    (cambiaron o se borraron), esa fila sí se recalcula para rellenarla
+    desde el puesto k+1.
+
+    Conviene un `full=True` periódico: los pesos IDF globales también se
+    desplazan con el tiempo.
+
+    Returns:
+        Resumen {"recipes", "recomputed", "updated"}.
+    """
+    matrix = TermMatrix.from_database()
+    row_of = {int(recipe_id): i for i, recipe_id in enumerate(matrix.recipe_ids)}
+
+    stored = {
+        recipe_id: (fingerprint, neighbours)
+        for recipe_id, fingerprint, neighbours in RecipeSimilarity.objects.values_list(
+            "recipe_id", "terms_fingerprint", "neighbours"
+        )
+    }
+
+    if full:
+        changed = list(row_of)
+    else:
+        changed = [
+            recipe_id
+            for recipe_id, row in row_of.items()
+            if recipe_id not in stored or stored[recipe_id][0] != matrix.fingerprints[row]
+        ]
+    changed_set = set(changed)
+
+    results: dict[int, list] = {}
+    contributions: dict[int, list] = {}
+    for recipe_id in changed:
+        scores = matrix.scores_for_row(row_of[recipe_id])
+        results[recipe_id] = matrix.top_k(scores, top_k)
+        if not full:
+            for other in np.flatnonzero(scores > 0):
+                other_id = int(matrix.recipe_ids[other])
+                if other_id not in changed_set:
+                    contributions.setdefault(other_id, []).append(
+                        [recipe_id, round(float(scores[other]), 4)]
+                    )
+
+    if not full:
+        for recipe_id, (_, neighbours) in stored.items():
+            if recipe_id in changed_set or recipe_id not in row_of:
+                continue
+            # Se descartan vecinos recalculados y recetas que ya no existen
+            merged = [
+                n for n in neighbours if n[0] in row_of and n[0] not in changed_set
+            ]
+            if recipe_id not in contributions and len(merged) == len(neighbours):
+                continue
+            if len(merged) < len(neighbours) and len(neighbours) >= top_k:
+                # La lista estaba truncada: el que ocupaba el puesto k+1 no
+                # está guardado, así que se recalcula la fila completa
+                results[recipe_id] = matrix.top_k(matrix.scores_for_row(row_of[recipe_id]), top_k)
+                continue
+            merged += contributions.get(recipe_id, [])
+            merged.sort(key=lambda n: -n[1])
+            results[recipe_id] = merged[:top_k]
+
+    objs = [
+        RecipeSimilarity(
+            recipe_id=recipe_id,
+            neighbours=neighbours,
+            terms_fingerprint=matrix.fingerprints[row_of[recipe_id]],
+        )
+        for recipe_id, neighbours in results.items()
+        if recipe_id in changed_set or neighbours != stored[recipe_id][1]
+    ]
+    with transaction.atomic():
+        RecipeSimilarity.objects.bulk_create(
+            objs,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["recipe"],
+            update_fields=["neighbours", "terms_fingerprint", "updated_at"],
+        )
+    if objs:
+        # bulk_create no emite señales; el detalle del catálogo incluye "similar"
+        catalog_store.invalidate()
+
+    return {"recipes": len(row_of), "recomputed": len(changed), "updated": len(objs)}
@@ -0,0 +1,151 @@
+"""
+Snapshot estático del catálogo.
+
+Renderiza las páginas HTML de detalle, el JSON de detalle de la API y los
+árboles de taxonomía a un directorio de salida, junto con un manifest.json
+que indica al CDN qué archivo sirve cada URL. Se usa desde el comando
+`python manage.py build_snapshot`.
+
+Las recetas se renderizan en paralelo con un ProcessPoolExecutor; cada
+proceso inicializa Django por su cuenta y usa su propio test Client, así que
+la salida es idéntica a la que daría el servidor (middleware incluido).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .internal import INTERNAL_RENDER_KEY
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Listados de taxonomía que el frontend consume completos
+TREE_ROUTES = ("facet-terms-tree-list", "term-tree-list", "taxonomy-list", "facet-list")
+
+_client = None
+
+
+def init_worker(settings_module: str, base_url: str) -> None:
+    """Inicializador de cada proceso del pool."""
+    global _client
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+
+    import django
+
+    django.setup()
+
+    from django.test import Client
+
+    parts = urlsplit(base_url)
+    _client = Client(
+        HTTP_HOST=parts.netloc,
+        HTTP_ACCEPT="application/json",
+        secure=parts.scheme == "https",
+        **{INTERNAL_RENDER_KEY: True},
+    )
+
+
+def output_path_for(url_path: str, extension: str) -> str:
+    """'/api/v1/recipes/pastel/' -> 'api/v1/recipes/pastel/index.json'"""
+    return f"{url_path.strip('/')}/index.{extension}"
+
+
+def render_to_file(output_dir: str, url_path: str, extension: str) -> dict:
+    """Renderiza una URL y la guarda. Devuelve su entrada del manifest."""
+    response = _client.get(url_path)
+    if response.status_code != 200:
+        raise RuntimeError(f"{url_path} respondió {response.status_code}")
+
+    relative = output_path_for(url_path, extension)
+    target = Path(output_dir) / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(response.content)
+
+    return {
+        "file": relative,
+        "content_type": response["Content-Type"],
+        "size": len(response.content),
+        "sha256": hashlib.sha256(response.content).hexdigest(),
+    }
+
+
+def render_recipes(output_dir: str, recipes: list[tuple[int, str]]) -> dict:
+    """
+    Renderiza HTML + JSON de un lote de recetas (se ejecuta en el pool).
+
+    Returns:
+        {url_path: entrada_del_manifest}
+    """
+    from django.urls import reverse
+
+    entries = {}
+    for recipe_id, slug in recipes:
+        html_path = reverse("recipes:recipe_detail", kwargs={"slug": slug})
+        api_path = reverse("recipes:recipe-detail", kwargs={"slug": slug})
+        for url_path, extension in ((html_path, "html"), (api_path, "json")):
+            entries[url_path] = {
+                **render_to_file(output_dir, url_path, extension),
+                "recipe": recipe_id,
+            }
+    return entries
+
+
+def render_trees(output_dir: str) -> dict:
+    from django.urls import reverse
+
+    entries = {}
+    for route in TREE_ROUTES:
+        url_path = reverse(f"recipes:{route}")
+        entries[url_path] = render_to_file(output_dir, url_path, "json")
+    return entries
+
+
+def recipe_signatures() -> dict[int, dict]:
+    """
+    Firma por receta de todo lo que aparece en su detalle: campos propios
+    (updated_at), sus términos y sus similares precalculados, incluido el
+    updated_at de cada vecino (su título y slug se muestran en "similar").
+    """
+    from .models import Recipe, RecipeSimilarity, RecipeTerm
+
+    terms: dict[int, list[int]] = {}
+    rows = RecipeTerm.objects.order_by("recipe_id", "term_id").values_list("recipe_id", "term_id")
+    for recipe_id, term_id in rows:
+        terms.setdefault(recipe_id, []).append(term_id)
+
+    recipes = list(Recipe.objects.values_list("id", "slug", "updated_at"))
+    updated = {recipe_id: updated_at.isoformat() for recipe_id, _, updated_at in recipes}
+
+    similar = {}
+    for recipe_id, neighbours in RecipeSimilarity.objects.values_list("recipe_id", "neighbours"):
+        similar[recipe_id] = [
+            (neighbour_id, score, updated.get(neighbour_id)) for neighbour_id, score in neighbours
+        ]
+
+    signatures = {}
+    for recipe_id, slug, _ in recipes:
+        raw = f"{updated[recipe_id]}|{terms.get(recipe_id, [])}|{similar.get(recipe_id)}"
+        signatures[recipe_id] = {
+            "slug": slug,
+            "signature": hashlib.sha1(raw.encode()).hexdigest(),
+        }
+    return signatures
+
+
+def load_manifest(output_dir: str) -> dict | None:
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    manifest = json.loads(path.read_text())
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(output_dir: str, manifest: dict) -> None:
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(path)
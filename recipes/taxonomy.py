@@ -0,0 +1,224 @@
+# recipes/taxonomy.py
+"""
+Reorganización de la taxonomía en bloque: mover un subárbol, fusionar dos
+términos y reordenar hermanos.
+
+Editar los términos uno por uno en el admin emite señales por cada fila y
+cada una invalida los índices derivados (autocompletado, co-ocurrencia,
+catálogo...). Estas operaciones, en cambio:
+
+    - corren en una transacción, con unas pocas sentencias por conjunto
+      (UPDATE ... WHERE id IN ...), sin instanciar los términos;
+    - no emiten post_save por fila, y los post_delete de las filas que
+      borran se ignoran (ver reorganizing());
+    - al final envían una sola señal `terms_reorganized` con los ids
+      afectados, que recipes/signals.py usa para invalidar todo una vez.
+
+Los errores (ciclos, nombres repetidos entre hermanos) se reportan con
+ValidationError antes de escribir nada.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Max, Value, When
+from django.dispatch import Signal
+
+from .models import RecipeTerm, SavedSearch, SavedSearchTerm, Term
+from .percolator import set_search_terms
+
+# Argumentos: term_ids, deleted_term_ids, recipe_term_ids,
+# deleted_recipe_term_ids, recipe_ids (recetas cuyo etiquetado efectivo cambió)
+terms_reorganized = Signal()
+
+_reorganizing: ContextVar[bool] = ContextVar("recipes_taxonomy_reorganizing", default=False)
+
+
+def reorganizing() -> bool:
+    """
+    True mientras una operación en bloque borra filas: los receptores por
+    fila de recipes/signals.py no hacen nada y terms_reorganized cubre el cambio.
+    """
+    return _reorganizing.get()
+
+
+@contextmanager
+def _skip_row_signals():
+    token = _reorganizing.set(True)
+    try:
+        yield
+    finally:
+        _reorganizing.reset(token)
+
+
+def _tree() -> tuple[dict[int, tuple[int | None, int, str]], dict[int | None, list[int]]]:
+    """Todos los términos en una consulta: {id: (padre, faceta, nombre)} e hijos por padre."""
+    terms = {}
+    children: dict[int | None, list[int]] = {}
+    for term_id, parent_id, facet_id, name in Term.objects.order_by().values_list(
+        "id", "parent_id", "facet_id", "name"
+    ):
+        terms[term_id] = (parent_id, facet_id, name)
+        children.setdefault(parent_id, []).append(term_id)
+    return terms, children
+
+
+def _subtree(term_id: int, children) -> list[int]:
+    ids, stack = [], [term_id]
+    while stack:
+        current = stack.pop()
+        ids.append(current)
+        stack.extend(children.get(current, ()))
+    return ids
+
+
+def _get(terms, term_id, field: str) -> tuple[int | None, int, str]:
+    if term_id not in terms:
+        raise ValidationError({field: f"El término {term_id} no existe."})
+    return terms[term_id]
+
+
+def _tagged_recipes(term_ids) -> set[int]:
+    return set(
+        RecipeTerm.objects.filter(term_id__in=term_ids).values_list("recipe_id", flat=True)
+    )
+
+
+def _send(**changes) -> None:
+    changes = {
+        "term_ids": [], "deleted_term_ids": [], "recipe_term_ids": [],
+        "deleted_recipe_term_ids": [], "recipe_ids": set(), **changes,
+    }
+    terms_reorganized.send(sender=Term, **changes)
+
+
+@transaction.atomic
+def move_subtree(term_id: int, parent_id: int | None, facet_id: int | None = None) -> list[int]:
+    """
+    Cuelga `term_id` (con todos sus descendientes) de `parent_id`, o lo
+    vuelve raíz con parent_id=None. Queda al final de sus nuevos hermanos.
+
+    Con un padre, el subárbol pasa a la faceta del padre; sin padre, a
+    `facet_id` (por omisión la suya). Devuelve los ids del subárbol.
+    """
+    terms, children = _tree()
+    _, current_facet, name = _get(terms, term_id, "term")
+    subtree = _subtree(term_id, children)
+
+    if parent_id is not None:
+        parent_facet = _get(terms, parent_id, "parent")[1]
+        if parent_id in subtree:
+            raise ValidationError({"parent": "No se puede mover un término debajo de sí mismo."})
+        if facet_id is not None and facet_id != parent_facet:
+            raise ValidationError({"facet": "El padre pertenece a otra faceta."})
+        facet_id = parent_facet
+    elif facet_id is None:
+        facet_id = current_facet
+
+    siblings = [
+        sibling for sibling in children.get(parent_id, ())
+        if sibling != term_id and terms[sibling][1] == facet_id
+    ]
+    if any(terms[sibling][2] == name for sibling in siblings):
+        raise ValidationError({"parent": f"Ya existe un término “{name}” en ese nivel."})
+
+    last = Term.objects.filter(id__in=siblings).aggregate(last=Max("order"))["last"]
+    Term.objects.filter(id=term_id).update(
+        parent_id=parent_id, order=0 if last is None else last + 1
+    )
+    if facet_id != current_facet:
+        Term.objects.filter(id__in=subtree).update(facet_id=facet_id)
+        # Los grupos por faceta de las búsquedas guardadas cambiaron
+        _recompile_saved_searches(subtree)
+
+    _send(term_ids=subtree, recipe_ids=_tagged_recipes(subtree))
+    return subtree
+
+
+@transaction.atomic
+def merge_terms(source_id: int, target_id: int) -> int:
+    """
+    Fusiona `source_id` en `target_id` (de la misma faceta): sus recetas y
+    búsquedas guardadas pasan al destino sin duplicar filas, sus hijos se
+    cuelgan del destino y el término de origen se borra.
+    Devuelve cuántas etiquetas de receta se re-apuntaron.
+    """
+    terms, children = _tree()
+    _, source_facet, _ = _get(terms, source_id, "source")
+    _, target_facet, _ = _get(terms, target_id, "target")
+    if source_id == target_id:
+        raise ValidationError({"target": "Un término no se puede fusionar consigo mismo."})
+    if source_facet != target_facet:
+        raise ValidationError({"target": "Solo se fusionan términos de la misma faceta."})
+    if target_id in _subtree(source_id, children):
+        raise ValidationError({"target": "El destino es descendiente del término de origen."})
+
+    moved_children = children.get(source_id, [])
+    target_names = {terms[child][2] for child in children.get(target_id, ())}
+    clashes = sorted(terms[child][2] for child in moved_children if terms[child][2] in target_names)
+    if clashes:
+        raise ValidationError(
+            {"target": f"El destino ya tiene hijos con esos nombres: {', '.join(clashes)}."}
+        )
+
+    # Etiquetas: las recetas que ya tienen el destino pierden la del origen
+    # (unique_together recipe/term); las demás se re-apuntan
+    already_tagged = RecipeTerm.objects.filter(term_id=target_id).values("recipe_id")
+    duplicates = RecipeTerm.objects.filter(term_id=source_id, recipe_id__in=already_tagged)
+    deleted_links = list(duplicates.values_list("id", flat=True))
+    with _skip_row_signals():
+        duplicates.delete()
+    moved = RecipeTerm.objects.filter(term_id=source_id)
+    moved_links = list(moved.values_list("id", flat=True))
+    moved.update(term_id=target_id)
+
+    # Búsquedas guardadas: igual, conservando la marca de término clave
+    in_target = SavedSearchTerm.objects.filter(term_id=target_id).values("search_id")
+    duplicate_keys = SavedSearchTerm.objects.filter(
+        term_id=source_id, search_id__in=in_target, is_key=True
+    ).values_list("search_id", flat=True)
+    SavedSearchTerm.objects.filter(term_id=target_id, search_id__in=duplicate_keys).update(
+        is_key=True
+    )
+    SavedSearchTerm.objects.filter(term_id=source_id, search_id__in=in_target).delete()
+    SavedSearchTerm.objects.filter(term_id=source_id).update(term_id=target_id)
+
+    Term.objects.filter(id__in=moved_children).update(parent_id=target_id)
+    with _skip_row_signals():
+        Term.objects.filter(id=source_id).delete()  # ya no tiene filas que lo referencien
+
+    _send(
+        term_ids=moved_children,
+        deleted_term_ids=[source_id],
+        recipe_term_ids=moved_links,
+        deleted_recipe_term_ids=deleted_links,
+        recipe_ids=_tagged_recipes([target_id]),
+    )
+    return len(moved_links)
+
+
+@transaction.atomic
+def reorder_terms(term_ids: list[int]) -> None:
+    """Fija el orden de visualización de hermanos: el de `term_ids`, desde 0."""
+    if len(set(term_ids)) != len(term_ids):
+        raise ValidationError({"ids": "Hay ids repetidos."})
+    levels = list(Term.objects.filter(id__in=term_ids).values_list("facet_id", "parent_id"))
+    if len(levels) != len(term_ids):
+        raise ValidationError({"ids": "Algún término no existe."})
+    if len(set(levels)) > 1:
+        raise ValidationError({"ids": "Los términos deben ser hermanos (misma faceta y padre)."})
+
+    if term_ids:
+        Term.objects.filter(id__in=term_ids).update(
+            order=Case(
+                *[When(id=term_id, then=Value(position)) for position, term_id in enumerate(term_ids)]
+            )
+        )
+    _send(term_ids=term_ids)
+
+
+def _recompile_saved_searches(term_ids) -> None:
+    searches = SavedSearch.objects.filter(search_terms__term_id__in=term_ids).distinct()
+    for search in searches:
+        set_search_terms(search, search.search_terms.values_list("term_id", flat=True))
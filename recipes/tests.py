@@ -1,3 +1,1972 @@
-from django.test import TestCase
+import re
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .catalog import catalog_store
+from .faceting import filter_by_term_groups, group_term_ids_by_facet
+from .models import (
+    ChangeLogEntry, Facet, Recipe, RecipeSimilarity, RecipeTerm, SavedSearch, Taxonomy, Term,
+)
+
+
+class FacetedTermFilterTests(TestCase):
+    """
+    OR dentro de una faceta, AND entre facetas, con expansión a descendientes,
+    compilado a EXISTS correlacionados (sin JOIN + DISTINCT).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        tecnica = Facet.objects.create(taxonomy=taxonomy, name="Técnica", order=2)
+
+        cls.postre = Term.objects.create(facet=tipo, name="Postre")
+        cls.pastel = Term.objects.create(facet=tipo, name="Pastel", parent=cls.postre)
+        cls.entrada = Term.objects.create(facet=tipo, name="Entrada")
+        cls.horneado = Term.objects.create(facet=tecnica, name="Horneado")
+        cls.frito = Term.objects.create(facet=tecnica, name="Frito")
+
+        def recipe(title, *terms):
+            obj = Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for term in terms:
+                RecipeTerm.objects.create(recipe=obj, term=term)
+            return obj
+
+        cls.pastel_horneado = recipe("Pastel de piña", cls.pastel, cls.horneado)
+        cls.postre_frito = recipe("Churros", cls.postre, cls.frito)
+        cls.entrada_horneada = recipe("Empanadas", cls.entrada, cls.horneado)
+        # Varias etiquetas de la misma faceta: no debe duplicarse
+        cls.postre_multiple = recipe("Flan", cls.postre, cls.pastel, cls.horneado, cls.frito)
+
+    def filtered(self, *terms):
+        groups = group_term_ids_by_facet(term.id for term in terms)
+        return filter_by_term_groups(Recipe.objects.all(), groups)
+
+    def test_groups_by_facet_with_descendants(self):
+        groups = group_term_ids_by_facet([self.postre.id, self.horneado.id])
+        self.assertEqual(
+            groups,
+            [sorted([self.postre.id, self.pastel.id]), [self.horneado.id]],
+        )
+
+    def test_descendants_in_another_facet(self):
+        # La API permite un hijo con otra faceta: sigue contando como su padre
+        Term.objects.filter(pk=self.pastel.pk).update(facet=self.horneado.facet_id)
+        groups = group_term_ids_by_facet([self.postre.id])
+        self.assertEqual(groups, [sorted([self.postre.id, self.pastel.id])])
+        self.assertIn(self.pastel_horneado, self.filtered(self.postre))
+
+    def test_or_within_facet(self):
+        self.assertCountEqual(
+            self.filtered(self.pastel, self.entrada),
+            [self.pastel_horneado, self.entrada_horneada, self.postre_multiple],
+        )
+
+    def test_and_across_facets(self):
+        self.assertCountEqual(
+            self.filtered(self.postre, self.horneado),
+            [self.pastel_horneado, self.postre_multiple],
+        )
+
+    def test_unknown_term_matches_nothing(self):
+        groups = group_term_ids_by_facet([self.postre.id, 999999])
+        self.assertFalse(filter_by_term_groups(Recipe.objects.all(), groups).exists())
+
+    def test_no_join_or_distinct(self):
+        sql = str(self.filtered(self.postre, self.entrada, self.horneado).query).upper()
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn("JOIN", sql)
+        self.assertEqual(sql.count("EXISTS"), 2)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN es específico de SQLite")
+    def test_query_plan_uses_recipeterm_index(self):
+        plan = self.filtered(self.postre, self.horneado).explain()
+        self.assertIn("CORRELATED SCALAR SUBQUERY", plan)
+        self.assertNotIn("TEMP B-TREE FOR DISTINCT", plan)
+        # Un EXISTS por faceta, cada uno resuelto con el índice único (recipe, term)
+        self.assertEqual(
+            len(re.findall(r"SEARCH \w+ USING COVERING INDEX recipes_recipeterm_recipe_id_term_id", plan)),
+            2,
+        )
+
+    def test_api_filter(self):
+        response = self.client.get(
+            "/api/v1/recipes/", {"term": [self.postre.id, self.horneado.id]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            [row["id"] for row in response.json()],
+            [self.pastel_horneado.id, self.postre_multiple.id],
+        )
+
+    @override_settings(CATALOG={"ENABLED": True, "SNAPSHOT_PATH": None})
+    def test_catalog_filter_matches_database(self):
+        catalog_store.invalidate()
+        params = {"term": [self.postre.id, self.entrada.id, self.horneado.id]}
+        with self.assertNumQueries(6):  # construcción del catálogo
+            response = self.client.get("/api/v1/recipes/", params)
+        self.assertCountEqual(
+            [row["id"] for row in response.json()],
+            [self.pastel_horneado.id, self.entrada_horneada.id, self.postre_multiple.id],
+        )
+
+
+class IndexedOrderingTests(TestCase):
+    """
+    ?ordering= y los árboles de términos se resuelven con índices:
+    EXPLAIN QUERY PLAN no debe mostrar un ordenamiento temporal.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        cls.facet = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato")
+        cls.postre = Term.objects.create(facet=cls.facet, name="Postre")
+        Term.objects.create(facet=cls.facet, name="Pastel", parent=cls.postre)
+
+        cls.recipes = [
+            Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for title in ("Tamales", "Arroz con leche", "Mole")
+        ]
+        RecipeTerm.objects.create(recipe=cls.recipes[0], term=cls.postre)
+        RecipeTerm.objects.create(recipe=cls.recipes[2], term=cls.postre)
+        # Orden de actualización distinto al de creación
+        cls.recipes[0].save()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"USING (COVERING )?INDEX {index}\b")
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN es específico de SQLite")
+    def test_recipe_orderings_use_indexes(self):
+        from .api.serializer import RecipeListSerializer
+
+        for ordering, index in (
+            ("newest", "recipe_created_idx"),
+            ("updated", "recipe_updated_idx"),
+            ("title", "recipe_title_idx"),
+            ("popular", "recipe_popular_idx"),
+        ):
+            with self.subTest(ordering=ordering):
+                queryset = Recipe.objects.order_by(*Recipe.ORDERINGS[ordering])
+                self.assertUsesIndex(queryset.values(*RecipeListSerializer.VALUES_FIELDS), index)
+                # También combinado con el filtro por términos (EXISTS)
+                groups = group_term_ids_by_facet([self.postre.id])
+                self.assertUsesIndex(filter_by_term_groups(queryset, groups), index)
+
+    @skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN es específico de SQLite")
+    def test_term_tree_queries_use_indexes(self):
+        roots = self.facet.terms.filter(parent__isnull=True).order_by("order", "name")
+        self.assertUsesIndex(roots, "term_facet_tree_idx")
+        children = self.postre.children.all().order_by("order", "name")
+        self.assertUsesIndex(children, "term_children_idx")
+        recipes_of_term = RecipeTerm.objects.filter(term=self.postre).values_list("recipe_id")
+        self.assertUsesIndex(recipes_of_term, "recipeterm_term_recipe_idx")
+
+    def test_api_ordering(self):
+        tamales, arroz, mole = self.recipes
+        expected = {
+            "newest": [mole.id, arroz.id, tamales.id],
+            "updated": [tamales.id, mole.id, arroz.id],
+            "title": [arroz.id, mole.id, tamales.id],
+        }
+        for ordering, ids in expected.items():
+            with self.subTest(ordering=ordering):
+                response = self.client.get("/api/v1/recipes/", {"ordering": ordering})
+                self.assertEqual([row["id"] for row in response.json()], ids)
+
+        response = self.client.get("/api/v1/recipes/", {"ordering": "title", "term": self.postre.id})
+        self.assertEqual([row["id"] for row in response.json()], [mole.id, tamales.id])
+
+    @override_settings(CATALOG={"ENABLED": True, "SNAPSHOT_PATH": None})
+    def test_catalog_ordering_matches_database(self):
+        for ordering in Recipe.ORDERINGS:
+            with self.subTest(ordering=ordering):
+                with self.settings(CATALOG={"ENABLED": False}):
+                    expected = self.client.get("/api/v1/recipes/", {"ordering": ordering}).json()
+                catalog_store.invalidate()
+                response = self.client.get("/api/v1/recipes/", {"ordering": ordering})
+                self.assertEqual(response.json(), expected)
+
+
+class AdminChangelistTests(TestCase):
+    """Las páginas del admin hacen el mismo número de consultas con 3 o 30 filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "x")
+        cls.taxonomy = Taxonomy.objects.create(name="Principal")
+        cls.facet = Facet.objects.create(taxonomy=cls.taxonomy, name="Tipo de plato")
+        cls.root = Term.objects.create(facet=cls.facet, name="Postre")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_rows(self, count):
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            term = Term.objects.create(facet=self.facet, name=f"Término {i}", parent=self.root)
+            recipe = Recipe.objects.create(
+                title=f"Pollo {i}", instructions="Hornear", ingredients_text="pollo"
+            )
+            RecipeTerm.objects.create(recipe=recipe, term=term)
+
+    def count_queries(self, url):
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_have_fixed_query_count(self):
+        urls = [
+            "/admin/recipes/term/",
+            "/admin/recipes/recipeterm/",
+            "/admin/recipes/recipe/",
+            "/admin/recipes/recipe/?q=pol",
+            f"/admin/recipes/recipeterm/?term__facet__id__exact={self.facet.id}",
+        ]
+        self.add_rows(3)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_rows(27)
+        large = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(small, large)
+
+    def test_search_uses_token_prefixes(self):
+        self.add_rows(2)
+        Recipe.objects.create(title="Sopa de tomate", instructions="-", ingredients_text="-")
+        response = self.client.get("/admin/recipes/recipe/", {"q": "sop tom"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get("/admin/recipes/recipe/", {"q": "sopa-de-tomate"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get("/admin/recipes/recipe/", {"q": "tomate pollo"})
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_paginator_caps_count(self):
+        from .admin import LargeTablePaginator
+
+        self.add_rows(5)
+        paginator = LargeTablePaginator(Recipe.objects.all(), 2)
+        paginator.COUNT_LIMIT = 3
+        self.assertEqual(paginator.count, Recipe.objects.order_by("-id")[0].id)
+        paginator = LargeTablePaginator(Recipe.objects.filter(title__startswith="Pollo"), 2)
+        paginator.COUNT_LIMIT = 3
+        self.assertEqual(paginator.count, 3)
+
+
+class ChangeFeedTests(TestCase):
+    """/api/v1/changes/: upserts con el estado actual, lápidas y paginación por token."""
+
+    def setUp(self):
+        self.taxonomy = Taxonomy.objects.create(name="Principal")
+        self.facet = Facet.objects.create(taxonomy=self.taxonomy, name="Tipo de plato")
+        self.postre = Term.objects.create(facet=self.facet, name="Postre")
+        self.recipe = Recipe.objects.create(title="Flan", instructions="-", ingredients_text="-")
+
+    def feed(self, since=0, **params):
+        response = self.client.get("/api/v1/changes/", {"since": since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ops(self, feed):
+        return [(change["entity"], change["id"], change["op"]) for change in feed["changes"]]
+
+    def test_full_sync_then_incremental(self):
+        feed = self.feed()
+        self.assertEqual(self.ops(feed), [
+            ("taxonomy", self.taxonomy.id, "upsert"),
+            ("facet", self.facet.id, "upsert"),
+            ("term", self.postre.id, "upsert"),
+            ("recipe", self.recipe.id, "upsert"),
+        ])
+        self.assertEqual(feed["changes"][3]["data"]["title"], "Flan")
+        self.assertFalse(feed["has_more"])
+
+        self.recipe.title = "Flan napolitano"
+        self.recipe.save()
+        self.recipe.terms.add(self.postre)
+        link = RecipeTerm.objects.get()
+        update = self.feed(feed["next"])
+        self.assertEqual(self.ops(update), [
+            ("recipe", self.recipe.id, "upsert"),
+            ("recipeterm", link.id, "upsert"),
+        ])
+        self.assertEqual(update["changes"][0]["data"]["title"], "Flan napolitano")
+        self.assertEqual(self.feed(update["next"]), {"next": update["next"], "has_more": False, "changes": []})
+
+    def test_deletes_are_tombstones(self):
+        start = self.feed()["next"]
+        RecipeTerm.objects.create(recipe=self.recipe, term=self.postre)
+        link_id = RecipeTerm.objects.get().id
+        term_id = self.postre.id
+        self.recipe.terms.clear()
+        self.postre.delete()
+        self.assertEqual(self.ops(self.feed(start)), [
+            ("recipeterm", link_id, "delete"),
+            ("term", term_id, "delete"),
+        ])
+
+    def test_pagination_keeps_latest_change_per_object(self):
+        start = self.feed()["next"]
+        for title in ("Uno", "Dos", "Tres"):
+            self.recipe.title = title
+            self.recipe.save()
+        first = self.feed(start, limit=2)
+        self.assertTrue(first["has_more"])
+        self.assertEqual(self.ops(first), [("recipe", self.recipe.id, "upsert")])
+        second = self.feed(first["next"], limit=2)
+        self.assertFalse(second["has_more"])
+        self.assertEqual(second["changes"][0]["data"]["title"], "Tres")
+
+    def test_compaction_and_invalid_token(self):
+        from .api.changes import compact_change_log
+
+        recipe_id = self.recipe.id
+        self.recipe.save()
+        self.recipe.delete()
+        # Quedan taxonomía, faceta, término y la lápida de la receta
+        self.assertEqual(compact_change_log(), 2)
+        self.assertEqual(ChangeLogEntry.objects.count(), 4)
+        self.assertEqual(self.ops(self.feed())[-1], ("recipe", recipe_id, "delete"))
+        self.assertEqual(self.client.get("/api/v1/changes/", {"since": "x"}).status_code, 400)
+
+
+class RecipeBatchTests(TestCase):
+    """/api/v1/recipes/batch/?slugs=: mismo detalle que /recipes/<slug>/ con consultas fijas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato")
+        tecnica = Facet.objects.create(taxonomy=taxonomy, name="Técnica")
+        terms = [
+            Term.objects.create(facet=tipo, name="Postre"),
+            Term.objects.create(facet=tecnica, name="Horneado"),
+        ]
+        cls.recipes = []
+        for i in range(6):
+            recipe = Recipe.objects.create(title=f"Receta {i}", instructions="-", ingredients_text="-")
+            recipe.terms.add(*terms[:i % 3])
+            cls.recipes.append(recipe)
+        RecipeSimilarity.objects.create(
+            recipe=cls.recipes[0], neighbours=[[cls.recipes[1].id, 0.9], [cls.recipes[2].id, 0.5]]
+        )
+
+    def batch(self, slugs):
+        response = self.client.get("/api/v1/recipes/batch/", {"slugs": ",".join(slugs)})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_detail_in_requested_order(self):
+        slugs = [self.recipes[i].slug for i in (2, 0, 1)]
+        data = self.batch(slugs + ["no-existe"])
+        self.assertEqual(data["missing"], ["no-existe"])
+        self.assertEqual(
+            data["results"],
+            [self.client.get(f"/api/v1/recipes/{slug}/").json() for slug in slugs],
+        )
+
+    def test_fixed_query_count(self):
+        # recetas (+ vecinos) / términos con faceta / títulos de los vecinos
+        for count in (2, 6):
+            with self.subTest(count=count), self.assertNumQueries(3):
+                self.batch([recipe.slug for recipe in self.recipes[:count]])
+
+    @override_settings(CATALOG={"ENABLED": True, "SNAPSHOT_PATH": None})
+    def test_catalog_matches_database(self):
+        slugs = [recipe.slug for recipe in reversed(self.recipes)] + ["no-existe"]
+        with self.settings(CATALOG={"ENABLED": False}):
+            expected = self.batch(slugs)
+        catalog_store.invalidate()
+        self.assertEqual(self.batch(slugs), expected)
+
+    def test_requires_slugs(self):
+        self.assertEqual(self.client.get("/api/v1/recipes/batch/").status_code, 400)
+
+
+class ContentAddressedImageTests(TestCase):
+    """Imágenes por hash: deduplicación, contadores, huérfanas y encabezados de caché."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def recipe_with_image(self, title, content, filename="foto.JPG"):
+        from django.core.files.base import ContentFile
+
+        recipe = Recipe(title=title, instructions="-", ingredients_text="-")
+        recipe.image.save(filename, ContentFile(content), save=False)
+        recipe.save()
+        return recipe
+
+    def refcounts(self):
+        from .models import ImageBlob
+
+        return dict(ImageBlob.objects.values_list("name", "refcount"))
+
+    def test_same_content_is_stored_once(self):
+        import hashlib
+
+        from .images import recipe_image_storage
+
+        first = self.recipe_with_image("Flan", b"foto-flan")
+        second = self.recipe_with_image("Flan casero", b"foto-flan", filename="otra.jpg")
+        digest = hashlib.sha256(b"foto-flan").hexdigest()
+        self.assertEqual(first.image.name, f"recipes/sha256/{digest[:2]}/{digest}.jpg")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(recipe_image_storage.listdir(f"recipes/sha256/{digest[:2]}")[1], [f"{digest}.jpg"])
+        self.assertEqual(self.refcounts(), {first.image.name: 2})
+
+    def test_orphans_are_collected(self):
+        from datetime import timedelta
+
+        from .images import collect_orphans, recipe_image_storage
+
+        first = self.recipe_with_image("Flan", b"foto-flan")
+        second = self.recipe_with_image("Mole", b"foto-mole")
+        old_name = first.image.name
+
+        # Cambiar de foto libera la anterior; otros guardados no la tocan
+        first.title = "Flan napolitano"
+        first.save()
+        first.image = second.image.name
+        first.save()
+        self.assertEqual(self.refcounts(), {old_name: 0, second.image.name: 2})
+
+        self.assertEqual(collect_orphans(), [])  # todavía dentro del margen
+        self.assertEqual(collect_orphans(grace=timedelta(0)), [old_name])
+        self.assertFalse(recipe_image_storage.exists(old_name))
+
+        first.delete()
+        second.delete()
+        self.assertEqual(collect_orphans(grace=timedelta(0), dry_run=True), [second.image.name])
+
+    def test_cleanup_rechecks_references(self):
+        import os
+        import time
+        from datetime import timedelta
+
+        from django.core.files.base import ContentFile
+        from django.utils import timezone
+
+        from .images import collect_orphans, recipe_image_storage
+        from .models import ImageBlob
+
+        recipe = self.recipe_with_image("Flan", b"foto-flan")
+        name = recipe.image.name
+        two_hours_ago = timezone.now() - timedelta(hours=2)
+        os.utime(recipe_image_storage.path(name), (time.time() - 7200,) * 2)
+
+        # Contador desfasado: la receta la sigue usando
+        ImageBlob.objects.update(refcount=0, updated_at=two_hours_ago)
+        self.assertEqual(collect_orphans(), [])
+        self.assertTrue(recipe_image_storage.exists(name))
+
+        # Archivo sin fila que otra receta vuelve a subir durante la limpieza
+        Recipe.objects.filter(pk=recipe.pk).update(image="")
+        ImageBlob.objects.all().delete()
+        self.assertEqual(collect_orphans(dry_run=True), [name])
+        self.assertEqual(recipe_image_storage.save("otra.jpg", ContentFile(b"foto-flan")), name)
+        self.assertEqual(collect_orphans(), [])
+        self.assertTrue(recipe_image_storage.exists(name))
+
+    def test_media_cache_headers(self):
+        from django.http import Http404
+        from django.test import RequestFactory
+
+        from .views import serve_media
+
+        recipe = self.recipe_with_image("Flan", b"foto-flan")
+        factory = RequestFactory()
+        response = serve_media(factory.get("/media/x"), recipe.image.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        etag = response.headers["ETag"]
+
+        response = serve_media(factory.get("/media/x", HTTP_IF_NONE_MATCH=etag), recipe.image.name)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        with self.assertRaises(Http404):
+            serve_media(factory.get("/media/x"), "recipes/no-existe.jpg")
+
+
+class ThrottlingTests(TestCase):
+    """Cubetas separadas por costo (429) y límite de búsquedas simultáneas (503)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(title="Pollo asado", instructions="-", ingredients_text="pollo")
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @override_settings(API_THROTTLING={"BUCKETS": {
+        "expensive": {"CAPACITY": 2, "REFILL_RATE": 0.1},
+        "cheap": {"CAPACITY": 100, "REFILL_RATE": 10},
+    }})
+    def test_expensive_bucket_does_not_block_cheap_reads(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/v1/recipes/", {"q": "pollo"}).status_code, 200)
+        response = self.client.get("/api/v1/recipes/", {"q": "pollo"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+
+        self.assertEqual(self.client.get(f"/api/v1/recipes/{self.recipe.slug}/").status_code, 200)
+        self.assertEqual(self.client.get("/api/v1/recipes/").status_code, 200)
+
+    def test_request_cost(self):
+        from django.test import RequestFactory
+        from rest_framework.request import Request
+
+        from .api.throttling import request_cost
+        from .api.views import RecipeViewSet
+
+        view = RecipeViewSet(action="list", basename="recipe")
+        factory = RequestFactory()
+        for query, expected in (
+            ("", ("cheap", 1)),
+            ("term=1", ("cheap", 1)),
+            ("term=1&term=2&term=3", ("expensive", 2)),
+            ("q=pollo", ("expensive", 1)),
+            ("q=pollo&term=1&term=2", ("expensive", 2)),
+        ):
+            with self.subTest(query=query):
+                request = Request(factory.get(f"/api/v1/recipes/?{query}"))
+                self.assertEqual(request_cost(request, view), expected)
+
+    @override_settings(API_THROTTLING={"MAX_EXPENSIVE_IN_FLIGHT": 1, "RETRY_AFTER": 2})
+    def test_concurrency_limit_sheds_load(self):
+        from .api.throttling import expensive_queries
+
+        self.assertTrue(expensive_queries.try_acquire(1))  # otra búsqueda en curso
+        try:
+            response = self.client.get("/api/v1/recipes/", {"q": "pollo"})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers["Retry-After"], "2")
+            # Las lecturas baratas no esperan
+            self.assertEqual(self.client.get(f"/api/v1/recipes/{self.recipe.slug}/").status_code, 200)
+        finally:
+            expensive_queries.release()
+
+        self.assertEqual(self.client.get("/api/v1/recipes/", {"q": "pollo"}).status_code, 200)
+        self.assertEqual(expensive_queries.in_flight, 0)
+
+
+    @override_settings(API_THROTTLING={"BUCKETS": {
+        "expensive": {"CAPACITY": 2, "REFILL_RATE": 0.1},
+        "cheap": {"CAPACITY": 3, "REFILL_RATE": 0.1},
+    }})
+    def test_snapshot_is_not_throttled(self):
+        import tempfile
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        for i in range(5):  # 5 recetas x 2 páginas + árboles: más que la ráfaga
+            Recipe.objects.create(title=f"Receta {i}", instructions="-", ingredients_text="-")
+        with tempfile.TemporaryDirectory() as output:
+            call_command(
+                "build_snapshot", output=output, workers=1, full=True, stdout=StringIO()
+            )
+        # Los clientes externos siguen limitados
+        statuses = [self.client.get("/api/v1/recipes/").status_code for _ in range(4)]
+        self.assertEqual(statuses[-1], 429)
+
+
+@override_settings(POPULARITY={"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1000, "HALF_LIFE_DAYS": 7})
+class PopularityTests(TestCase):
+    """Vistas acumuladas en memoria, escritas en lote y ?ordering=popular."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipes = [
+            Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for title in ("Tamales", "Mole", "Pozole")
+        ]
+
+    def setUp(self):
+        from .popularity import view_counter
+
+        view_counter.clear()  # lo acumulado por otras pruebas
+        self.counter = view_counter
+        self.now = 1_800_000_000.0
+
+    def counts(self):
+        return list(
+            Recipe.objects.order_by("id").values_list("view_count", "impression_count")
+        )
+
+    def test_views_are_written_in_one_batch(self):
+        tamales, mole, pozole = self.recipes
+        self.counter.flush()  # revisa la escala: no entra en el lote
+        for recipe in (mole, mole, mole, pozole):
+            self.assertEqual(self.client.get(f"/api/v1/recipes/{recipe.slug}/").status_code, 200)
+        self.client.get(f"/test/recipes/{pozole.slug}/")
+        self.client.get("/api/v1/recipes/")
+        self.assertEqual(self.counts(), [(0, 0)] * 3)  # nada escrito todavía
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.counts(), [(0, 1), (3, 1), (2, 1)])
+
+        response = self.client.get("/api/v1/recipes/", {"ordering": "popular"})
+        self.assertEqual([row["id"] for row in response.json()], [mole.id, pozole.id, tamales.id])
+        self.assertNotIn("popularity", response.json()[0])
+
+    def test_snapshot_renders_are_not_views(self):
+        import tempfile
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as output:
+            call_command("build_snapshot", output=output, workers=1, full=True, stdout=StringIO())
+        self.assertEqual(self.counter.pending(), 0)
+
+    def test_recent_views_weigh_more(self):
+        from unittest import mock
+
+        from .models import PopularityScale
+        from .popularity import decay_factor
+
+        self.assertAlmostEqual(decay_factor(7 * 86400, 7), 2.0)
+        self.assertAlmostEqual(decay_factor(-14 * 86400, 7), 0.25)
+        self.assertEqual(decay_factor(7 * 86400, None), 1.0)
+
+        mole = self.recipes[1]
+        with mock.patch("recipes.popularity.time.time", return_value=self.now):
+            self.counter.clear()
+            self.counter.record_view(mole.id)
+        with mock.patch("recipes.popularity.time.time", return_value=self.now + 7 * 86400):
+            self.counter.record_view(mole.id)
+            self.counter.flush()
+        scale = PopularityScale.objects.get()
+        self.assertEqual((scale.epoch, scale.half_life_days), (self.now + 7 * 86400, 7))
+        self.assertAlmostEqual(Recipe.objects.get(id=mole.id).popularity, 1.5)
+
+    def test_old_reference_is_rebased(self):
+        from unittest import mock
+
+        from .models import PopularityScale
+
+        tamales, mole, _ = self.recipes
+        # Diez años de vistas contra la misma referencia: 2 ** 521 sin reescalar
+        PopularityScale.objects.filter(pk=1).update(epoch=self.now - 3650 * 86400)
+        Recipe.objects.filter(id=tamales.id).update(popularity=2.0 ** 500)
+        Recipe.objects.filter(id=mole.id).update(popularity=2.0 ** 501)
+
+        with mock.patch("recipes.popularity.time.time", return_value=self.now):
+            self.counter.clear()
+            self.counter.record_view(tamales.id)
+            self.counter.flush()
+        self.assertEqual(PopularityScale.objects.get().epoch, self.now)
+        popularity = dict(Recipe.objects.values_list("id", "popularity"))
+        self.assertLess(popularity[mole.id], 2.0 ** 32)
+        self.assertAlmostEqual(popularity[tamales.id], 2.0 ** (500 - 3650 / 7) + 1)
+        self.assertGreater(popularity[mole.id], popularity[tamales.id] - 1)
+
+    def test_half_life_change_rebases(self):
+        from unittest import mock
+
+        from .models import PopularityScale
+
+        mole = self.recipes[1]
+        PopularityScale.objects.filter(pk=1).update(epoch=self.now - 14 * 86400, half_life_days=7)
+        Recipe.objects.filter(id=mole.id).update(popularity=4.0)
+
+        with self.settings(POPULARITY={"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1000, "HALF_LIFE_DAYS": 30}):
+            with mock.patch("recipes.popularity.time.time", return_value=self.now):
+                self.counter.clear()
+                self.counter.flush()
+        scale = PopularityScale.objects.get()
+        self.assertEqual((scale.epoch, scale.half_life_days), (self.now, 30))
+        # Las vistas de hace dos vidas medias de 7 días valen 1 desde ahora
+        self.assertAlmostEqual(Recipe.objects.get(id=mole.id).popularity, 1.0)
+
+    def test_flushes_when_too_many_pending(self):
+        with self.settings(POPULARITY={"FLUSH_INTERVAL": 3600, "MAX_PENDING": 2, "HALF_LIFE_DAYS": None}):
+            self.counter.record_view(self.recipes[0].id)
+            self.assertEqual(self.counts()[0], (0, 0))
+            self.counter.record_impressions([self.recipes[1].id])
+        self.assertEqual(self.counter.pending(), 0)
+        self.assertEqual(self.counts(), [(1, 0), (0, 1), (0, 0)])
+        self.assertEqual(Recipe.objects.get(id=self.recipes[0].id).popularity, 1.0)
+
+
+class CooccurrenceTests(TestCase):
+    """Matriz término×término: conteos exactos, refinamientos y poda del árbol."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        tecnica = Facet.objects.create(taxonomy=taxonomy, name="Técnica", order=2)
+        cls.postre = Term.objects.create(facet=tipo, name="Postre")
+        cls.pastel = Term.objects.create(facet=tipo, name="Pastel", parent=cls.postre)
+        cls.entrada = Term.objects.create(facet=tipo, name="Entrada")
+        cls.horneado = Term.objects.create(facet=tecnica, name="Horneado")
+        cls.frito = Term.objects.create(facet=tecnica, name="Frito")
+        cls.vapor = Term.objects.create(facet=tecnica, name="Al vapor")
+
+        def recipe(title, *terms):
+            obj = Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for term in terms:
+                RecipeTerm.objects.create(recipe=obj, term=term)
+            return obj
+
+        recipe("Pastel de piña", cls.pastel, cls.horneado)
+        recipe("Churros", cls.postre, cls.frito)
+        recipe("Empanadas", cls.entrada, cls.horneado)
+        recipe("Flan", cls.postre, cls.pastel, cls.horneado)
+
+    def setUp(self):
+        from .cooccurrence import cooccurrence_index
+
+        self.index = cooccurrence_index
+        self.index.invalidate()
+
+    def expected_counts(self, *terms):
+        """
+        Mismo resultado calculado con los filtros SQL. Un término de una
+        faceta ya seleccionada se cuenta contra la selección sin esa faceta.
+        """
+        recipes = filter_by_term_groups(
+            Recipe.objects.all(), group_term_ids_by_facet(term.id for term in terms)
+        )
+        counts = {}
+        for term in Term.objects.all():
+            others = [selected.id for selected in terms if selected.facet_id != term.facet_id]
+            base = filter_by_term_groups(Recipe.objects.all(), group_term_ids_by_facet(others))
+            count = filter_by_term_groups(base, group_term_ids_by_facet([term.id])).count()
+            if count:
+                counts[term.id] = count
+        return recipes.count(), counts
+
+    def test_counts_match_sql_filters(self):
+        for selection in (
+            [self.postre],
+            [self.pastel],
+            [self.horneado],
+            [self.postre, self.horneado],
+            [self.pastel, self.entrada],
+            [self.postre, self.entrada, self.frito],
+            [self.horneado, self.frito],
+            [self.vapor],
+        ):
+            with self.subTest(selection=[term.name for term in selection]):
+                self.assertEqual(
+                    self.index.counts_for([term.id for term in selection]),
+                    self.expected_counts(*selection),
+                )
+
+    def test_incremental_updates(self):
+        from django.db import transaction
+
+        self.index.counts_for([self.postre.id])  # construye la matriz
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(title="Buñuelos", instructions="-", ingredients_text="-")
+            link = RecipeTerm.objects.create(recipe=recipe, term=self.pastel)
+            RecipeTerm.objects.create(recipe=recipe, term=self.frito)
+            RecipeTerm.objects.create(recipe=recipe, term=self.postre)
+            link.delete()  # sigue siendo Postre por la etiqueta directa
+            RecipeTerm.objects.create(recipe=recipe, term=self.vapor)
+        try:
+            with transaction.atomic():
+                RecipeTerm.objects.create(recipe=recipe, term=self.entrada)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with self.assertNumQueries(0):  # sin reconstruir
+            counts = self.index.counts_for([self.postre.id])
+        self.assertEqual(counts, self.expected_counts(self.postre))
+        self.assertEqual(self.index.counts_for([self.entrada.id]), self.expected_counts(self.entrada))
+        # Solo se guardan los pares que aparecen juntos
+        vapor = self.index.counts[self.index.column_of[self.vapor.id]]
+        self.assertEqual(
+            sorted(self.index.term_ids[column] for column in vapor),
+            sorted([self.postre.id, self.frito.id, self.vapor.id]),
+        )
+
+    def test_change_from_another_worker_forces_rebuild(self):
+        from django.core.cache import cache
+
+        from .cooccurrence import VERSION_CACHE_KEY
+
+        self.index.counts_for([self.postre.id])
+        # Otro worker etiquetó una receta y publicó el cambio
+        recipe = Recipe.objects.get(title="Churros")
+        RecipeTerm.objects.bulk_create([RecipeTerm(recipe=recipe, term=self.horneado)])
+        cache.incr(VERSION_CACHE_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeTerm.objects.filter(recipe=recipe, term=self.frito).delete()
+        with self.assertNumQueries(2):
+            counts = self.index.counts_for([self.horneado.id])
+        self.assertEqual(counts, self.expected_counts(self.horneado))
+
+    def test_refinements_endpoint(self):
+        response = self.client.get("/api/v1/refinements/", {"term": self.postre.id})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], 3)
+        # Horneado en 2, Frito en 1; Pastel es de la faceta elegida (OR): no acota
+        self.assertEqual(
+            [(row["name"], row["count"]) for row in data["results"]],
+            [("Horneado", 2), ("Frito", 1)],
+        )
+        self.assertEqual(data["results"][0]["facet"], "Técnica")
+        self.assertEqual(self.client.get("/api/v1/refinements/").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/refinements/", {"term": "x"}).status_code, 400)
+
+    def test_same_facet_terms_widen(self):
+        # (Postre OR Entrada) AND Horneado: cada término se cuenta contra las
+        # otras facetas de la selección, no contra el resultado actual
+        selection = [self.postre, self.entrada, self.horneado]
+        total, counts = self.index.counts_for([term.id for term in selection])
+        self.assertEqual((total, counts), self.expected_counts(*selection))
+        self.assertEqual(total, 3)
+        self.assertEqual(counts[self.entrada.id], 1)  # Empanadas
+        self.assertEqual(counts[self.frito.id], 1)  # Churros: Postre, frito
+
+        # Las alternativas de una faceta elegida no se podan ni se sugieren
+        response = self.client.get("/api/v1/refinements/", {"term": [self.horneado.id, self.pastel.id]})
+        self.assertEqual(
+            [(row["name"], row["count"]) for row in response.json()["results"]], []
+        )
+        tree = self.client.get(
+            "/api/v1/facets-terms-tree/", {"context_term": [self.horneado.id, self.pastel.id]}
+        ).json()
+        tecnica = next(facet for facet in tree if facet["name"] == "Técnica")
+        self.assertEqual(
+            sorted(term["name"] for term in tecnica["terms"]), ["Al vapor", "Frito", "Horneado"]
+        )
+
+    def test_facets_terms_tree_context(self):
+        response = self.client.get("/api/v1/facets-terms-tree/", {"context_term": self.postre.id})
+        tree = {
+            facet["name"]: [(term["name"], [c["name"] for c in term["children"]]) for term in facet["terms"]]
+            for facet in response.json()
+        }
+        # La faceta seleccionada queda completa: Entrada amplía el resultado
+        self.assertEqual(tree, {
+            "Tipo de plato": [("Entrada", []), ("Postre", ["Pastel"])],
+            "Técnica": [("Frito", []), ("Horneado", [])],
+        })
+        full = self.client.get("/api/v1/facets-terms-tree/").json()
+        self.assertEqual(sum(len(facet["terms"]) for facet in full), 5)
+
+
+class SavedSearchTests(TestCase):
+    """Percolador: recetas nuevas o re-etiquetadas contra búsquedas guardadas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth import get_user_model
+
+        from .percolator import set_search_terms
+
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        tecnica = Facet.objects.create(taxonomy=taxonomy, name="Técnica", order=2)
+        cls.postre = Term.objects.create(facet=tipo, name="Postre")
+        cls.pastel = Term.objects.create(facet=tipo, name="Pastel", parent=cls.postre)
+        cls.horneado = Term.objects.create(facet=tecnica, name="Horneado")
+        cls.frito = Term.objects.create(facet=tecnica, name="Frito")
+
+        cls.user = get_user_model().objects.create_user("ana", password="x")
+        cls.other = get_user_model().objects.create_user("luis", password="x")
+        cls.postres_horneados = SavedSearch.objects.create(user=cls.user, name="Postres al horno")
+        set_search_terms(cls.postres_horneados, [cls.postre.id, cls.horneado.id])
+        cls.con_pina = SavedSearch.objects.create(user=cls.user, name="Piña", q="PIÑA")
+        cls.fritos = SavedSearch.objects.create(user=cls.other, name="Fritos")
+        set_search_terms(cls.fritos, [cls.frito.id])
+
+    def create_recipe(self, title, *terms):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            recipe.terms.add(*terms)
+        return recipe
+
+    def matched(self, search):
+        return set(search.matches.values_list("recipe__title", flat=True))
+
+    def test_new_recipe_matches_through_ancestors(self):
+        self.create_recipe("Pastel de piña", self.pastel, self.horneado)
+        self.create_recipe("Churros", self.postre, self.frito)
+        self.assertEqual(self.matched(self.postres_horneados), {"Pastel de piña"})
+        self.assertEqual(self.matched(self.con_pina), {"Pastel de piña"})
+        self.assertEqual(self.matched(self.fritos), {"Churros"})
+
+    def test_retag_matches_once(self):
+        recipe = self.create_recipe("Flan", self.postre)
+        self.assertEqual(self.matched(self.postres_horneados), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeTerm.objects.create(recipe=recipe, term=self.horneado)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.terms.add(self.pastel)
+        self.assertEqual(self.postres_horneados.matches.count(), 1)
+
+    def test_only_text_changes_percolate(self):
+        from unittest import mock
+
+        recipe = self.create_recipe("Flan", self.postre)
+        with mock.patch("recipes.signals.schedule_percolation") as schedule:
+            recipe.view_count = 10
+            recipe.save(update_fields=["view_count"])
+            recipe.save()  # mismo texto
+            schedule.assert_not_called()
+
+        recipe.title = "Flan de piña"
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.matched(self.con_pina), {"Flan de piña"})
+
+    def test_key_is_most_selective_facet(self):
+        from .percolator import set_search_terms
+
+        self.create_recipe("Pastel de piña", self.pastel, self.horneado)
+        self.create_recipe("Empanadas", self.horneado)
+        set_search_terms(self.postres_horneados, [self.postre.id, self.horneado.id])
+        keys = set(self.postres_horneados.search_terms.filter(is_key=True).values_list("term_id", flat=True))
+        self.assertEqual(keys, {self.postre.id})
+
+    def test_query_count_does_not_grow_with_searches(self):
+        from .percolator import percolate, set_search_terms
+
+        recipe = self.create_recipe("Pastel de piña", self.pastel, self.horneado)
+        with self.assertNumQueries(6):
+            percolate([recipe.id])
+        for i in range(20):
+            search = SavedSearch.objects.create(user=self.user, name=f"Busqueda {i}")
+            set_search_terms(search, [self.postre.id])
+        with self.assertNumQueries(6):
+            self.assertEqual(percolate([recipe.id]), 22)
+
+    def test_api(self):
+        response = self.client.get("/api/v1/saved-searches/")
+        self.assertIn(response.status_code, (401, 403))
+
+        self.client.force_login(self.user)
+        response = self.client.post(
+            "/api/v1/saved-searches/", {"name": "Fritos", "terms": [self.frito.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["terms"], [self.frito.id])
+        response = self.client.post(
+            "/api/v1/saved-searches/", {"name": "Vacía"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [search["name"] for search in self.client.get("/api/v1/saved-searches/").json()],
+            ["Postres al horno", "Piña", "Fritos"],
+        )
+
+        self.create_recipe("Churros", self.postre, self.frito)
+        self.create_recipe("Pastel de piña", self.pastel, self.horneado)
+        inbox = self.client.get("/api/v1/saved-searches/inbox/").json()
+        # Más recientes primero; las de otros usuarios no aparecen
+        self.assertEqual(
+            [(row["search_name"], row["recipe"]["title"]) for row in inbox][2:],
+            [("Fritos", "Churros")],
+        )
+        self.assertEqual(
+            {row["search_name"] for row in inbox[:2]}, {"Postres al horno", "Piña"}
+        )
+        response = self.client.post(
+            "/api/v1/saved-searches/inbox/mark-read/",
+            {"ids": [inbox[0]["id"]]}, content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"updated": 1})
+        unread = self.client.get("/api/v1/saved-searches/inbox/", {"unread": 1}).json()
+        self.assertEqual(len(unread), 2)
+
+
+class SavedSearchAutocommitTests(TransactionTestCase):
+    """Fuera de atomic() on_commit corre en el acto: TestCase no lo cubre."""
+
+    def test_percolates_in_autocommit(self):
+        from django.contrib.auth import get_user_model
+
+        from .percolator import set_search_terms
+
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        postre = Term.objects.create(facet=tipo, name="Postre")
+        user = get_user_model().objects.create_user("ana", password="x")
+        por_texto = SavedSearch.objects.create(user=user, name="Flanes", q="flan")
+        postres = SavedSearch.objects.create(user=user, name="Postres")
+        set_search_terms(postres, [postre.id])
+
+        recipe = Recipe.objects.create(title="Flan", instructions="-", ingredients_text="-")
+        RecipeTerm.objects.create(recipe=recipe, term=postre)
+        self.assertEqual(list(por_texto.matches.values_list("recipe_id", flat=True)), [recipe.id])
+        self.assertEqual(list(postres.matches.values_list("recipe_id", flat=True)), [recipe.id])
+
+
+class TaxonomyReorganizationTests(TestCase):
+    """Mover subárboles, fusionar y reordenar términos en bloque."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth import get_user_model
+
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        cls.tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        cls.tecnica = Facet.objects.create(taxonomy=taxonomy, name="Técnica", order=2)
+        cls.postre = Term.objects.create(facet=cls.tipo, name="Postre")
+        cls.pasteles = Term.objects.create(facet=cls.tipo, name="Pasteles")
+        cls.chocolate = Term.objects.create(facet=cls.tipo, name="Chocolate", parent=cls.pasteles)
+        cls.pastel = Term.objects.create(facet=cls.tipo, name="Pastel", parent=cls.postre)
+        cls.horneado = Term.objects.create(facet=cls.tecnica, name="Horneado")
+        cls.flan = Recipe.objects.create(title="Flan", instructions="-", ingredients_text="-")
+        cls.selva = Recipe.objects.create(title="Selva negra", instructions="-", ingredients_text="-")
+        RecipeTerm.objects.create(recipe=cls.flan, term=cls.pastel)
+        RecipeTerm.objects.create(recipe=cls.flan, term=cls.pasteles)
+        RecipeTerm.objects.create(recipe=cls.selva, term=cls.chocolate)
+        cls.admin = get_user_model().objects.create_superuser("admin", password="x")
+
+    def test_move_subtree(self):
+        from .taxonomy import move_subtree, terms_reorganized
+
+        events = []
+        terms_reorganized.connect(lambda **kwargs: events.append(kwargs), weak=False, dispatch_uid="t")
+        self.addCleanup(terms_reorganized.disconnect, dispatch_uid="t")
+        with self.assertNumQueries(7):  # incluye SAVEPOINT/RELEASE
+            moved = move_subtree(self.pasteles.id, self.postre.id)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(set(moved), {self.pasteles.id, self.chocolate.id})
+        self.pasteles.refresh_from_db()
+        self.assertEqual((self.pasteles.parent_id, self.pasteles.order), (self.postre.id, 1))
+        # Selva negra (Chocolate) ahora también es Postre
+        postres = filter_by_term_groups(Recipe.objects.all(), group_term_ids_by_facet([self.postre.id]))
+        self.assertEqual(set(postres.values_list("title", flat=True)), {"Flan", "Selva negra"})
+
+        # A otra faceta: todo el subárbol cambia de faceta
+        move_subtree(self.pasteles.id, None, self.tecnica.id)
+        self.assertEqual(
+            set(Term.objects.filter(facet=self.tecnica).values_list("name", flat=True)),
+            {"Horneado", "Pasteles", "Chocolate"},
+        )
+
+    def test_move_rejects_cycles_and_clashes(self):
+        from django.core.exceptions import ValidationError
+
+        from .taxonomy import move_subtree
+
+        with self.assertRaises(ValidationError):
+            move_subtree(self.pasteles.id, self.chocolate.id)
+        Term.objects.create(facet=self.tipo, name="Chocolate", parent=self.postre)
+        with self.assertRaises(ValidationError):
+            move_subtree(self.chocolate.id, self.postre.id)
+        self.assertEqual(Term.objects.get(pk=self.chocolate.pk).parent_id, self.pasteles.id)
+
+    def test_merge_terms(self):
+        from .taxonomy import merge_terms
+
+        flan_pasteles = RecipeTerm.objects.get(recipe=self.flan, term=self.pasteles)
+        with self.captureOnCommitCallbacks(execute=True):
+            relinked = merge_terms(self.pasteles.id, self.pastel.id)
+        self.assertEqual(relinked, 0)  # Flan ya tenía Pastel: la etiqueta duplicada se borra
+        self.assertFalse(Term.objects.filter(pk=self.pasteles.pk).exists())
+        self.assertEqual(Term.objects.get(pk=self.chocolate.pk).parent_id, self.pastel.id)
+        self.assertEqual(
+            list(RecipeTerm.objects.filter(recipe=self.flan).values_list("term_id", flat=True)),
+            [self.pastel.id],
+        )
+        # Una lápida por fila borrada: la de terms_reorganized, sin las de post_delete
+        tombstones = ChangeLogEntry.objects.filter(deleted=True)
+        self.assertEqual(
+            sorted(tombstones.values_list("entity", "object_id")),
+            sorted([
+                (ChangeLogEntry.Entity.TERM, self.pasteles.id),
+                (ChangeLogEntry.Entity.RECIPE_TERM, flan_pasteles.id),
+            ]),
+        )
+
+    def test_api(self):
+        response = self.client.post(
+            f"/api/v1/terms/{self.pasteles.id}/merge/", {"into": self.pastel.id},
+            content_type="application/json",
+        )
+        self.assertIn(response.status_code, (401, 403))
+
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            "/api/v1/terms/reorder/", {"ids": [self.pasteles.id, self.postre.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(Term.objects.filter(parent=None, facet=self.tipo).order_by("order")
+                 .values_list("name", flat=True)),
+            ["Pasteles", "Postre"],
+        )
+        response = self.client.post(
+            "/api/v1/terms/reorder/", {"ids": [self.pasteles.id, self.pastel.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            f"/api/v1/terms/{self.pasteles.id}/move/", {"parent": self.chocolate.id},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("parent", response.json())
+        response = self.client.post(
+            f"/api/v1/terms/{self.chocolate.id}/move/", {"parent": None},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"moved": 1})
+
+    def test_api_rejects_malformed_ids(self):
+        self.client.force_login(self.admin)
+        for action, data in (("move", {"parent": None}), ("merge", {"into": self.pastel.id})):
+            with self.subTest(action=action):
+                response = self.client.post(
+                    f"/api/v1/terms/abc/{action}/", data, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 404)
+        response = self.client.post(
+            "/api/v1/terms/reorder/", {"ids": [True, False]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ids", response.json())
+
+
+class SlowQueryLogTests(TestCase):
+    """Registro de consultas lentas: normalización, EXPLAIN y resumen por huella."""
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "slow.jsonl"
+
+    def test_normalize_sql(self):
+        from .querylog import fingerprint, normalize_sql, params_shape
+
+        first = normalize_sql('SELECT * FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND "x" = \'a\' LIMIT 21')
+        second = normalize_sql('SELECT * FROM "t"  WHERE "t"."id" IN (%s) AND "x" = \'b\' LIMIT 5')
+        self.assertEqual(first, 'SELECT * FROM "t" WHERE "t"."id" IN (...) AND "x" = ? LIMIT ?')
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertEqual(params_shape((1, 2, 3, "x", None)), "int*3, str, NoneType")
+
+    def test_logs_with_plan_and_aggregates(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .querylog import SlowQueryLogger, aggregate, log_slow_queries, read_entries
+
+        SlowQueryLogger.explained.clear()
+        config = {"SLOW_QUERY_LOG": {"THRESHOLD_MS": 0, "EXPLAIN": True, "PATH": self.path}}
+        with override_settings(**config), log_slow_queries("prueba"):
+            for term_ids in ([1], [1, 2, 3]):
+                list(Recipe.objects.filter(terms__id__in=term_ids).distinct())
+
+        entries = [entry for entry in read_entries(self.path) if "recipes_recipeterm" in entry["sql"]]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]["view"], "prueba")
+        self.assertEqual(entries[1]["params"], "int*3")
+        self.assertTrue(entries[0]["plan"])  # EXPLAIN QUERY PLAN, solo la primera vez
+        self.assertIsNone(entries[1]["plan"])
+        self.assertFalse(any("EXPLAIN" in entry["sql"] for entry in read_entries(self.path)))
+
+        (group,) = aggregate(entries)
+        self.assertEqual(group["count"], 2)
+        self.assertEqual(group["views"], {"prueba": 2})
+        self.assertEqual(group["plan"], entries[0]["plan"])
+        self.assertLessEqual(group["p50_ms"], group["p95_ms"])
+
+        out = StringIO()
+        call_command("slow_queries", path=str(self.path), plans=True, stdout=out)
+        self.assertIn(group["fingerprint"], out.getvalue())
+
+    def test_middleware_records_view(self):
+        from .querylog import read_entries
+
+        config = {"ENABLED": True, "THRESHOLD_MS": 0, "EXPLAIN": False, "PATH": self.path}
+        with override_settings(SLOW_QUERY_LOG=config):
+            self.client.get("/api/v1/terms/")
+        views = {entry["view"] for entry in read_entries(self.path)}
+        self.assertIn("GET recipes:term-list", views)
+
+
+class CatalogStoreTests(TestCase):
+    """Catálogo en memoria: mismas respuestas que la BD y versión compartida por archivo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        cls.postre = Term.objects.create(facet=tipo, name="Postre")
+        cls.pastel = Term.objects.create(facet=tipo, name="Pastel", parent=cls.postre)
+        cls.flan = Recipe.objects.create(title="Flan", instructions="-", ingredients_text="huevo")
+        RecipeTerm.objects.create(recipe=cls.flan, term=cls.pastel)
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+
+        from django.core.cache import cache
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "catalog.snapshot"
+        cache.clear()
+
+    def catalog_settings(self):
+        return self.settings(CATALOG={"ENABLED": True, "SNAPSHOT_PATH": self.path})
+
+    def test_responses_match_database(self):
+        urls = [
+            "/api/v1/recipes/", f"/api/v1/recipes/{self.flan.slug}/", "/api/v1/terms/",
+            f"/api/v1/terms/{self.postre.id}/", "/api/v1/terms-tree/", "/api/v1/facets-terms-tree/",
+            "/api/v1/taxonomies/", "/api/v1/facets/", "/api/v1/recipe-terms/",
+        ]
+        expected = {url: self.client.get(url).json() for url in urls}
+        with self.catalog_settings():
+            catalog_store.invalidate()
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).json(), expected[url])
+            with self.assertNumQueries(0):
+                self.client.get(f"/api/v1/terms/{self.postre.id}/")
+
+    def test_invalidation_reaches_other_workers(self):
+        from django.core.cache import cache
+
+        from .catalog import CatalogStore
+
+        worker_a, worker_b = CatalogStore(), CatalogStore()
+        with self.catalog_settings():
+            version = worker_a.get().version
+            with self.assertNumQueries(0):  # mapea el archivo de A, no reconstruye
+                self.assertEqual(worker_b.get().version, version)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Recipe.objects.create(title="Churros", instructions="-", ingredients_text="-")
+            cache.clear()  # la versión no depende del cache (procesos distintos)
+            catalog = worker_b.get()
+            self.assertNotEqual(catalog.version, version)
+            self.assertEqual(len(catalog.recipe_id), 2)
+            self.assertEqual(worker_a.get().version, catalog.version)
+
+    def test_stale_snapshot_is_rebuilt(self):
+        from .catalog import CatalogStore, build_columns, dump, write_snapshot
+
+        with self.catalog_settings():
+            catalog_store.invalidate()
+            # Un worker que reconstruyó antes de la invalidación deja un archivo viejo
+            write_snapshot(self.path, dump(build_columns(), "vieja"))
+            catalog = CatalogStore().get()
+        self.assertNotEqual(catalog.version, "vieja")
+
+    def test_disabled_mode_touches_no_file(self):
+        with self.settings(CATALOG={"ENABLED": False, "SNAPSHOT_PATH": self.path}):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                Taxonomy.objects.create(name="Secundaria")
+            self.assertTrue(callbacks)
+            catalog_store.invalidate()
+        self.assertEqual(list(self.path.parent.iterdir()), [])
+
+    def test_memory_only_mode_warns_with_local_cache(self):
+        from .checks import catalog_cache_check
+
+        with self.settings(CATALOG={"ENABLED": True, "SNAPSHOT_PATH": None}):
+            self.assertEqual([w.id for w in catalog_cache_check(None)], ["recipes.W001"])
+        with self.catalog_settings():
+            self.assertEqual(catalog_cache_check(None), [])
+
+
+class AutocompleteTests(TestCase):
+    """Prefijos en memoria, cambios después del commit y versión entre procesos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        cls.tipo = Facet.objects.create(taxonomy=taxonomy, name="Proteína", order=1)
+        cls.pollo = Term.objects.create(facet=cls.tipo, name="Pollo")
+        for title in ("Tacos de pollo", "Pollo asado", "Polvorones"):
+            recipe = Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            if "ollo" in title:
+                RecipeTerm.objects.create(recipe=recipe, term=cls.pollo)
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        from .autocomplete import autocomplete_index
+
+        cache.clear()
+        self.index = autocomplete_index
+        self.index.invalidate()
+
+    def labels(self, query):
+        return [row["label"] for row in self.index.suggest(query)]
+
+    def test_prefix_ranking(self):
+        # El término lleva a 2 recetas; sin acentos ni mayúsculas
+        self.assertEqual(self.labels("POL"), ["Pollo", "Polvorones", "Pollo asado", "Tacos de pollo"])
+        self.assertEqual(self.labels("tacos po"), ["Tacos de pollo"])
+        response = self.client.get("/api/v1/autocomplete/", {"q": "pollo a"})
+        self.assertEqual([row["label"] for row in response.json()], ["Pollo asado"])
+
+    def test_updates_after_commit_only(self):
+        from django.db import transaction
+
+        self.labels("pol")  # construye el índice
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(title="Pollo frito", instructions="-", ingredients_text="-")
+        try:
+            with transaction.atomic():
+                Recipe.objects.create(title="Pollo revertido", instructions="-", ingredients_text="-")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with self.assertNumQueries(0):  # incremental, sin reconstruir
+            labels = self.labels("pollo")
+        self.assertIn("Pollo frito", labels)
+        self.assertNotIn("Pollo revertido", labels)
+
+    def test_change_from_another_worker_forces_rebuild(self):
+        from django.core.cache import cache
+
+        from .autocomplete import VERSION_CACHE_KEY
+
+        self.labels("pol")
+        # Otro worker publicó un cambio que este proceso no tiene
+        Recipe.objects.filter(title="Polvorones").update(title="Mantecadas")
+        cache.incr(VERSION_CACHE_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(title="Pollo frito", instructions="-", ingredients_text="-")
+        with self.assertNumQueries(2):
+            labels = self.labels("pol")
+        self.assertNotIn("Polvorones", labels)
+        self.assertIn("Pollo frito", labels)
+
+    def test_deploy_check_requires_shared_cache(self):
+        from .checks import shared_cache_check
+
+        self.assertEqual([w.id for w in shared_cache_check(None)], ["recipes.W002"])
+        with self.settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": "/tmp/recipes-test-cache",
+        }}):
+            self.assertEqual(shared_cache_check(None), [])
+
+
+class SearchRelevanceTests(TestCase):
+    """BM25F por campo, cursor por (score, id), reindexado y carga inicial."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def recipe(title, instructions="-", ingredients="-"):
+            return Recipe.objects.create(
+                title=title, instructions=instructions, ingredients_text=ingredients
+            )
+
+        cls.en_titulo = recipe("Tacos de pollo")
+        # Mismo texto y longitudes medias parecidas: decide el peso del campo
+        cls.en_instrucciones = recipe("Guiso verde", instructions="Pollo cocido.")
+        cls.en_ingredientes = recipe("Caldo", ingredients="Pollo cocido.")
+        cls.otra = recipe("Flan napolitano")
+        cls.sopas = [
+            recipe(f"Sopa de fideo {n}", instructions="Servir caliente.", ingredients="Fideo, jitomate")
+            for n in range(5)
+        ]
+
+    def ranked_ids(self, query):
+        from .search import rank_recipes
+
+        return [recipe_id for recipe_id, _ in rank_recipes(query, Recipe.objects.all())]
+
+    def test_field_boosts(self):
+        self.assertEqual(
+            self.ranked_ids("pollo"),
+            [self.en_titulo.id, self.en_ingredientes.id, self.en_instrucciones.id],
+        )
+        # Plurales y acentos se normalizan igual en el índice y en la consulta
+        self.assertEqual(self.ranked_ids("POLLOS"), self.ranked_ids("pollo"))
+        self.assertEqual(self.ranked_ids("napolitanó"), [self.otra.id])
+        self.assertEqual(self.ranked_ids("de el"), [])
+
+    def test_cursor_pages_cover_results_once(self):
+        seen, params = [], {"q": "sopa", "ordering": "relevance", "page_size": 2}
+        while True:
+            body = self.client.get("/api/v1/recipes/", params).json()
+            self.assertEqual(body["count"], 5)
+            seen.extend(row["id"] for row in body["results"])
+            if not body["next"]:
+                break
+            params["cursor"] = re.search(r"cursor=([\w-]+)", body["next"]).group(1)
+        self.assertEqual(seen, self.ranked_ids("sopa"))
+        self.assertCountEqual(seen, [recipe.id for recipe in self.sopas])
+
+        response = self.client.get(
+            "/api/v1/recipes/", {"q": "sopa", "ordering": "relevance", "cursor": "no-es-cursor"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_only_text_changes_reindex(self):
+        from unittest import mock
+
+        with mock.patch("recipes.signals.index_recipe") as index_recipe:
+            self.otra.save(update_fields=["updated_at"])
+            index_recipe.assert_not_called()
+        self.otra.title = "Flan de cajeta"
+        self.otra.save(update_fields=["title", "updated_at"])
+        self.assertEqual(self.ranked_ids("cajeta"), [self.otra.id])
+        self.assertEqual(self.ranked_ids("napolitano"), [])
+
+    def test_migration_backfills_missing_documents(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        from .models import RecipeSearchDocument, RecipeSearchPosting, SearchTermStat
+
+        backfill = import_module("recipes.migrations.0011_backfill_search_index")
+        expected = dict(SearchTermStat.objects.values_list("token", "doc_freq"))
+        # Como una base creada antes del índice, salvo una receta ya indexada
+        indexed = self.sopas[0]
+        RecipeSearchPosting.objects.exclude(recipe=indexed).delete()
+        RecipeSearchDocument.objects.exclude(recipe=indexed).delete()
+        SearchTermStat.objects.filter(token="pollo").delete()
+        SearchTermStat.objects.exclude(token="pollo").update(doc_freq=0)
+        for token in set(indexed.search_postings.values_list("token", flat=True)):
+            SearchTermStat.objects.filter(token=token).update(doc_freq=1)
+
+        backfill.backfill_search_index(apps, None)
+        self.assertEqual(RecipeSearchDocument.objects.count(), Recipe.objects.count())
+        self.assertEqual(
+            dict(SearchTermStat.objects.values_list("token", "doc_freq")), expected
+        )
+        self.assertEqual(self.ranked_ids("pollo")[0], self.en_titulo.id)
+
+
+class IngredientIndexTests(TestCase):
+    """Nombres canónicos desde texto libre y cobertura de la despensa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def recipe(title, ingredients):
+            return Recipe.objects.create(title=title, instructions="-", ingredients_text=ingredients)
+
+        cls.hotcakes = recipe("Hotcakes", "2 tazas de harina\n2 huevos\n1 taza de leche")
+        cls.omelette = recipe("Omelette", "3 huevos; Sal al gusto")
+        cls.flan = recipe("Flan", "4 huevos\n1 lata de leche condensada\n1 taza de azúcar")
+        cls.ensalada = recipe("Ensalada", "2 jitomates\n1 pepino")
+
+    def test_normalize_ingredient(self):
+        from .ingredients import normalize_ingredient, parse_ingredients_text
+
+        cases = {
+            "2 tazas de Harina de trigo, cernida": "harina de trigo",
+            "- 3 dientes de ajo (picados)": "ajo",
+            "1/2 kg de nueces": "nuez",
+            "2. Limones": "limon",
+            "Sal al gusto": "sal",
+            "½ taza de azúcar": "azucar",
+            "1 piña": "piña",
+            "3 tazas": "",
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(normalize_ingredient(line), expected)
+        self.assertEqual(
+            parse_ingredients_text("2 huevos\n1 taza de azúcar; Sal al gusto\n\n"),
+            {"huevo", "azucar", "sal"},
+        )
+
+    def test_sync_only_on_ingredient_changes(self):
+        from .models import RecipeIngredient
+
+        def names():
+            return set(
+                RecipeIngredient.objects.filter(recipe=self.omelette)
+                .values_list("ingredient__name", flat=True)
+            )
+
+        self.assertEqual(names(), {"huevo", "sal"})
+
+        self.omelette.ingredients_text = "3 huevos\n50 g de queso"
+        self.omelette.save(update_fields=["title"])
+        self.assertEqual(names(), {"huevo", "sal"})
+        self.omelette.save()
+        self.assertEqual(names(), {"huevo", "queso"})
+
+    def test_pantry_ranks_by_coverage(self):
+        response = self.client.get(
+            "/api/v1/recipes/pantry/", {"ingredients": "Huevos, harina,leche", "ingredient": "sal"}
+        )
+        body = response.json()
+        self.assertEqual(body["pantry"], ["sal", "huevo", "harina", "leche"])
+        rows = [
+            (row["recipe"]["title"], row["coverage"], row["matched"], row["missing"])
+            for row in body["results"]
+        ]
+        self.assertEqual(rows, [
+            ("Hotcakes", 1.0, ["harina", "huevo", "leche"], []),
+            ("Omelette", 1.0, ["huevo", "sal"], []),
+            ("Flan", 0.3333, ["huevo"], ["azucar", "leche condensada"]),
+        ])
+
+    def test_pantry_limit_and_unknown_ingredients(self):
+        response = self.client.get("/api/v1/recipes/pantry/", {"ingredients": "huevo", "limit": "1"})
+        self.assertEqual([row["recipe"]["title"] for row in response.json()["results"]], ["Omelette"])
+        response = self.client.get("/api/v1/recipes/pantry/", {"ingredients": "caviar,,"})
+        self.assertEqual(response.json(), {"pantry": ["caviar"], "results": []})
+
+
+class SimilarRecipesTests(TestCase):
+    """Vecinos por coseno de términos y parcheo incremental de las listas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        tipo = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato", order=1)
+        proteina = Facet.objects.create(taxonomy=taxonomy, name="Proteína", order=2)
+        cls.terms = {
+            name: Term.objects.create(facet=facet, name=name)
+            for facet, names in ((tipo, ("Sopa", "Guiso", "Postre")), (proteina, ("Pollo", "Res")))
+            for name in names
+        }
+
+        def recipe(title, *names):
+            obj = Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for name in names:
+                RecipeTerm.objects.create(recipe=obj, term=cls.terms[name])
+            return obj
+
+        cls.caldo = recipe("Caldo de pollo", "Sopa", "Pollo")
+        cls.consome = recipe("Consomé de pollo", "Sopa", "Pollo")
+        cls.sopa = recipe("Sopa de res", "Sopa", "Res")
+        cls.guiso = recipe("Guiso de res", "Guiso", "Res")
+        cls.flan = recipe("Flan", "Postre")
+
+    def neighbours(self):
+        return {
+            recipe_id: [n[0] for n in neighbours]
+            for recipe_id, neighbours in RecipeSimilarity.objects.values_list("recipe_id", "neighbours")
+        }
+
+    def test_full_build(self):
+        from .similarity import build_similar_recipes
+
+        summary = build_similar_recipes(full=True)
+        self.assertEqual(summary, {"recipes": 5, "recomputed": 5, "updated": 5})
+        neighbours = self.neighbours()
+        self.assertEqual(neighbours[self.caldo.id], [self.consome.id, self.sopa.id])
+        # "Res" es más rara que "Sopa": pesa más en el coseno
+        self.assertEqual(neighbours[self.sopa.id][0], self.guiso.id)
+        self.assertEqual(neighbours[self.flan.id], [])
+
+        response = self.client.get(f"/api/v1/recipes/{self.caldo.slug}/")
+        self.assertEqual(
+            [row["title"] for row in response.json()["similar"]], ["Consomé de pollo", "Sopa de res"]
+        )
+        # Sin cambios de etiquetas no se recalcula ni se escribe nada
+        self.assertEqual(
+            build_similar_recipes(), {"recipes": 5, "recomputed": 0, "updated": 0}
+        )
+
+    def test_incremental_matches_full(self):
+        from .similarity import build_similar_recipes
+
+        build_similar_recipes(full=True)
+        RecipeTerm.objects.filter(recipe=self.guiso, term=self.terms["Res"]).update(
+            term=self.terms["Pollo"]
+        )
+        self.flan.delete()
+        summary = build_similar_recipes()
+        self.assertEqual(summary["recomputed"], 1)
+        incremental = self.neighbours()
+
+        build_similar_recipes(full=True)
+        self.assertEqual(incremental, self.neighbours())
+
+    def test_truncated_list_is_refilled(self):
+        from .similarity import build_similar_recipes
+
+        build_similar_recipes(top_k=1, full=True)
+        self.assertEqual(self.neighbours()[self.caldo.id], [self.consome.id])
+        # El único vecino guardado deja de parecerse: entra el que era el segundo
+        RecipeTerm.objects.filter(recipe=self.consome).delete()
+        RecipeTerm.objects.create(recipe=self.consome, term=self.terms["Postre"])
+        build_similar_recipes(top_k=1)
+        self.assertEqual(self.neighbours()[self.caldo.id], [self.sopa.id])
+
+
+class RendererTests(TestCase):
+    """orjson/MessagePack y el camino values() de la lista."""
+
+    @classmethod
+    def setUpTestData(cls):
+        taxonomy = Taxonomy.objects.create(name="Principal")
+        facet = Facet.objects.create(taxonomy=taxonomy, name="Tipo de plato")
+        postre = Term.objects.create(facet=facet, name="Postre")
+        cls.terms = [Term.objects.create(facet=facet, name=name, parent=postre) for name in ("Pay", "Flan")]
+        cls.recipes = [
+            Recipe.objects.create(title=title, instructions="-", ingredients_text="-", description="ñ")
+            for title in ("Pay de limón", "Flan napolitano")
+        ]
+        for term in cls.terms:
+            RecipeTerm.objects.create(recipe=cls.recipes[0], term=term)
+        Recipe.objects.filter(id=cls.recipes[1].id).update(image="recipes/flan.jpg")
+
+    def test_from_values_matches_model_serializer(self):
+        import json
+
+        from rest_framework.test import APIRequestFactory
+
+        from .api.serializer import RecipeListSerializer
+
+        request = APIRequestFactory().get("/api/v1/recipes/")
+        queryset = Recipe.objects.order_by("id")
+        expected = RecipeListSerializer(queryset, many=True, context={"request": request}).data
+        with self.assertNumQueries(2):
+            rows = RecipeListSerializer.from_values(queryset, request)
+        self.assertEqual(json.loads(json.dumps(rows)), json.loads(json.dumps(expected)))
+        self.assertEqual(list(rows[0]), list(expected[0]))
+        self.assertTrue(rows[1]["image"].startswith("http://testserver/"))
+        self.assertEqual(RecipeListSerializer.from_values(Recipe.objects.none()), [])
+
+    def test_msgpack_negotiation(self):
+        import msgpack
+
+        as_json = self.client.get("/api/v1/recipes/", {"ordering": "title"})
+        self.assertEqual(as_json["Content-Type"], "application/json")
+        for response in (
+            self.client.get("/api/v1/recipes/", {"ordering": "title"}, HTTP_ACCEPT="application/msgpack"),
+            self.client.get("/api/v1/recipes/", {"ordering": "title", "format": "msgpack"}),
+        ):
+            self.assertEqual(response["Content-Type"], "application/msgpack")
+            self.assertEqual(msgpack.unpackb(response.content, raw=False), as_json.json())
+
+    def test_fallback_types_and_parse_errors(self):
+        from decimal import Decimal
+        from io import BytesIO
+
+        import msgpack
+        from django.utils.translation import gettext_lazy
+        from rest_framework.exceptions import ParseError
+
+        from .api.renderers import (
+            MessagePackParser, MessagePackRenderer, ORJSONParser, ORJSONRenderer,
+        )
+
+        # Igual que el JSONEncoder de DRF: Decimal -> float, lazy -> str
+        data = {"precio": Decimal("1.50"), "nombre": gettext_lazy("Postre"), 1: None}
+        self.assertEqual(
+            ORJSONRenderer().render(data), b'{"precio":1.5,"nombre":"Postre","1":null}'
+        )
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data), raw=False, strict_map_key=False),
+            {"precio": 1.5, "nombre": "Postre", 1: None},
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+        self.assertEqual(ORJSONParser().parse(BytesIO(b'{"a": [1]}')), {"a": [1]})
+        for parser, body in ((ORJSONParser(), b"{"), (MessagePackParser(), b"\xc1")):
+            with self.subTest(parser=type(parser).__name__), self.assertRaises(ParseError):
+                parser.parse(BytesIO(body))
+
+
+class CompressionTests(TestCase):
+    """Negociación brotli/gzip, ETag, cache de cuerpos y BREACH."""
+
+    body = ('{"recetas": [%s]}' % ", ".join(f'"Receta {n}"' for n in range(200))).encode()
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def respond(self, method="get", content_type="application/json", body=None, view=None, **headers):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from .middleware import CompressionMiddleware
+
+        def get_response(request):
+            if view:
+                view(request)
+            return HttpResponse(body or self.body, content_type=content_type)
+
+        request = getattr(RequestFactory(), method)("/", **headers)
+        return CompressionMiddleware(get_response)(request)
+
+    def decoded(self, response):
+        import gzip
+
+        import brotli
+
+        if response.get("Content-Encoding") == "br":
+            return brotli.decompress(response.content)
+        if response.get("Content-Encoding") == "gzip":
+            return gzip.decompress(response.content)
+        return response.content
+
+    def test_encoding_negotiation(self):
+        cases = {
+            "gzip, deflate, br": "br",
+            "gzip, br;q=0": "gzip",
+            "identity": None,
+            "": None,
+        }
+        for header, encoding in cases.items():
+            with self.subTest(header=header):
+                response = self.respond(HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.get("Content-Encoding"), encoding)
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+                if encoding:
+                    self.assertEqual(response["Content-Length"], str(len(response.content)))
+                self.assertEqual(self.decoded(response), self.body)
+        small = self.respond(body=b'{"ok": true}', HTTP_ACCEPT_ENCODING="br")
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+    def test_etag_only_when_revalidable(self):
+        import hashlib
+        from unittest import mock
+
+        response = self.respond(HTTP_ACCEPT_ENCODING="br")
+        etag = response["ETag"]
+        not_modified = self.respond(HTTP_ACCEPT_ENCODING="br", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+
+        with mock.patch("recipes.middleware.hashlib.sha1", wraps=hashlib.sha1) as sha1:
+            post = self.respond("post", HTTP_ACCEPT_ENCODING="br")
+        self.assertFalse(post.has_header("ETag"))
+        self.assertEqual(post["Content-Encoding"], "br")
+        sha1.assert_not_called()
+
+    def test_compressed_body_cache_is_bounded(self):
+        import hashlib
+
+        from django.core.cache import cache
+
+        self.respond(HTTP_ACCEPT_ENCODING="br")
+        digest = hashlib.sha1(self.body).hexdigest()
+        self.assertIsNotNone(cache.get(f"recipes:compressed:br:5:{digest}"))
+
+        cache.clear()
+        with self.settings(RESPONSE_COMPRESSION={"CACHE_MAX_SIZE": len(self.body) - 1}):
+            response = self.respond(HTTP_ACCEPT_ENCODING="br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIsNone(cache.get(f"recipes:compressed:br:5:{digest}"))
+
+    def test_breach_mitigations(self):
+        import hashlib
+
+        from django.core.cache import cache
+        from django.middleware.csrf import get_token
+
+        html = b"<html><body>" + self.body + b"</body></html>"
+        sizes = set()
+        for _ in range(10):
+            response = self.respond(content_type="text/html", body=html, HTTP_ACCEPT_ENCODING="gzip, br")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(self.decoded(response), html)
+            sizes.add(len(response.content))
+        self.assertGreater(len(sizes), 1)  # relleno aleatorio
+        self.assertIsNone(cache.get(f"recipes:compressed:gzip:6:{hashlib.sha1(html).hexdigest()}"))
+
+        with_token = self.respond(view=get_token, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertFalse(with_token.has_header("Content-Encoding"))
+        self.assertEqual(with_token.content, self.body)
+
+
+class SnapshotTests(TestCase):
+    """build_snapshot: archivos + manifest, reconstrucción incremental por firma."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipes = [
+            Recipe.objects.create(title=title, instructions="-", ingredients_text="-")
+            for title in ("Mole poblano", "Pozole rojo", "Tamales verdes")
+        ]
+
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = directory.name
+
+    def build(self, **options):
+        import json
+        from io import StringIO
+        from pathlib import Path
+
+        from django.core.management import call_command
+
+        stdout = StringIO()
+        call_command("build_snapshot", output=self.output, workers=1, stdout=stdout, **options)
+        manifest = json.loads((Path(self.output) / "manifest.json").read_text())
+        rendered = int(re.search(r"(\d+) recetas renderizadas", stdout.getvalue()).group(1))
+        return manifest, rendered
+
+    def test_full_build(self):
+        import json
+        from pathlib import Path
+
+        from django.urls import reverse
+
+        manifest, rendered = self.build(full=True)
+        self.assertEqual(rendered, 3)
+        slug = self.recipes[0].slug
+        entry = manifest["files"][f"/api/v1/recipes/{slug}/"]
+        self.assertEqual(entry["recipe"], self.recipes[0].id)
+        content = json.loads((Path(self.output) / entry["file"]).read_text())
+        self.assertEqual(content, self.client.get(f"/api/v1/recipes/{slug}/").json())
+        html_path = reverse("recipes:recipe_detail", kwargs={"slug": slug})
+        self.assertEqual(manifest["files"][html_path]["content_type"], "text/html; charset=utf-8")
+        self.assertIn("/api/v1/facets/", manifest["files"])
+
+    def test_incremental_rebuild(self):
+        from pathlib import Path
+
+        manifest, _ = self.build(full=True)
+        self.assertEqual(self.build()[1], 0)
+
+        self.recipes[0].description = "Con chocolate"
+        self.recipes[0].save()
+        removed = self.recipes[2]
+        removed_file = Path(self.output) / manifest["files"][f"/api/v1/recipes/{removed.slug}/"]["file"]
+        removed.delete()
+        manifest, rendered = self.build()
+        self.assertEqual(rendered, 1)
+        self.assertFalse(removed_file.exists())
+        self.assertNotIn(f"/api/v1/recipes/{removed.slug}/", manifest["files"])
+        self.assertEqual(len(manifest["recipes"]), 2)
+
+    def test_renamed_neighbour_rerenders_recipe(self):
+        import json
+        from pathlib import Path
+
+        mole, pozole, _ = self.recipes
+        RecipeSimilarity.objects.create(recipe=mole, neighbours=[[pozole.id, 0.5]], terms_fingerprint="-")
+        self.build(full=True)
+
+        pozole.title = "Pozole blanco"
+        pozole.save()
+        manifest, rendered = self.build()
+        self.assertEqual(rendered, 2)  # el pozole y el mole que lo muestra en "similar"
+        entry = manifest["files"][f"/api/v1/recipes/{mole.slug}/"]
+        content = json.loads((Path(self.output) / entry["file"]).read_text())
+        self.assertEqual([row["title"] for row in content["similar"]], ["Pozole blanco"])
+
+
+class StartupProfileTests(TestCase):
+    """Perfil settings_api y el reporte de arranque."""
+
+    importtime = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       400 |        400 | django.utils\n"
+        "import time:       100 |        500 | django\n"
+        "import time:      2000 |       2000 | numpy.core\n"
+        "otra línea\n"
+    )
+
+    def test_parse_importtime(self):
+        from .management.commands.startup_report import parse_importtime
+
+        self.assertEqual(parse_importtime(self.importtime), {"django": 500, "numpy": 2000})
+
+    def test_report(self):
+        import json
+        import subprocess
+        from io import StringIO
+        from unittest import mock
+
+        from django.core.management import CommandError, call_command
+
+        timings = {"setup_ms": 120.0, "first_response_ms": 8.5, "status": "200 OK", "bytes": 42}
+        result = subprocess.CompletedProcess([], 0, stdout=json.dumps(timings) + "\n", stderr=self.importtime)
+        stdout = StringIO()
+        with mock.patch("subprocess.run", return_value=result) as run:
+            call_command("startup_report", top=1, stdout=stdout)
+        self.assertIn("-X", run.call_args.args[0])
+        self.assertEqual(
+            stdout.getvalue().splitlines()[1:],
+            [
+                "Setup (WSGI):      120.0 ms",
+                "Primera respuesta: 8.5 ms (200 OK, 42 bytes) -> /api/v1/facets-terms-tree/",
+                "Imports totales:   2.5 ms en 2 paquetes",
+                "",
+                "       2.0 ms  numpy",
+            ],
+        )
+
+        failed = subprocess.CompletedProcess([], 1, stdout="", stderr="Traceback\nImportError: x")
+        with mock.patch("subprocess.run", return_value=failed):
+            with self.assertRaisesMessage(CommandError, "ImportError: x"):
+                call_command("startup_report", stdout=StringIO())
+
+    def test_api_profile_skips_heavy_imports(self):
+        import subprocess
+        import sys
+
+        from django.conf import settings
+
+        probe = (
+            "import os, sys\n"
+            "os.environ['DJANGO_SETTINGS_MODULE'] = 'recipes_core_demo.settings_api'\n"
+            "from django.core.wsgi import get_wsgi_application\n"
+            "get_wsgi_application()\n"
+            "print(sorted(m for m in ('numpy', 'django_filters', 'django.contrib.admin', "
+            "'PIL') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", probe], capture_output=True, text=True, cwd=settings.BASE_DIR
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_api_urlconf_skips_html_and_codecs(self):
+        import subprocess
+        import sys
+
+        from django.conf import settings
+
+        probe = (
+            "import os, sys\n"
+            "os.environ['DJANGO_SETTINGS_MODULE'] = 'recipes_core_demo.settings_api'\n"
+            "from django.core.wsgi import get_wsgi_application\n"
+            "get_wsgi_application()\n"
+            "from django.urls import resolve\n"
+            "resolve('/api/v1/facets/')\n"
+            "print(sorted(m for m in ('recipes.views', 'recipes.snapshot', 'msgpack', "
+            "'orjson', 'brotli') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", probe], capture_output=True, text=True, cwd=settings.BASE_DIR
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    @override_settings(ROOT_URLCONF="recipes_core_demo.urls_api")
+    def test_api_urlconf(self):
+        response = self.client.get("/api/v1/facets/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        self.assertEqual(self.client.get("/admin/").status_code, 404)
+        self.assertEqual(self.client.get("/api/test/recipes/").status_code, 404)
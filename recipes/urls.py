@@ -1,34 +1,16 @@
 # recipes/urls.py
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from django.urls import path
 
 from . import views
-from .api.views import (
-    TaxonomyViewSet,
-    FacetViewSet,
-    TermViewSet,
-    TermTreeViewSet,
-    FacetTermsTreeViewSet,
-    RecipeViewSet,
-    RecipeTermViewSet,
-)
+from .api.urls import urlpatterns as api_urlpatterns
 
 app_name = "recipes"
 
-router = DefaultRouter()
-router.register("taxonomies", TaxonomyViewSet, basename="taxonomy")
-router.register("facets", FacetViewSet, basename="facet")
-router.register("terms", TermViewSet, basename="term")           # plano
-router.register("terms-tree", TermTreeViewSet, basename="term-tree")  # árbol
-router.register("facets-terms-tree", FacetTermsTreeViewSet, basename="facet-terms-tree")  # facetas agrupadas
-router.register("recipes", RecipeViewSet, basename="recipe")
-router.register("recipe-terms", RecipeTermViewSet, basename="recipeterm")
-
 urlpatterns = [
     # Vistas HTML
     path("test/recipes/", views.recipe_list, name="recipe_list"),
     path("test/recipes/<slug:slug>/", views.recipe_detail, name="recipe_detail"),
 
-    # API REST (JSON) generada por el router
-    path("v1/", include(router.urls)),
-]
\ No newline at end of file
+    # API REST (JSON), ver recipes/api/urls.py
+    *api_urlpatterns,
+]
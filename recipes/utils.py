@@ -26,6 +26,7 @@ def sanitize_filename(filename: str) -> str:
     return f"{clean_name}{clean_ext}"
 
 
+# Ya no se usa en Recipe.image (ver recipes/images.py)
 def generate_recipe_image_filename(instance, original_filename: str) -> str:
     """
     Genera un nombre único y seguro para imágenes de recetas.
@@ -1,30 +1,20 @@
+import os
+
+from django.conf import settings
 from django.db.models import Prefetch, Q
+from django.http import HttpResponseNotModified
 from django.shortcuts import get_object_or_404, render
-
+from django.utils._os import safe_join
+from django.utils.http import parse_etags
+from django.views.static import serve
+
+from .faceting import filter_by_term_groups, group_term_ids_by_facet
+from .images import digest_from_name
+from .popularity import view_counter
+from .internal import is_internal_render
 from .models import Recipe, Facet, Term
 
 
-def _get_descendant_term_ids(term_ids):
-    """
-    Dado un conjunto de IDs de términos seleccionados por el usuario,
-    devuelve esos IDs + todos los IDs de sus descendientes (hijos, nietos, etc.).
-    Esto permite que al filtrar por 'Postre' también se encuentren recetas
-    etiquetadas solo con 'Pastel', 'Helado', etc.
-    """
-    expanded_ids = set(int(tid) for tid in term_ids)
-    queue = list(expanded_ids)
-
-    while queue:
-        current_id = queue.pop()
-        children = Term.objects.filter(parent_id=current_id).values_list("id", flat=True)
-        for child_id in children:
-            if child_id not in expanded_ids:
-                expanded_ids.add(child_id)
-                queue.append(child_id)
-
-    return list(expanded_ids)
-
-
 def recipe_list(request):
     """
     Lista de recetas con:
@@ -45,12 +35,11 @@ def recipe_list(request):
             | Q(instructions__icontains=query)
         )
 
-    print('raw_term_ids', raw_term_ids,recipes, {recipes})
-    # Filtro por términos (y sus descendientes)
+    # Filtro por términos (y sus descendientes): OR dentro de cada faceta,
+    # AND entre facetas
     if raw_term_ids:
-        # Expandir para incluir términos hijos
-        selected_term_ids = _get_descendant_term_ids(raw_term_ids)
-        recipes = recipes.filter(terms__id__in=selected_term_ids).distinct()
+        groups = group_term_ids_by_facet(raw_term_ids)
+        recipes = filter_by_term_groups(recipes, groups)
 
     facets = Facet.objects.prefetch_related(
         Prefetch("terms", queryset=Term.objects.order_by("order", "name"))
@@ -71,6 +60,9 @@ def recipe_detail(request, slug: str):
         slug=slug,
     )
 
+    if not is_internal_render(request):  # build_snapshot no es una visita
+        view_counter.record_view(recipe.id)
+
     # Agrupamos términos por faceta para mostrar las etiquetas
     facet_terms = {}
     for term in recipe.terms.all():
@@ -80,4 +72,37 @@ def recipe_detail(request, slug: str):
         "recipe": recipe,
         "facet_terms": facet_terms,
     }
-    return render(request, "recipes/recipe_detail.html", context)
\ No newline at end of file
+    return render(request, "recipes/recipe_detail.html", context)
+
+# Rutas direccionadas por contenido: el archivo de una URL nunca cambia
+MEDIA_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _media_etag(path: str) -> tuple[str | None, str]:
+    digest = digest_from_name(path)
+    if digest:
+        return f'"{digest}"', MEDIA_IMMUTABLE_CACHE_CONTROL
+    # Imágenes anteriores al almacenamiento por hash: ETag por fecha y tamaño
+    try:
+        stat = os.stat(safe_join(settings.MEDIA_ROOT, path))
+    except (OSError, ValueError):
+        return None, MEDIA_CACHE_CONTROL
+    return f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"', MEDIA_CACHE_CONTROL
+
+
+def serve_media(request, path: str):
+    """
+    Sirve MEDIA_ROOT como django.views.static.serve, más ETag y
+    Cache-Control. Las imágenes en recipes/sha256/ son inmutables: ni el
+    navegador ni el optimizador de imágenes de Next.js las revalidan.
+    """
+    etag, cache_control = _media_etag(path)
+    if etag and etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
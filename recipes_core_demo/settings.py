@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # <-- añadir justo después de SecurityMiddleware
+    'recipes.middleware.CompressionMiddleware',  # gzip/brotli para HTML y API (no estáticos)
+    'recipes.middleware.SlowQueryLogMiddleware',  # consultas lentas por petición (SLOW_QUERY_LOG)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Debe ir antes de CommonMiddleware
     'django.middleware.common.CommonMiddleware',
@@ -143,7 +145,66 @@ REST_FRAMEWORK = {
     # or allow read-only access for unauthenticated users.
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
-    ]
+    ],
+    # JSON con orjson por defecto; MessagePack con Accept: application/msgpack
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.api.renderers.ORJSONRenderer',
+        'recipes.api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.api.renderers.ORJSONParser',
+        'recipes.api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Token bucket por cliente y clase de costo (ver recipes/api/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'recipes.api.throttling.CostTokenBucketThrottle',
+    ],
+}
+
+# Throttling y límite de búsquedas simultáneas (ver recipes/api/throttling.py)
+API_THROTTLING = {
+    'BUCKETS': {
+        # CAPACITY: ráfaga máxima; REFILL_RATE: tokens por segundo
+        'expensive': {'CAPACITY': 30, 'REFILL_RATE': 0.5},  # ?q=, varios ?term=, despensa
+        'cheap': {'CAPACITY': 300, 'REFILL_RATE': 20},  # detalle, árboles, listas simples
+    },
+    'MAX_EXPENSIVE_IN_FLIGHT': 4,  # por proceso; el resto recibe 503 + Retry-After
+    'RETRY_AFTER': 1,  # segundos
+    'CACHE_ALIAS': 'default',  # compartir entre workers requiere una caché compartida
+}
+
+# Compresión de respuestas HTML/API (ver recipes/middleware.py)
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': 512,  # bytes; respuestas más chicas se envían sin comprimir
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CACHE_ALIAS': 'default',  # None para no cachear los cuerpos comprimidos
+    'CACHE_TIMEOUT': 300,
+    'CACHE_MAX_SIZE': 256 * 1024,  # bytes; cuerpos más grandes no se cachean
+}
+
+# Catálogo en memoria de solo lectura (ver recipes/catalog.py)
+CATALOG = {
+    'ENABLED': False,  # True: listas, detalle, árboles y filtros sin consultar la BD
+    'SNAPSHOT_PATH': None,  # archivo mmap compartido entre workers (p. ej. BASE_DIR / 'catalog.snapshot'); None = solo memoria
+}
+
+# Contadores de vistas con escritura diferida (ver recipes/popularity.py)
+POPULARITY = {
+    'FLUSH_INTERVAL': 30,  # segundos entre escrituras por proceso
+    'MAX_PENDING': 1000,  # o antes, al acumular tantas recetas distintas
+    'HALF_LIFE_DAYS': 7,  # decaimiento de ?ordering=popular; None = vistas totales
+}
+
+# Registro de consultas lentas (ver recipes/querylog.py y `manage.py slow_queries`)
+SLOW_QUERY_LOG = {
+    'ENABLED': DEBUG,
+    'THRESHOLD_MS': 100,  # consultas más rápidas no se registran
+    'EXPLAIN': True,  # plan de ejecución, una vez por huella y proceso
+    'PATH': BASE_DIR / 'slow_queries.jsonl',
 }
 
 # CORS Configuration
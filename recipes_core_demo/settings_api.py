@@ -0,0 +1,60 @@
+"""
+Perfil de settings "api": solo JSON, pensado para serverless (Vercel).
+
+Parte de settings.py y quita todo lo que una llamada JSON no usa: admin,
+sesiones, mensajes, staticfiles/WhiteNoise, CSRF y la API navegable de DRF.
+Menos apps y middleware = menos imports en cada cold start.
+
+Uso:
+    DJANGO_SETTINGS_MODULE=recipes_core_demo.settings_api
+
+La API queda en modo solo lectura para anónimos (sin autenticación por
+sesión); las escrituras se hacen desde el despliegue completo con el admin.
+Medir con: python manage.py startup_report --settings-module recipes_core_demo.settings_api
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',  # AnonymousUser y permisos de DRF
+    'django.contrib.contenttypes',
+    'corsheaders',
+    'recipes',
+    'rest_framework',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'recipes.middleware.CompressionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'recipes_core_demo.urls_api'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],  # noqa: F405
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+        },
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    # Sin BrowsableAPIRenderer: evita cargar templates, pygments y formularios
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.api.renderers.ORJSONRenderer',
+        'recipes.api.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.api.renderers.ORJSONParser',
+        'recipes.api.renderers.MessagePackParser',
+    ],
+}
@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
-from django.conf.urls.static import static
+from django.urls import path, re_path
 from django.conf import settings
 from django.urls import include
+
+from recipes.views import serve_media
 urlpatterns = [
     path("admin/", admin.site.urls),
     # API REST
@@ -28,4 +29,9 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Con ETag y Cache-Control: immutable (ver recipes.views.serve_media).
+    # En producción el servidor de media debe enviar los mismos encabezados
+    # para /media/recipes/sha256/.
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.*)$", serve_media),
+    ]
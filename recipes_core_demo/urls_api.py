@@ -0,0 +1,9 @@
+"""
+URLconf del perfil "api" (ver settings_api.py): solo la API REST,
+sin admin, archivos media ni las vistas HTML de recipes.urls.
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    path("api/", include("recipes.api.urls")),
+]